@@ -0,0 +1,158 @@
+import json
+
+from django.contrib import admin
+from django.core import checks
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from api import events
+
+# Сколько удаляемых объектов перечислять на странице подтверждения
+SHOWN_DELETED = 100
+
+# Точный COUNT(*) выполняется, только если планировщик ожидает меньше
+# строк: на больших таблицах он дороже самой страницы списка.
+EXACT_COUNT_LIMIT = 10000
+
+
+def estimate_count(queryset):
+    """Оценка числа строк из плана PostgreSQL или None."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор для больших таблиц: число строк берётся из оценки
+    планировщика, когда точный подсчёт слишком дорог."""
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class EventAdmin(admin.ModelAdmin):
+    """Сообщает об изменениях из админки тем же событиям, что и API.
+
+    object_events(obj) возвращает пары (kind, id) для объекта.
+    """
+
+    def object_events(self, obj):
+        return ()
+
+    def emit_events(self, objs):
+        for obj in objs:
+            for kind, pk in self.object_events(obj):
+                events.emit(kind, pk)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.emit_events([obj])
+
+    def delete_model(self, request, obj):
+        # emit срабатывает после коммита, id берутся до удаления.
+        self.emit_events([obj])
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        self.emit_events(queryset)
+        super().delete_queryset(request, queryset)
+
+
+class SoftDeleteAdmin(admin.ModelAdmin):
+    """Удаление через пометку is_deleted и фоновую очистку.
+
+    Страница подтверждения не обходит связанные объекты: для автора с
+    тысячами рецептов это загрузило бы их все в память.
+
+    deleter — функция, которая помечает объекты queryset удалёнными.
+    """
+
+    deleter = None
+
+    def check(self, **kwargs):
+        errors = super().check(**kwargs)
+        if self.deleter is None:
+            errors.append(checks.Error(
+                f'{type(self).__name__}: не задан deleter',
+                obj=type(self), id='api.E001'
+            ))
+        return errors
+
+    def delete_objects(self, queryset):
+        # Через класс, чтобы функция не стала методом.
+        return type(self).deleter(queryset)
+
+    def get_deleted_objects(self, objs, request):
+        if isinstance(objs, list):
+            count = len(objs)
+        else:
+            count = objs.count()
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        shown = [str(obj) for obj in objs[:SHOWN_DELETED]]
+        if count > len(shown):
+            shown.append(f'… и ещё {count - len(shown)}')
+        return shown, {self.opts.verbose_name_plural: count}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        self.delete_objects(self.model.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        self.delete_objects(queryset)
+
+
+class InputFilter(admin.SimpleListFilter):
+    """Фильтр с полем ввода вместо списка всех значений."""
+
+    template = 'admin/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        return ((None, None),)
+
+    def choices(self, changelist):
+        yield {
+            'parameter_name': self.parameter_name,
+            'value': self.value(),
+            'query_parts': [
+                (name, value) for name, value in changelist.params.items()
+                if name != self.parameter_name
+            ],
+        }
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if not value:
+            return queryset
+        try:
+            return queryset.filter(**{self.lookup: value})
+        except (ValueError, ValidationError) as error:
+            raise IncorrectLookupParameters(error)
+
+
+def input_filter(lookup, title):
+    return type(f'{lookup.title().replace("_", "")}Filter', (InputFilter,), {
+        'lookup': lookup,
+        'title': title,
+        'parameter_name': lookup,
+    })
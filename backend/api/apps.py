@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Подписчики событий регистрируются при импорте модулей.
+        from api import (catalog, ingredient_table,  # noqa: F401
+                         recipe_cache, signals, similarity)
@@ -0,0 +1,6 @@
+def format_number(value, digits=1):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f'{value:.{digits}f}'
+    return str(value)
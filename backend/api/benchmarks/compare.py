@@ -0,0 +1,65 @@
+import json
+
+from api.benchmarks import format_number
+
+METRICS = (
+    ('throughput_rps', ('throughput_rps',)),
+    ('p50_ms', ('latency_ms', 'p50')),
+    ('p95_ms', ('latency_ms', 'p95')),
+    ('queries', ('queries_per_request',)),
+)
+
+
+def add_arguments(parser):
+    parser.add_argument('baseline', help='JSON-результат прошлого прогона')
+    parser.add_argument('current', help='JSON-результат нового прогона')
+
+
+def lookup(row, path):
+    for key in path:
+        if row is None:
+            return None
+        row = row.get(key)
+    return row
+
+
+def change(old, new):
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def run(options, stdout):
+    with open(options['baseline'], encoding='utf-8') as file:
+        baseline = json.load(file)
+    with open(options['current'], encoding='utf-8') as file:
+        current = json.load(file)
+    old_rows = baseline['result'].get('endpoints', {})
+    new_rows = current['result'].get('endpoints', {})
+    result = {}
+    for name in sorted(old_rows.keys() & new_rows.keys()):
+        result[name] = {
+            metric: {
+                'baseline': lookup(old_rows[name], path),
+                'current': lookup(new_rows[name], path),
+                'change_pct': change(lookup(old_rows[name], path),
+                                     lookup(new_rows[name], path)),
+            }
+            for metric, path in METRICS
+        }
+    return {
+        'baseline_commit': baseline.get('commit'),
+        'current_commit': current.get('commit'),
+        'endpoints': result,
+    }
+
+
+def format_result(result):
+    for name, metrics in result['endpoints'].items():
+        changes = ', '.join(
+            f'{metric} {format_number(values["baseline"])} -> '
+            f'{format_number(values["current"])} '
+            f'({format_number(values["change_pct"])}%)'
+            for metric, values in metrics.items()
+        )
+        yield f'{name}: {changes}'
@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.db import connections
+from django.test import override_settings
+
+from api.benchmarks import format_number
+from api.ingredient_table import (ARRAYS, IngredientTable, make_arrays,
+                                  save_arrays)
+from recipes.models import Ingredient
+
+SMAPS = '/proc/self/smaps_rollup'
+UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'по вкусу')
+
+
+def add_arguments(parser):
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--rows', type=int, default=0,
+                        help='Синтетических ингредиентов вместо тех, что '
+                             'в базе')
+
+
+def source(rows):
+    if not rows:
+        return Ingredient.objects.values_list('id', 'name',
+                                              'measurement_unit').iterator()
+    return ((pk, f'Ингредиент номер {pk}', UNITS[pk % len(UNITS)])
+            for pk in range(1, rows + 1))
+
+
+def memory():
+    """Rss, Pss и Private_* процесса в КБ."""
+    fields = {}
+    with open(SMAPS) as file:
+        for line in file:
+            name, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                fields[name] = int(value.split()[0])
+    return fields
+
+
+def private(fields):
+    return fields['Private_Clean'] + fields['Private_Dirty']
+
+
+def load(mode, rows):
+    if mode == 'dict':
+        # Своя копия справочника в каждом воркере.
+        return {pk: (name, unit) for pk, name, unit in source(rows)}
+    table = IngredientTable('bench')
+    for name in ARRAYS:
+        # Читаем все страницы, как после долгой работы воркера.
+        np.add.reduce(getattr(table, name), dtype=np.int64)
+    return table
+
+
+def worker(mode, rows, ready, go, result):
+    before = memory()
+    loaded = load(mode, rows)  # noqa: F841
+    os.write(ready, b'.')
+    # Pss зависит от числа процессов, разделяющих страницы, поэтому
+    # замеряем, когда справочник загружен во всех воркерах.
+    os.read(go, 1)
+    after = memory()
+    os.write(result, json.dumps({
+        'private_kb': private(after) - private(before),
+        'pss_kb': after['Pss'] - before['Pss'],
+    }).encode())
+
+
+def measure(mode, rows, workers):
+    connections.close_all()
+    ready_read, ready_write = os.pipe()
+    go_read, go_write = os.pipe()
+    results = []
+    for _ in range(workers):
+        result_read, result_write = os.pipe()
+        if os.fork() == 0:
+            # Иначе go не закроется, пока жив хоть один воркер.
+            os.close(go_write)
+            code = 0
+            try:
+                worker(mode, rows, ready_write, go_read, result_write)
+            except BaseException:
+                code = 1
+            os._exit(code)
+        os.close(result_write)
+        results.append(result_read)
+    # Без своей копии конца записи read() вернёт пустоту, если воркер упал.
+    os.close(ready_write)
+    for _ in range(workers):
+        if not os.read(ready_read, 1):
+            raise ValueError('Воркер завершился до замера')
+    os.close(go_write)
+    measured = []
+    for result_read in results:
+        with os.fdopen(result_read) as pipe:
+            content = pipe.read()
+        _, status = os.wait()
+        if status or not content:
+            raise ValueError('Воркер завершился с ошибкой')
+        measured.append(json.loads(content))
+    for descriptor in (ready_read, go_read):
+        os.close(descriptor)
+    return {
+        'private_kb': sum(row['private_kb'] for row in measured) / workers,
+        'pss_kb': sum(row['pss_kb'] for row in measured),
+    }
+
+
+def run(options, stdout):
+    if not os.path.exists(SMAPS):
+        raise ValueError(f'Замер памяти требует Linux: нет {SMAPS}')
+    rows = options['rows']
+    endpoints = {}
+    with tempfile.TemporaryDirectory() as directory, \
+            override_settings(INGREDIENT_TABLE_DIR=directory):
+        save_arrays(Path(directory) / 'bench', make_arrays(source(rows)))
+        size = sum(path.stat().st_size
+                   for path in (Path(directory) / 'bench').iterdir())
+        for mode in ('dict', 'shared'):
+            endpoints[mode] = measure(mode, rows, options['workers'])
+    endpoints['shared']['files_kb'] = size / 1024
+    endpoints['shared']['saved'] = (
+        1 - endpoints['shared']['pss_kb'] / endpoints['dict']['pss_kb']
+        if endpoints['dict']['pss_kb'] > 0 else None
+    )
+    return {
+        'rows': rows or Ingredient.objects.count(),
+        'workers': options['workers'],
+        'endpoints': endpoints,
+    }
+
+
+def format_result(result):
+    yield f'{result["rows"]} ингредиентов, {result["workers"]} воркеров'
+    yield (f'{"mode":8} {"private/worker, MB":>19} {"PSS total, MB":>14} '
+           f'{"saved":>6}')
+    for name, row in result['endpoints'].items():
+        saved = row.get('saved')
+        yield (f'{name:8} '
+               f'{format_number(row["private_kb"] / 1024, 2):>19} '
+               f'{format_number(row["pss_kb"] / 1024, 2):>14} '
+               f'{"-" if saved is None else f"{saved:.0%}":>6}')
@@ -0,0 +1,105 @@
+import base64
+import io
+import os
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api import parsers, renderers
+from api.benchmarks import format_number
+from api.benchmarks.runner import percentile
+from api.serializers import IngredientSerializer, RecipeSerializer
+from recipes.models import Ingredient, Recipe
+
+IMPLEMENTATIONS = {
+    'json': (JSONRenderer(), JSONParser()),
+    'orjson': (renderers.FastJSONRenderer(), parsers.FastJSONParser()),
+}
+
+
+def add_arguments(parser):
+    parser.add_argument('--recipes', type=int, default=100,
+                        help='Размер страницы рецептов')
+    parser.add_argument('--image-kb', type=int, default=1024,
+                        help='Размер картинки в теле создания рецепта')
+    parser.add_argument('--repeat', type=int, default=50)
+
+
+def payloads(options):
+    request = APIRequestFactory().get('/api/recipes/')
+    request.user = AnonymousUser()
+    recipes = (
+        Recipe.objects.select_related('author')
+        .prefetch_related('ingredient_amounts__ingredient')
+        .order_by('-id')[:options['recipes']]
+    )
+    if not recipes:
+        raise ValueError('Нет данных для бенчмарка, выполните '
+                         '"benchmark seed".')
+    recipe_page = {
+        'count': len(recipes), 'next': None, 'previous': None,
+        'results': RecipeSerializer(recipes, many=True,
+                                    context={'request': request}).data,
+    }
+    ingredients = IngredientSerializer(Ingredient.objects.all(),
+                                       many=True).data
+    image = base64.b64encode(os.urandom(options['image_kb'] * 1024))
+    create_body = JSONRenderer().render({
+        'name': 'Бенчмарк',
+        'text': 'Описание рецепта',
+        'cooking_time': 10,
+        'ingredients': [
+            {'id': ingredient['id'], 'amount': 10}
+            for ingredient in ingredients[:15]
+        ],
+        'image': 'data:image/png;base64,' + image.decode(),
+    })
+    return recipe_page, ingredients, create_body
+
+
+def timed(function, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'mean': sum(latencies) / len(latencies),
+    }
+
+
+def run(options, stdout):
+    recipe_page, ingredients, create_body = payloads(options)
+    implementations = dict(IMPLEMENTATIONS)
+    if renderers.orjson is None:
+        del implementations['orjson']
+    endpoints = {}
+    for name, (renderer, parser) in implementations.items():
+        for payload_name, data in (('render:recipes', recipe_page),
+                                   ('render:ingredients', ingredients)):
+            endpoints[f'{name}:{payload_name}'] = {
+                'bytes': len(renderer.render(data)),
+                'latency_ms': timed(lambda: renderer.render(data),
+                                    options['repeat']),
+            }
+        endpoints[f'{name}:parse:recipe_create'] = {
+            'bytes': len(create_body),
+            'latency_ms': timed(
+                lambda: parser.parse(io.BytesIO(create_body)),
+                options['repeat']
+            ),
+        }
+    return {'endpoints': endpoints}
+
+
+def format_result(result):
+    yield f'{"name":32} {"bytes":>10} {"p50, ms":>8} {"p95, ms":>8}'
+    for name, row in result['endpoints'].items():
+        yield (f'{name:32} {row["bytes"]:>10} '
+               f'{format_number(row["latency_ms"]["p50"], 2):>8} '
+               f'{format_number(row["latency_ms"]["p95"], 2):>8}')
@@ -0,0 +1,143 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.db import connections, transaction
+
+from api.benchmarks import format_number
+from api.benchmarks.runner import percentile
+from api.benchmarks.seed import IMAGE_NAME, USERNAME_PREFIX
+from api.serializers import RecipeSerializer
+from recipes.models import Ingredient, IngredientInRecipe, Recipe
+from users.models import CustomUser
+
+
+class WriteCounter:
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        self.queries += 1
+        statement = sql.lstrip().upper()
+        if statement.startswith('INSERT'):
+            # rowcount многострочного INSERT ... RETURNING зависит от
+            # драйвера, поэтому строки считаются по параметрам.
+            columns = sql[sql.index('(') + 1:sql.index(')')].count(',') + 1
+            self.rows += len(params) // columns
+        elif not statement.startswith('SELECT'):
+            self.rows += max(context['cursor'].rowcount, 0)
+        return result
+
+
+def replace_ingredients(recipe, ingredient_data):
+    recipe.ingredient_amounts.all().delete()
+    IngredientInRecipe.objects.bulk_create(
+        IngredientInRecipe(recipe=recipe, ingredient=item['ingredient'],
+                           amount=item['amount'])
+        for item in ingredient_data
+    )
+
+
+def diff_ingredients(recipe, ingredient_data):
+    RecipeSerializer()._update_ingredients(recipe, ingredient_data)
+
+
+STRATEGIES = {
+    'replace': replace_ingredients,
+    'diff': diff_ingredients,
+}
+
+
+def edit(rng, current, catalog):
+    # Типичная правка: меняется часть количеств, часть ингредиентов
+    # заменяется на другие.
+    current = dict(current)
+    for ingredient in rng.sample(list(current), max(len(current) // 5, 1)):
+        current[ingredient] = rng.randint(1, 500)
+    swaps = max(len(current) // 10, 1)
+    for ingredient in rng.sample(list(current), swaps):
+        del current[ingredient]
+    unused = [
+        ingredient for ingredient in catalog if ingredient not in current
+    ]
+    for ingredient in rng.sample(unused, swaps):
+        current[ingredient] = rng.randint(1, 500)
+    return current
+
+
+def add_arguments(parser):
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 50, 200])
+    parser.add_argument('--edits', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def run(options, stdout):
+    catalog = list(Ingredient.objects.order_by('id')[:1000])
+    author = (
+        CustomUser.objects.filter(username__startswith=USERNAME_PREFIX)
+        .order_by('id').first()
+    )
+    if author is None or len(catalog) < max(options['sizes']) * 2:
+        raise ValueError('Нет данных для бенчмарка, выполните '
+                         '"benchmark seed".')
+    endpoints = {}
+    for size in options['sizes']:
+        for name, strategy in STRATEGIES.items():
+            rng = random.Random(f'{options["seed"]}:{size}')
+            endpoints[f'{name}:{size}'] = measure(
+                rng, author, catalog, size, options['edits'], strategy
+            )
+    return {'endpoints': endpoints}
+
+
+def measure(rng, author, catalog, size, edits, strategy):
+    latencies = []
+    counter = WriteCounter()
+    with transaction.atomic():
+        recipe = Recipe.objects.create(
+            author=author, name=f'Бенчмарк {size}', image=IMAGE_NAME,
+            text='-', cooking_time=1
+        )
+        current = {
+            ingredient: rng.randint(1, 500)
+            for ingredient in rng.sample(catalog, size)
+        }
+        replace_ingredients(recipe, [
+            {'ingredient': ingredient, 'amount': amount}
+            for ingredient, amount in current.items()
+        ])
+        for _ in range(edits):
+            current = edit(rng, current, catalog)
+            data = [
+                {'ingredient': ingredient, 'amount': amount}
+                for ingredient, amount in current.items()
+            ]
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+                start = time.perf_counter()
+                strategy(recipe, data)
+                latencies.append((time.perf_counter() - start) * 1000)
+        transaction.set_rollback(True)
+    return {
+        'edits': edits,
+        'rows_written_per_edit': counter.rows / edits,
+        'queries_per_edit': counter.queries / edits,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'mean': sum(latencies) / len(latencies),
+        },
+    }
+
+
+def format_result(result):
+    yield (f'{"strategy:size":16} {"rows/edit":>10} {"queries":>8} '
+           f'{"p50, ms":>8} {"p95, ms":>8}')
+    for name, row in result['endpoints'].items():
+        yield (f'{name:16} {format_number(row["rows_written_per_edit"]):>10} '
+               f'{format_number(row["queries_per_edit"]):>8} '
+               f'{format_number(row["latency_ms"]["p50"], 2):>8} '
+               f'{format_number(row["latency_ms"]["p95"], 2):>8}')
@@ -0,0 +1,62 @@
+import time
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from api.benchmarks import format_number
+from api.benchmarks.runner import percentile
+from api.serializers import RecipeSerializer
+from recipes.models import Ingredient
+
+
+def add_arguments(parser):
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1, 10, 50, 200])
+    parser.add_argument('--repeat', type=int, default=50)
+
+
+def run(options, stdout):
+    ingredient_ids = list(
+        Ingredient.objects.order_by('id')
+        .values_list('id', flat=True)[:max(options['sizes'])]
+    )
+    if len(ingredient_ids) < max(options['sizes']):
+        raise ValueError('Недостаточно ингредиентов, выполните '
+                         'load_ingredients.')
+    endpoints = {}
+    for size in options['sizes']:
+        data = [
+            {'id': ingredient_id, 'amount': 10}
+            for ingredient_id in ingredient_ids[:size]
+        ]
+        endpoints[f'ingredients:{size}'] = measure(data, options['repeat'])
+    return {'endpoints': endpoints}
+
+
+def measure(data, repeat):
+    field = RecipeSerializer().fields['ingredients']
+    latencies = []
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connections['default']) as context:
+            start = time.perf_counter()
+            field.run_validation(data)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries += len(context.captured_queries)
+    return {
+        'ingredients': len(data),
+        'queries_per_request': queries / repeat,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'mean': sum(latencies) / len(latencies),
+        },
+    }
+
+
+def format_result(result):
+    yield f'{"size":16} {"queries":>8} {"p50, ms":>8} {"p95, ms":>8}'
+    for name, row in result['endpoints'].items():
+        yield (f'{name:16} {format_number(row["queries_per_request"]):>8} '
+               f'{format_number(row["latency_ms"]["p50"], 2):>8} '
+               f'{format_number(row["latency_ms"]["p95"], 2):>8}')
@@ -0,0 +1,217 @@
+import io
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+
+from api.benchmarks import format_number, workload
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def summarize(samples, wall_time):
+    endpoints = {}
+    for name, rows in sorted(samples.items()):
+        latencies = [row[0] * 1000 for row in rows]
+        queries = [row[2] for row in rows if row[2] is not None]
+        statuses = defaultdict(int)
+        for row in rows:
+            statuses[str(row[1])] += 1
+        endpoints[name] = {
+            'requests': len(rows),
+            'errors': sum(1 for row in rows if row[1] >= 500),
+            'statuses': dict(statuses),
+            'throughput_rps': len(rows) / wall_time if wall_time else None,
+            'latency_ms': {
+                'mean': sum(latencies) / len(latencies),
+                'p50': percentile(latencies, 0.50),
+                'p90': percentile(latencies, 0.90),
+                'p95': percentile(latencies, 0.95),
+                'p99': percentile(latencies, 0.99),
+                'max': max(latencies),
+            },
+            'queries_per_request': (
+                sum(queries) / len(queries) if queries else None
+            ),
+        }
+    total = sum(len(rows) for rows in samples.values())
+    return {
+        'requests': total,
+        'wall_time_s': wall_time,
+        'throughput_rps': total / wall_time if wall_time else None,
+        'endpoints': endpoints,
+    }
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def local_host():
+    return next(
+        (host for host in settings.ALLOWED_HOSTS
+         if host and '*' not in host and not host.startswith('.')),
+        'localhost'
+    )
+
+
+class InProcessTransport:
+    def __init__(self):
+        self.application = get_wsgi_application()
+        self.host = local_host()
+
+    def __call__(self, method, path, token, body):
+        url = urlsplit(path)
+        payload = json.dumps(body).encode() if body is not None else b''
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'HTTP_HOST': self.host,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(payload)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(payload),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if token:
+            environ['HTTP_AUTHORIZATION'] = f'Token {token}'
+        status = []
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            result = self.application(
+                environ, lambda code, headers, *args: status.append(code)
+            )
+            try:
+                for _ in result:
+                    pass
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        return int(status[0].split()[0]), counter.count
+
+
+class HTTPTransport:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.local = threading.local()
+
+    def __call__(self, method, path, token, body):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        response = session.request(
+            method, self.base_url + path, json=body, headers=headers
+        )
+        return response.status_code, None
+
+
+def replay(transport, tasks, concurrency):
+    samples = defaultdict(list)
+    lock = threading.Lock()
+
+    def execute(task):
+        rows = []
+        for name, method, path, token, body in task:
+            start = time.perf_counter()
+            status, queries = transport(method, path, token, body)
+            rows.append((name, time.perf_counter() - start, status, queries))
+        with lock:
+            for name, duration, status, queries in rows:
+                samples[name].append((duration, status, queries))
+
+    def execute_and_close(task):
+        try:
+            execute(task)
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(execute_and_close, tasks))
+    else:
+        for task in tasks:
+            execute(task)
+    return samples, time.perf_counter() - start
+
+
+def add_arguments(parser):
+    parser.add_argument('--transport', choices=('inprocess', 'http'),
+                        default='inprocess')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--requests', type=int, default=1000,
+                        help='Количество сценариев в прогоне')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--workload', help='JSON-файл со сценариями')
+    parser.add_argument('--postman',
+                        help='Взять GET-запросы из postman-коллекции')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def run(options, stdout):
+    context = workload.Context(random.Random(options['seed']))
+    scenarios = workload.load(options['workload'], options['postman'])
+    if options['transport'] == 'http':
+        transport = HTTPTransport(options['base_url'])
+    else:
+        transport = InProcessTransport()
+    if options['warmup']:
+        replay(transport, workload.plan(scenarios, context,
+                                        options['warmup']), 1)
+    tasks = workload.plan(scenarios, context, options['requests'])
+    samples, wall_time = replay(transport, tasks, options['concurrency'])
+    result = summarize(samples, wall_time)
+    result['transport'] = options['transport']
+    result['concurrency'] = options['concurrency']
+    return result
+
+
+def format_result(result):
+    yield (f'{"endpoint":40} {"n":>6} {"rps":>8} {"p50":>8} '
+           f'{"p95":>8} {"p99":>8} {"queries":>8}')
+    for name, row in result['endpoints'].items():
+        latency = row['latency_ms']
+        yield (f'{name:40} {row["requests"]:>6} '
+               f'{format_number(row["throughput_rps"]):>8} '
+               f'{format_number(latency["p50"], 2):>8} '
+               f'{format_number(latency["p95"], 2):>8} '
+               f'{format_number(latency["p99"], 2):>8} '
+               f'{format_number(row["queries_per_request"]):>8}')
+    yield (f'Всего: {result["requests"]} запросов за '
+           f'{result["wall_time_s"]:.2f} с, '
+           f'{result["throughput_rps"]:.1f} rps')
@@ -0,0 +1,223 @@
+import base64
+import io
+import math
+import random
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe,
+                            Recipe, ShoppingCart)
+from users.counters import refresh_counts
+from users.models import CustomUser, Subscription
+
+USERNAME_PREFIX = 'bench_'
+IMAGE_NAME = 'recipes/benchmark.png'
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA'
+    '60e6kgAAAABJRU5ErkJggg=='
+)
+WORDS = (
+    'Суп', 'Салат', 'Пирог', 'Рагу', 'Запеканка', 'Каша', 'Омлет', 'Паста',
+    'Плов', 'Котлеты', 'Блины', 'Соус', 'Десерт', 'Жаркое', 'Смузи',
+)
+BATCH_SIZE = 2000
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r',
+})
+
+
+def add_arguments(parser):
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--recipes', type=int, default=5000)
+    parser.add_argument('--max-ingredients', type=int, default=15)
+    parser.add_argument('--favorites', type=int, default=30,
+                        help='Среднее число избранных рецептов на '
+                             'пользователя')
+    parser.add_argument('--cart', type=int, default=8,
+                        help='Среднее число рецептов в корзине')
+    parser.add_argument('--subscriptions', type=int, default=10,
+                        help='Среднее число подписок на пользователя')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--clear', action='store_true',
+                        help='Только удалить ранее созданные данные')
+
+
+class PowerLaw:
+    """Выборка id с вероятностью, убывающей как 1 / rank ** exponent."""
+
+    def __init__(self, base, size, exponent=1.0):
+        self.base = base
+        self.size = size
+        self.cum_weights = cumulative_weights(size, exponent)
+        self.total = self.cum_weights[-1]
+        # Популярные ранги разбросаны по всему диапазону id.
+        self.step = 2654435761 % size or 1
+        while math.gcd(self.step, size) != 1:
+            self.step += 1
+
+    def sample(self, rng):
+        rank = bisect_right(self.cum_weights, rng.random() * self.total)
+        return self.base + (min(rank, self.size - 1) * self.step) % self.size
+
+    def sample_unique(self, rng, count):
+        count = min(count, self.size // 2)
+        chosen = set()
+        while len(chosen) < count:
+            chosen.add(self.sample(rng))
+        return sorted(chosen)
+
+
+@lru_cache(maxsize=None)
+def cumulative_weights(size, exponent):
+    return list(accumulate((rank + 1) ** -exponent for rank in range(size)))
+
+
+def count_around(rng, mean):
+    return round(rng.paretovariate(2.0) * mean / 2)
+
+
+def copy_value(value):
+    if value is None:
+        return '\\N'
+    return str(value).translate(COPY_ESCAPES)
+
+
+def copy_rows(model, objects):
+    """Вставляет объекты через COPY PostgreSQL."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not (field.primary_key and objects[0].pk is None)
+    ]
+    buffer = io.StringIO()
+    for obj in objects:
+        buffer.write('\t'.join(
+            copy_value(field.get_db_prep_save(field.pre_save(obj, True),
+                                              connection))
+            for field in fields
+        ))
+        buffer.write('\n')
+    buffer.seek(0)
+    columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields
+    )
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+            f'({columns}) FROM STDIN',
+            buffer
+        )
+
+
+def clear():
+    CustomUser.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+
+@transaction.atomic
+def seed(users=500, recipes=5000, max_ingredients=15, favorites=30, cart=8,
+         subscriptions=10, seed=0):
+    rng = random.Random(seed)
+    if not Ingredient.objects.exists():
+        call_command('load_ingredients', verbosity=0)
+    if not default_storage.exists(IMAGE_NAME):
+        default_storage.save(IMAGE_NAME, ContentFile(PNG))
+    clear()
+
+    password = make_password(None)
+    CustomUser.objects.bulk_create(
+        CustomUser(
+            username=f'{USERNAME_PREFIX}{number}',
+            email=f'{USERNAME_PREFIX}{number}@example.com',
+            first_name='Бенч',
+            last_name=f'Пользователь {number}',
+            password=password,
+        )
+        for number in range(users)
+    )
+    authors = list(
+        CustomUser.objects.filter(username__startswith=USERNAME_PREFIX)
+        .order_by('id')
+    )
+    Token.objects.bulk_create(
+        Token(user=user, key='%040x' % rng.getrandbits(160))
+        for user in authors
+    )
+
+    # Популярность авторов и рецептов распределена по степенному закону.
+    # Номера в списках выбираются по PowerLaw с нулевым началом.
+    author_numbers = PowerLaw(0, len(authors))
+    recipe_authors = [authors[author_numbers.sample(rng)]
+                      for _ in range(recipes)]
+    Recipe.objects.bulk_create(
+        (Recipe(
+            author=author,
+            name=f'{rng.choice(WORDS)} №{number}',
+            image=IMAGE_NAME,
+            text='Описание рецепта для нагрузочного тестирования.',
+            cooking_time=rng.randint(5, 180),
+        ) for number, author in enumerate(recipe_authors)),
+        batch_size=BATCH_SIZE
+    )
+    recipe_ids = list(
+        Recipe.objects.filter(author__username__startswith=USERNAME_PREFIX)
+        .order_by('id').values_list('id', flat=True)
+    )
+    ingredient_ids = list(
+        Ingredient.objects.order_by('id').values_list('id', flat=True)
+    )
+    IngredientInRecipe.objects.bulk_create(
+        (IngredientInRecipe(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                            amount=rng.randint(1, 500))
+         for recipe_id in recipe_ids
+         for ingredient_id in rng.sample(
+             ingredient_ids, rng.randint(1, max_ingredients))),
+        batch_size=BATCH_SIZE
+    )
+
+    recipe_numbers = PowerLaw(0, len(recipe_ids))
+    for model, mean in ((Favorite, favorites), (ShoppingCart, cart)):
+        model.objects.bulk_create(
+            (model(user=user, recipe_id=recipe_ids[number])
+             for user in authors
+             for number in recipe_numbers.sample_unique(
+                 rng, count_around(rng, mean))),
+            batch_size=BATCH_SIZE
+        )
+    Subscription.objects.bulk_create(
+        (Subscription(user=user, following=authors[number])
+         for user in authors
+         for number in author_numbers.sample_unique(
+             rng, count_around(rng, subscriptions))
+         if authors[number] != user),
+        batch_size=BATCH_SIZE
+    )
+    refresh_counts(CustomUser.objects.filter(
+        username__startswith=USERNAME_PREFIX
+    ))
+    return {
+        'users': len(authors),
+        'recipes': len(recipe_ids),
+        'ingredients': len(ingredient_ids),
+    }
+
+
+def run(options, stdout):
+    if options['clear']:
+        clear()
+        return {}
+    return seed(
+        users=options['users'],
+        recipes=options['recipes'],
+        max_ingredients=options['max_ingredients'],
+        favorites=options['favorites'],
+        cart=options['cart'],
+        subscriptions=options['subscriptions'],
+        seed=options['seed'],
+    )
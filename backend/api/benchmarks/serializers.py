@@ -0,0 +1,107 @@
+import time
+
+from django.db import connections
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarks import format_number
+from api.benchmarks.runner import QueryCounter, local_host
+from api.benchmarks.seed import USERNAME_PREFIX
+from api.serializers import (IngredientReadSerializer, IngredientSerializer,
+                             RecipeReadSerializer, RecipeSerializer,
+                             SubscriptionReadSerializer,
+                             SubscriptionUserSerializer)
+from recipes.models import Ingredient, Recipe
+from users.models import CustomUser, Subscription
+
+
+def add_arguments(parser):
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--recipes-limit', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=20)
+
+
+def make_request(path, user):
+    request = Request(APIRequestFactory().get(path, HTTP_HOST=local_host()))
+    request.user = user
+    return request
+
+
+def cases(options):
+    user_id = (
+        Subscription.objects.filter(user__username__startswith=USERNAME_PREFIX)
+        .order_by('user_id').values_list('user_id', flat=True).first()
+    )
+    if user_id is None:
+        raise ValueError('Нет данных для бенчмарка, выполните '
+                         '"benchmark seed".')
+    user = CustomUser.objects.get(id=user_id)
+    size = options['page_size']
+    recipes = make_request('/api/recipes/', user)
+    subscriptions = make_request(
+        f'/api/users/subscriptions/?recipes_limit={options["recipes_limit"]}',
+        user
+    )
+    ingredients = make_request('/api/ingredients/', user)
+    followed = CustomUser.objects.filter(followers__user=user)
+    return {
+        'recipes': (
+            (RecipeSerializer, Recipe.objects.all()[:size], recipes),
+            (RecipeReadSerializer, RecipeReadSerializer.prepare_queryset(
+                Recipe.objects.all(), recipes
+            )[:size], recipes),
+        ),
+        'subscriptions': (
+            (SubscriptionUserSerializer, followed[:size], subscriptions),
+            (SubscriptionReadSerializer,
+             SubscriptionReadSerializer.prepare_queryset(
+                 followed, subscriptions
+             )[:size], subscriptions),
+        ),
+        'ingredients': (
+            (IngredientSerializer, Ingredient.objects.all(), ingredients),
+            (IngredientReadSerializer,
+             IngredientReadSerializer.prepare_queryset(
+                 Ingredient.objects.all(), ingredients
+             ), ingredients),
+        ),
+    }
+
+
+def measure(serializer_class, queryset, request, repeat):
+    elapsed = 0
+    objects = 0
+    counter = QueryCounter()
+    for _ in range(repeat):
+        with connections['default'].execute_wrapper(counter):
+            start = time.perf_counter()
+            data = serializer_class(queryset.all(), many=True,
+                                    context={'request': request}).data
+            elapsed += time.perf_counter() - start
+        objects += len(data)
+    return {
+        'objects': objects // repeat,
+        'queries_per_request': counter.count / repeat,
+        'us_per_object': elapsed / max(objects, 1) * 1_000_000,
+    }
+
+
+def run(options, stdout):
+    endpoints = {}
+    for name, variants in cases(options).items():
+        for label, (serializer_class, queryset, request) in zip(
+            ('before', 'after'), variants
+        ):
+            endpoints[f'{name}:{label}'] = measure(
+                serializer_class, queryset, request, options['repeat']
+            )
+    return {'endpoints': endpoints}
+
+
+def format_result(result):
+    yield (f'{"name":24} {"objects":>8} {"queries":>8} '
+           f'{"us/object":>10}')
+    for name, row in result['endpoints'].items():
+        yield (f'{name:24} {row["objects"]:>8} '
+               f'{format_number(row["queries_per_request"]):>8} '
+               f'{format_number(row["us_per_object"]):>10}')
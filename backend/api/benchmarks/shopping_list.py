@@ -0,0 +1,115 @@
+import random
+import time
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from api.benchmarks import format_number
+from api.benchmarks.runner import percentile
+from api.benchmarks.seed import USERNAME_PREFIX
+from api.shopping import (cart_totals, format_amount, shopping_list,
+                          unit_conversions)
+from recipes.models import IngredientInRecipe, Recipe, ShoppingCart
+from users.models import CustomUser
+
+
+def sql_shopping_list(user_id):
+    # Прежняя реализация: GROUP BY на стороне БД, без перевода единиц.
+    ingredients = (
+        IngredientInRecipe.objects.filter(recipe__in_cart__user=user_id)
+        .values('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(
+            total_amount=Sum(F('amount') * F('recipe__in_cart__servings'))
+        )
+        .order_by('ingredient__name')
+    )
+    return '\n'.join(
+        f'{item["ingredient__name"]} '
+        f'({item["ingredient__measurement_unit"]}) - {item["total_amount"]}'
+        for item in ingredients
+    )
+
+
+def python_shopping_list(user_id):
+    # Перевод единиц построчно, без NumPy.
+    conversions = unit_conversions()
+    lines = []
+    for name, unit, total in cart_totals(user_id):
+        base, own = conversions.get(unit, (unit, 1.0))
+        amount, best = total * own, base
+        for other, (other_base, factor) in sorted(
+                conversions.items(), key=lambda item: item[1][1]):
+            converted = total * own / factor
+            if (other_base == base and converted >= 1
+                    and abs(converted * 100 - round(converted * 100)) < 1e-6):
+                amount, best = converted, other
+        lines.append(f'{name} ({best}) - {format_amount(amount)}')
+    return '\n'.join(lines)
+
+
+STRATEGIES = {
+    'sql': sql_shopping_list,
+    'python': python_shopping_list,
+    'numpy': shopping_list,
+}
+
+
+def add_arguments(parser):
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10, 1000, 5000],
+                        help='Число рецептов в корзине')
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def run(options, stdout):
+    user = (
+        CustomUser.objects.filter(username__startswith=USERNAME_PREFIX)
+        .order_by('id').first()
+    )
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    if user is None or not recipe_ids:
+        raise ValueError('Нет данных для бенчмарка, выполните '
+                         '"benchmark seed".')
+    endpoints = {}
+    for size in options['sizes']:
+        rng = random.Random(f'{options["seed"]}:{size}')
+        with transaction.atomic():
+            ShoppingCart.objects.filter(user=user).delete()
+            ShoppingCart.objects.bulk_create(
+                ShoppingCart(user=user, recipe_id=recipe_id,
+                             servings=rng.randint(1, 4))
+                for recipe_id in rng.sample(recipe_ids,
+                                            min(size, len(recipe_ids)))
+            )
+            for name, strategy in STRATEGIES.items():
+                endpoints[f'{name}:{size}'] = measure(
+                    strategy, user.id, options['repeats']
+                )
+            transaction.set_rollback(True)
+    return {'endpoints': endpoints}
+
+
+def measure(strategy, user_id, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        text = strategy(user_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        'lines': text.count('\n') + 1 if text else 0,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'mean': sum(latencies) / len(latencies),
+        },
+    }
+
+
+def format_result(result):
+    yield (f'{"strategy:size":16} {"lines":>6} '
+           f'{"p50, ms":>8} {"p95, ms":>8}')
+    for name, row in result['endpoints'].items():
+        yield (f'{name:16} {row["lines"]:>6} '
+               f'{format_number(row["latency_ms"]["p50"], 2):>8} '
+               f'{format_number(row["latency_ms"]["p95"], 2):>8}')
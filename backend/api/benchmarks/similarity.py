@@ -0,0 +1,80 @@
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from django.test import override_settings
+
+from api.benchmarks import format_number
+from api.benchmarks.runner import percentile
+from api.similarity import DELTA, SimilarityIndex, make_arrays, save_arrays
+
+
+def synthetic_pairs(rng, recipes, ingredients, max_ingredients):
+    # Популярность ингредиентов убывает как 1 / rank, как в seed.
+    weights = 1 / np.arange(1, ingredients + 1)
+    counts = rng.integers(1, max_ingredients + 1, size=recipes)
+    recipe_ids = np.repeat(np.arange(1, recipes + 1), counts)
+    ingredient_ids = rng.choice(ingredients, size=len(recipe_ids),
+                                p=weights / weights.sum()) + 1
+    return np.unique(np.stack([recipe_ids, ingredient_ids], axis=1), axis=0)
+
+
+def add_arguments(parser):
+    parser.add_argument('--recipes', type=int, nargs='+',
+                        default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--ingredients', type=int, default=2000)
+    parser.add_argument('--max-ingredients', type=int, default=15)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def run(options, stdout):
+    endpoints = {}
+    for recipes in options['recipes']:
+        rng = np.random.default_rng(options['seed'])
+        pairs = synthetic_pairs(rng, recipes, options['ingredients'],
+                                options['max_ingredients'])
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(SIMILARITY_INDEX_DIR=directory):
+            start = time.perf_counter()
+            save_arrays(Path(directory) / 'bench', make_arrays(pairs))
+            build_s = time.perf_counter() - start
+            (Path(directory) / 'bench' / DELTA).touch()
+            index = SimilarityIndex('bench')
+            starts = np.searchsorted(pairs[:, 0], np.arange(1, recipes + 2))
+            latencies = []
+            for recipe_id in rng.integers(1, recipes + 1,
+                                          size=options['queries']).tolist():
+                ingredients = pairs[starts[recipe_id - 1]:starts[recipe_id],
+                                    1].tolist()
+                start = time.perf_counter()
+                index.query(ingredients, options['limit'], exclude=recipe_id)
+                latencies.append((time.perf_counter() - start) * 1000)
+            size = sum(
+                path.stat().st_size
+                for path in (Path(directory) / 'bench').iterdir()
+            )
+        endpoints[f'similar:{recipes}'] = {
+            'pairs': len(pairs),
+            'build_s': build_s,
+            'index_mb': size / 2 ** 20,
+            'latency_ms': {
+                'p50': percentile(latencies, 0.5),
+                'p95': percentile(latencies, 0.95),
+                'mean': sum(latencies) / len(latencies),
+            },
+        }
+    return {'endpoints': endpoints}
+
+
+def format_result(result):
+    yield (f'{"recipes":18} {"pairs":>10} {"build, s":>9} {"MB":>7} '
+           f'{"p50, ms":>8} {"p95, ms":>8}')
+    for name, row in result['endpoints'].items():
+        yield (f'{name:18} {row["pairs"]:>10} '
+               f'{format_number(row["build_s"], 2):>9} '
+               f'{format_number(row["index_mb"]):>7} '
+               f'{format_number(row["latency_ms"]["p50"], 2):>8} '
+               f'{format_number(row["latency_ms"]["p95"], 2):>8}')
@@ -0,0 +1,149 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+from api.benchmarks import format_number
+from api.benchmarks.runner import percentile
+
+# Выполняется в отдельном интерпретаторе, чтобы время импорта считалось
+# с нуля. Печатает JSON со временем импорта и первых запросов воркеров.
+WORKER = '''
+import json, os, sys, time
+from wsgiref.util import setup_testing_defaults
+
+path, workers, preload, repeats = (
+    sys.argv[1], int(sys.argv[2]), sys.argv[3] == '1', int(sys.argv[4])
+)
+start = time.perf_counter()
+from foodgram.wsgi import application
+imported = time.perf_counter() - start
+
+
+def first_request():
+    environ = {'PATH_INFO': path}
+    setup_testing_defaults(environ)
+    statuses = []
+    response = application(
+        environ, lambda status, headers, exc_info=None: statuses.append(status)
+    )
+    b''.join(response)
+    response.close()
+    return int(statuses[0].split()[0])
+
+
+def steady():
+    # Среднее время следующих запросов: сюда входит цепочка middleware.
+    # Считается без fork, чтобы воркеры не делили между собой процессор.
+    start = time.perf_counter()
+    for _ in range(repeats):
+        first_request()
+    return (time.perf_counter() - start) / max(repeats, 1)
+
+
+if not preload:
+    start = time.perf_counter()
+    status = first_request()
+    request = time.perf_counter() - start
+    print(json.dumps({'import': imported, 'workers': [
+        {'request': request, 'ready': imported + request, 'status': status,
+         'steady': steady()}
+    ]}))
+    sys.exit()
+
+from django.db import connections
+connections.close_all()
+pipes = []
+for _ in range(workers):
+    read, write = os.pipe()
+    forked = time.perf_counter()
+    if os.fork() == 0:
+        os.close(read)
+        status = first_request()
+        request = time.perf_counter() - forked
+        os.write(write, json.dumps({
+            'request': request, 'ready': request, 'status': status,
+        }).encode())
+        os._exit(0)
+    os.close(write)
+    pipes.append(read)
+results = []
+for read in pipes:
+    with os.fdopen(read) as pipe:
+        results.append(json.loads(pipe.read()))
+    os.wait()
+print(json.dumps({'import': imported, 'workers': results}))
+'''
+
+MODES = {
+    'full': {'API_ONLY': 'False', 'preload': False},
+    'full+preload': {'API_ONLY': 'False', 'preload': True},
+    'api-only': {'API_ONLY': 'True', 'preload': False},
+    'api-only+preload': {'API_ONLY': 'True', 'preload': True},
+}
+
+
+def add_arguments(parser):
+    parser.add_argument('--path', default='/api/recipes/',
+                        help='Первый запрос каждого воркера')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Воркеров на один мастер с --preload')
+    parser.add_argument('--requests', type=int, default=50,
+                        help='Запросов после первого для среднего времени')
+    parser.add_argument('--repeats', type=int, default=5)
+
+
+def start(options, mode):
+    env = {**os.environ, 'API_ONLY': mode['API_ONLY']}
+    completed = subprocess.run(
+        (sys.executable, '-c', WORKER, options['path'],
+         str(options['workers']), '1' if mode['preload'] else '0',
+         str(options['requests'])),
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode:
+        raise ValueError(completed.stderr.strip().splitlines()[-1])
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run(options, stdout):
+    endpoints = {}
+    for name, mode in MODES.items():
+        imports, requests, ready, steady = [], [], [], []
+        statuses = set()
+        for _ in range(options['repeats']):
+            result = start(options, mode)
+            imports.append(result['import'] * 1000)
+            for worker in result['workers']:
+                requests.append(worker['request'] * 1000)
+                ready.append(worker['ready'] * 1000)
+                if 'steady' in worker:
+                    steady.append(worker['steady'] * 1000)
+                statuses.add(worker['status'])
+        endpoints[name] = {
+            'statuses': sorted(statuses),
+            'import_ms': sum(imports) / len(imports),
+            'first_request_ms': percentile(requests, 0.5),
+            'ready_ms': {
+                'p50': percentile(ready, 0.5),
+                'p95': percentile(ready, 0.95),
+            },
+            'steady_ms': sum(steady) / len(steady) if steady else None,
+        }
+    return {'endpoints': endpoints}
+
+
+def format_result(result):
+    yield (f'{"mode":18} {"status":>7} {"import, ms":>11} '
+           f'{"request, ms":>12} {"ready p50":>10} {"ready p95":>10} '
+           f'{"next, ms":>9}')
+    for name, row in result['endpoints'].items():
+        statuses = ','.join(map(str, row['statuses']))
+        yield (f'{name:18} {statuses:>7} '
+               f'{format_number(row["import_ms"]):>11} '
+               f'{format_number(row["first_request_ms"]):>12} '
+               f'{format_number(row["ready_ms"]["p50"]):>10} '
+               f'{format_number(row["ready_ms"]["p95"]):>10} '
+               f'{format_number(row["steady_ms"], 2):>9}')
@@ -0,0 +1,189 @@
+import json
+import re
+from dataclasses import dataclass, field
+from urllib.parse import quote
+
+from rest_framework.authtoken.models import Token
+
+from api.benchmarks.seed import USERNAME_PREFIX
+from recipes.models import Ingredient, Recipe
+
+
+@dataclass(frozen=True)
+class Step:
+    name: str
+    method: str
+    path: str
+    auth: bool = False
+    body: dict = None
+
+
+@dataclass
+class Scenario:
+    name: str
+    weight: int
+    steps: list = field(default_factory=list)
+
+
+def toggle(name, weight, path):
+    return Scenario(name, weight, [
+        Step(f'{name}:add', 'POST', path, auth=True),
+        Step(f'{name}:remove', 'DELETE', path, auth=True),
+    ])
+
+
+DEFAULT_WORKLOAD = [
+    Scenario('recipes:list', 20, [
+        Step('recipes:list', 'GET', '/api/recipes/?page={page}&limit=6'),
+    ]),
+    Scenario('recipes:list:auth', 20, [
+        Step('recipes:list:auth', 'GET', '/api/recipes/?page={page}&limit=6',
+             auth=True),
+    ]),
+    Scenario('recipes:list:author', 5, [
+        Step('recipes:list:author', 'GET',
+             '/api/recipes/?author={author_id}&limit=6', auth=True),
+    ]),
+    Scenario('recipes:list:is_favorited', 5, [
+        Step('recipes:list:is_favorited', 'GET',
+             '/api/recipes/?is_favorited=1&limit=6', auth=True),
+    ]),
+    Scenario('recipes:list:is_in_shopping_cart', 5, [
+        Step('recipes:list:is_in_shopping_cart', 'GET',
+             '/api/recipes/?is_in_shopping_cart=1&limit=6', auth=True),
+    ]),
+    Scenario('recipes:retrieve', 15, [
+        Step('recipes:retrieve', 'GET', '/api/recipes/{recipe_id}/'),
+    ]),
+    Scenario('ingredients:search', 10, [
+        Step('ingredients:search', 'GET',
+             '/api/ingredients/?name={ingredient_prefix}'),
+    ]),
+    Scenario('ingredients:list', 2, [
+        Step('ingredients:list', 'GET', '/api/ingredients/'),
+    ]),
+    Scenario('users:retrieve', 3, [
+        Step('users:retrieve', 'GET', '/api/users/{author_id}/'),
+    ]),
+    Scenario('users:me', 3, [
+        Step('users:me', 'GET', '/api/users/me/', auth=True),
+    ]),
+    Scenario('users:subscriptions', 5, [
+        Step('users:subscriptions', 'GET',
+             '/api/users/subscriptions/?limit=6&recipes_limit=3', auth=True),
+    ]),
+    Scenario('recipes:download_shopping_cart', 2, [
+        Step('recipes:download_shopping_cart', 'GET',
+             '/api/recipes/download_shopping_cart/', auth=True),
+    ]),
+    toggle('recipes:favorite', 4, '/api/recipes/{recipe_id}/favorite/'),
+    toggle('recipes:shopping_cart', 3,
+           '/api/recipes/{recipe_id}/shopping_cart/'),
+    toggle('users:subscribe', 2, '/api/users/{author_id}/subscribe/'),
+]
+
+POSTMAN_VARIABLES = {
+    '{{baseUrl}}': '',
+    '{{userId}}': '{author_id}',
+    '{{firstRecipeId}}': '{recipe_id}',
+    '{{firstIndredientId}}': '{ingredient_id}',
+    '{{ingredientNameFirstLatter}}': '{ingredient_prefix}',
+}
+UNKNOWN_VARIABLE = re.compile(r'{{\w+}}')
+
+
+def _postman_items(items):
+    for item in items:
+        if 'item' in item:
+            yield from _postman_items(item['item'])
+        else:
+            yield item
+
+
+def from_postman(path):
+    with open(path, encoding='utf-8') as file:
+        collection = json.load(file)
+    scenarios = {}
+    for item in _postman_items(collection['item']):
+        request = item['request']
+        if request['method'] != 'GET':
+            continue
+        url = request['url']
+        url = url['raw'] if isinstance(url, dict) else url
+        for variable, placeholder in POSTMAN_VARIABLES.items():
+            url = url.replace(variable, placeholder)
+        if UNKNOWN_VARIABLE.search(url):
+            continue
+        auth = (request.get('auth') or {}).get('type') == 'apikey'
+        name = ' '.join(item['name'].split())
+        key = (url, auth)
+        if key not in scenarios:
+            scenarios[key] = Scenario(name, 1, [Step(name, 'GET', url, auth)])
+    return list(scenarios.values())
+
+
+class Context:
+    def __init__(self, rng):
+        self.rng = rng
+        self.tokens = list(
+            Token.objects.filter(user__username__startswith=USERNAME_PREFIX)
+            .order_by('key').values_list('key', flat=True)
+        )
+        if not self.tokens:
+            raise ValueError(
+                'Нет данных для нагрузочного теста, '
+                'выполните "benchmark seed".'
+            )
+        self.author_ids = list(
+            Recipe.objects.order_by('author_id')
+            .values_list('author_id', flat=True).distinct()
+        )
+        self.recipe_ids = list(
+            Recipe.objects.order_by('id').values_list('id', flat=True)
+        )
+        self.ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+        self.ingredient_prefixes = sorted({
+            name[:2] for name in Ingredient.objects.values_list(
+                'name', flat=True)
+        })
+        self.pages = max(len(self.recipe_ids) // 6, 1)
+
+    def variables(self):
+        rng = self.rng
+        return {
+            'author_id': rng.choice(self.author_ids),
+            'recipe_id': rng.choice(self.recipe_ids),
+            'ingredient_id': rng.choice(self.ingredient_ids),
+            'ingredient_prefix': quote(rng.choice(self.ingredient_prefixes)),
+            'page': min(int(rng.paretovariate(1.5)), self.pages),
+        }
+
+
+def plan(scenarios, context, count):
+    weights = [scenario.weight for scenario in scenarios]
+    tasks = []
+    for scenario in context.rng.choices(scenarios, weights, k=count):
+        variables = context.variables()
+        token = context.rng.choice(context.tokens)
+        tasks.append([
+            (step.name, step.method, step.path.format(**variables),
+             token if step.auth else None, step.body)
+            for step in scenario.steps
+        ])
+    return tasks
+
+
+def load(path=None, postman=None):
+    if postman:
+        return from_postman(postman)
+    if path:
+        with open(path, encoding='utf-8') as file:
+            return [
+                Scenario(item['name'], item.get('weight', 1), [
+                    Step(**step) for step in item['steps']
+                ])
+                for item in json.load(file)
+            ]
+    return DEFAULT_WORKLOAD
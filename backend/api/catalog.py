@@ -0,0 +1,110 @@
+import gzip
+import hashlib
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from api import events
+from api.files import write_atomic
+from api.renderers import FastJSONRenderer
+from recipes.models import Ingredient
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+NAME = 'ingredients'
+KEEP_VERSIONS = 2
+
+
+def catalog_dir():
+    return Path(settings.INGREDIENT_CATALOG_DIR)
+
+
+def pointer_path():
+    return catalog_dir() / f'{NAME}.current'
+
+
+def stamp_path():
+    return catalog_dir() / f'{NAME}.stale'
+
+
+def stamp():
+    try:
+        return stamp_path().stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def catalog_url():
+    try:
+        filename = pointer_path().read_text().strip()
+    except FileNotFoundError:
+        return None
+    return f'{settings.INGREDIENT_CATALOG_URL}{filename}'
+
+
+def build_catalog():
+    """Пишет каталог в STATIC_ROOT вместе с копиями .gz и .br."""
+    directory = catalog_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    started = stamp()
+    # Каталог читается с основной БД: реплика может отставать от изменения,
+    # из-за которого его перестраивают.
+    rows = list(
+        Ingredient.objects.using(DEFAULT_DB_ALIAS)
+        .values('id', 'name', 'measurement_unit')
+    )
+    content = FastJSONRenderer().render(rows)
+    version = hashlib.sha256(content).hexdigest()[:12]
+    filename = f'{NAME}.{version}.json'
+    path = directory / filename
+    if not path.exists():
+        write_atomic(path.with_name(filename + '.gz'),
+                     gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            write_atomic(path.with_name(filename + '.br'),
+                         brotli.compress(content, mode=brotli.MODE_TEXT))
+        write_atomic(path, content)
+    write_atomic(pointer_path(), filename.encode())
+    if stamp() != started:
+        # Ингредиенты поменялись, пока каталог собирался.
+        pointer_path().unlink(missing_ok=True)
+    remove_old_versions(filename)
+    return filename
+
+
+def remove_old_versions(current):
+    versions = sorted(
+        catalog_dir().glob(f'{NAME}.*.json'),
+        key=lambda path: path.stat().st_mtime, reverse=True
+    )
+    # Предыдущую версию оставляем для клиентов, уже получивших редирект.
+    stale = [path for path in versions if path.name != current]
+    for path in stale[KEEP_VERSIONS - 1:]:
+        for suffix in ('', '.gz', '.br'):
+            path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def invalidate_catalog():
+    """Сбрасывает каталог и ставит в очередь сборку, одну на каждый сброс.
+
+    Ничего не делает, если каталог ни разу не собирали: первый раз его
+    собирает warm_caches или build_ingredient_catalog при деплое.
+    """
+    directory = catalog_dir()
+    if not directory.exists():
+        return
+    stamp_path().touch()
+    pointer_path().unlink(missing_ok=True)
+    from api.tasks import rebuild_ingredient_catalog
+    from jobs.queue import enqueue
+    enqueue(rebuild_ingredient_catalog, key=f'ingredient-catalog:{stamp()}')
+
+
+@events.subscriber(events.INGREDIENT)
+def ingredients_changed(ids):
+    if settings.INGREDIENT_CATALOG_ENABLED:
+        invalidate_catalog()
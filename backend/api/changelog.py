@@ -0,0 +1,101 @@
+"""Журнал изменений для синхронизации клиентов.
+
+Изменение записывается в той же транзакции, что и сами данные. Позиция
+записи — пара (txid, id). Номер из последовательности выдаётся при вставке,
+а не при коммите, поэтому запись с меньшим id может стать видна позже
+записи с большим. Чтобы курсор её не перескочил, читатель отдаёт только
+записи с txid меньше горизонта: pg_snapshot_xmin — номер самой старой ещё
+не завершённой транзакции. Все транзакции до горизонта уже завершены, а
+новые записи получат txid не меньше него.
+"""
+from collections import defaultdict
+
+from django.db import (DEFAULT_DB_ALIAS, IntegrityError, connections,
+                       transaction)
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from recipes.models import Change
+
+BATCH_SIZE = 500
+# Сколько раз повторить пачку, если ту же запись одновременно заменила
+# другая транзакция.
+ATTEMPTS = 3
+
+
+def is_postgresql():
+    return connections[DEFAULT_DB_ALIAS].vendor == 'postgresql'
+
+
+def current_txid():
+    if is_postgresql():
+        return RawSQL('pg_current_xact_id()::text::bigint', ())
+    # SQLite выполняет пишущие транзакции по одной, порядок id совпадает с
+    # порядком коммитов.
+    return 0
+
+
+def txid_value():
+    """Номер текущей транзакции числом: для записей, вставляемых COPY."""
+    if not is_postgresql():
+        return 0
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute('SELECT pg_current_xact_id()::text::bigint')
+        return cursor.fetchone()[0]
+
+
+def horizon():
+    """Номер самой старой незавершённой транзакции или None."""
+    if not is_postgresql():
+        return None
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint'
+        )
+        return cursor.fetchone()[0]
+
+
+def replace(batch, deleted, txid):
+    """Заменяет записи объектов batch новыми.
+
+    Новая запись получает новый id: обновить старую на месте нельзя, её
+    позиция уже может быть позади курсора клиента.
+    """
+    objects = defaultdict(list)
+    for kind, object_id, user_id in batch:
+        objects[kind, user_id].append(object_id)
+    previous = Q()
+    for (kind, user_id), object_ids in objects.items():
+        previous |= Q(kind=kind, user_id=user_id, object_id__in=object_ids)
+    Change.objects.filter(previous).delete()
+    Change.objects.bulk_create([
+        Change(kind=kind, object_id=object_id, user_id=user_id,
+               deleted=deleted, txid=txid)
+        for kind, object_id, user_id in batch
+    ])
+
+
+def record_rows(rows, deleted=False):
+    """Записывает изменения объектов rows — троек (kind, object_id,
+    user_id) — вместо их прежних записей."""
+    rows = list(dict.fromkeys(rows))
+    txid = current_txid()
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        for attempt in range(1, ATTEMPTS + 1):
+            try:
+                with transaction.atomic():
+                    replace(batch, deleted, txid)
+                break
+            except IntegrityError:
+                # Параллельная транзакция вставила запись того же объекта
+                # после нашего DELETE. Теперь она зафиксирована, и
+                # следующий DELETE её увидит.
+                if attempt == ATTEMPTS:
+                    raise
+
+
+def record(kind, object_ids, user_id=None, deleted=False):
+    record_rows(
+        ((kind, object_id, user_id) for object_id in object_ids), deleted
+    )
@@ -0,0 +1,113 @@
+import contextvars
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+LAG_SQL = '''
+    SELECT COALESCE(CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END, 0)
+'''
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def pin_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+
+def pin_to_primary(user):
+    cache.set(pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    return user.is_authenticated and bool(cache.get(pin_key(user.pk)))
+
+
+class LagMonitor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        checked_at, healthy = self._checked.get(alias, (None, False))
+        if (checked_at is not None
+                and now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL):
+            return healthy
+        with self._lock:
+            healthy = self.lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS
+            self._checked[alias] = (now, healthy)
+        return healthy
+
+    @staticmethod
+    def lag(alias):
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            return 0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                return float(cursor.fetchone()[0])
+        except DatabaseError:
+            return float('inf')
+
+
+lag_monitor = LagMonitor()
+
+
+def choose_replica():
+    replicas = [
+        alias for alias in settings.DATABASE_REPLICAS
+        if lag_monitor.is_healthy(alias)
+    ]
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        alias = None
+        if (settings.DATABASE_REPLICAS
+                and request.method in SAFE_METHODS
+                and self.action in self.replica_actions
+                and not is_pinned(request.user)):
+            alias = choose_replica()
+        self._read_alias_token = _read_alias.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        token = getattr(self, '_read_alias_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._read_alias_token = None
+        if (settings.DATABASE_REPLICAS
+                and request.method not in SAFE_METHODS
+                and response.status_code < 400
+                and request.user.is_authenticated):
+            pin_to_primary(request.user)
+        return response
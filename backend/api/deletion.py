@@ -0,0 +1,182 @@
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from rest_framework.authtoken.models import Token
+
+from api import changelog, events
+from recipes.models import (Change, Favorite, IngredientInRecipe, Recipe,
+                            ShoppingCart)
+from users.counters import change, count_of
+from users.models import CustomUser, Subscription
+
+
+def schedule_purge():
+    """Ставит очистку на конец текущего окна PURGE_DELAY секунд.
+
+    Все удаления за окно разбирает одна задача.
+    """
+    from api.tasks import purge_deleted
+    from jobs.queue import enqueue
+    window = int(time.time() // settings.PURGE_DELAY) + 1
+    enqueue(purge_deleted, key=f'purge-deleted:{window}',
+            delay=window * settings.PURGE_DELAY - time.time())
+
+
+def delete_recipes(queryset):
+    """Помечает рецепты удалёнными и возвращает их число.
+
+    Рецепты сразу пропадают из API, счётчики авторов уменьшаются в той
+    же транзакции, а строки удаляет фоновая задача purge_deleted.
+    """
+    with transaction.atomic():
+        rows = list(
+            queryset.filter(is_deleted=False).order_by().select_for_update()
+            .values_list('id', 'author_id')
+        )
+        if not rows:
+            return 0
+        ids = [recipe_id for recipe_id, _ in rows]
+        Recipe.objects.filter(id__in=ids).update(is_deleted=True)
+        changelog.record(Change.RECIPE, ids, deleted=True)
+        authors = Counter(author_id for _, author_id in rows)
+        for author_id, count in authors.items():
+            change(author_id, 'recipes_count', -count)
+        schedule_purge()
+        events.emit(events.RECIPE, *ids)
+        events.emit(events.USER, *authors)
+    return len(rows)
+
+
+def delete_users(queryset):
+    """Помечает пользователей и их рецепты удалёнными.
+
+    Пользователь больше не может войти, его подписки сразу не считаются в
+    счётчиках других пользователей. Строки удаляет задача purge_deleted.
+    """
+    with transaction.atomic():
+        ids = list(
+            queryset.filter(is_deleted=False).order_by().select_for_update()
+            .values_list('id', flat=True)
+        )
+        if not ids:
+            return 0
+        CustomUser.objects.filter(id__in=ids).update(
+            is_deleted=True, is_active=False
+        )
+        recipes = Recipe.objects.filter(author_id__in=ids, is_deleted=False)
+        changelog.record(Change.RECIPE, recipes.values_list('id', flat=True),
+                         deleted=True)
+        recipes.update(is_deleted=True)
+        Token.objects.filter(user_id__in=ids).delete()
+        CustomUser.objects.filter(
+            id__in=Subscription.objects.filter(
+                following_id__in=ids
+            ).values('user_id'),
+            is_deleted=False,
+        ).update(following_count=F('following_count') - count_of(
+            Subscription, 'user', following_id__in=ids
+        ))
+        CustomUser.objects.filter(
+            id__in=Subscription.objects.filter(
+                user_id__in=ids
+            ).values('following_id'),
+            is_deleted=False,
+        ).update(followers_count=F('followers_count') - count_of(
+            Subscription, 'following', user_id__in=ids
+        ))
+        schedule_purge()
+        # Подписчиков у популярного автора слишком много, чтобы сообщать
+        # о каждом: их число подписок обновится в кеше по истечении срока.
+        events.emit(events.USER, *ids, *Subscription.objects.filter(
+            user_id__in=ids
+        ).values_list('following_id', flat=True))
+    return len(ids)
+
+
+def delete_in_batches(queryset, before=None):
+    """Удаляет строки queryset пачками по PURGE_BATCH_SIZE, каждую в своей
+    транзакции.
+
+    Используется _raw_delete: один DELETE без загрузки объектов, каскада
+    и сигналов Django. Счётчики к этому моменту уже исправлены, а записи
+    об удалении создаёт before.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            pks = list(queryset.order_by().values_list(
+                'pk', flat=True
+            )[:settings.PURGE_BATCH_SIZE])
+            if not pks:
+                return deleted
+            batch = queryset.model.objects.filter(pk__in=pks)
+            if before is not None:
+                before(batch)
+            deleted += batch._raw_delete(DEFAULT_DB_ALIAS)
+
+
+def subscription_tombstones(batch):
+    # Подписчикам удалённого автора нужна запись об удалении подписки, а
+    # самим удалённым синхронизировать уже нечего.
+    rows = batch.filter(user__is_deleted=False).values_list(
+        'following_id', 'user_id'
+    )
+    changelog.record_rows(
+        ((Change.SUBSCRIPTION, following_id, user_id)
+         for following_id, user_id in rows),
+        deleted=True
+    )
+
+
+def deleted_ids(model):
+    """id помеченных строк пачками по возрастанию."""
+    last_id = 0
+    while True:
+        ids = list(
+            model.objects.filter(is_deleted=True, id__gt=last_id)
+            .order_by('id').values_list('id', flat=True)
+            [:settings.PURGE_BATCH_SIZE]
+        )
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def purge_recipes():
+    purged = 0
+    for ids in deleted_ids(Recipe):
+        for model in (IngredientInRecipe, Favorite, ShoppingCart):
+            delete_in_batches(model.objects.filter(recipe_id__in=ids))
+        # Записи об удалении рецептов появились, когда их пометили.
+        purged += delete_in_batches(
+            Recipe.objects.filter(id__in=ids, is_deleted=True)
+        )
+    return purged
+
+
+def purge_users():
+    purged = 0
+    for ids in deleted_ids(CustomUser):
+        # Рецепты помечаются вместе с автором, но автор мог быть удалён
+        # уже после purge_recipes.
+        purge_recipes()
+        for model in (Favorite, ShoppingCart, Subscription):
+            delete_in_batches(model.objects.filter(user_id__in=ids))
+        delete_in_batches(
+            Subscription.objects.filter(following_id__in=ids),
+            before=subscription_tombstones
+        )
+        # Большие связи уже удалены, остальное (токены, задачи, журнал
+        # админки) удаляет обычный каскад.
+        purged += CustomUser.objects.filter(
+            id__in=ids, is_deleted=True
+        ).delete()[1].get(CustomUser._meta.label, 0)
+    return purged
+
+
+def purge_deleted():
+    return {'recipes': purge_recipes(), 'users': purge_users()}
@@ -0,0 +1,87 @@
+"""События об изменении данных для производных представлений.
+
+Код записи вызывает emit(kind, *ids), подписчики получают множества id
+после коммита транзакции. Внутри запроса события копятся и рассылаются
+один раз в конце (EventBatchMiddleware), поэтому подписчик видит рецепт
+один раз, сколько бы раз его ни меняли за запрос.
+"""
+import contextvars
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+RECIPE = 'recipe'
+USER = 'user'
+INGREDIENT = 'ingredient'
+
+SUBSCRIBERS = defaultdict(list)
+
+_batch = contextvars.ContextVar('events_batch', default=None)
+
+
+def subscriber(*kinds):
+    """Подписывает функцию на события kinds.
+
+    Функция получает множество id изменённых объектов. Ошибка подписчика
+    пишется в лог и не мешает остальным.
+    """
+    def register(function):
+        for kind in kinds:
+            SUBSCRIBERS[kind].append(function)
+        return function
+    return register
+
+
+def emit(kind, *ids):
+    """Сообщает об изменении объектов после коммита текущей транзакции.
+
+    При откате транзакции событие не отправляется.
+    """
+    if ids:
+        transaction.on_commit(partial(committed, {(kind, pk) for pk in ids}))
+
+
+def committed(events):
+    pending = _batch.get()
+    if pending is not None:
+        pending.update(events)
+    else:
+        dispatch(events)
+
+
+def dispatch(events):
+    ids = defaultdict(set)
+    for kind, pk in events:
+        ids[kind].add(pk)
+    for kind, changed in ids.items():
+        for function in SUBSCRIBERS[kind]:
+            try:
+                function(changed)
+            except Exception:
+                logger.exception('Подписчик %s упал на событии %s',
+                                 function.__qualname__, kind)
+
+
+@contextmanager
+def batch(flush=False):
+    """Копит события до выхода из блока и рассылает их одним пакетом.
+
+    Вложенный блок добавляет события во внешний, а с flush=True рассылает
+    свои сам, не дожидаясь конца внешнего.
+    """
+    if _batch.get() is not None and not flush:
+        yield
+        return
+    pending = set()
+    token = _batch.set(pending)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+        if pending:
+            dispatch(pending)
@@ -0,0 +1,65 @@
+import fcntl
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+CHUNK_SIZE = 64 * 1024
+
+
+def write_atomic(path, content):
+    """Записывает файл целиком через временный файл и os.replace.
+
+    Имя временного файла уникально, поэтому одновременная запись из
+    нескольких потоков или процессов не смешивает содержимое.
+    """
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f'.{path.name}.',
+                                     delete=False) as temporary:
+        temporary.write(content)
+    try:
+        os.replace(temporary.name, path)
+    except OSError:
+        os.unlink(temporary.name)
+        raise
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    """Блокировка flock на файле path, общая между процессами.
+
+    Общих (shared) блокировок может быть сколько угодно, исключительная
+    ждёт, пока их все отпустят.
+    """
+    with open(path, 'ab') as file:
+        fcntl.flock(file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+class FileTooLarge(ValueError):
+    pass
+
+
+def save_stream(directory, stream, max_bytes):
+    """Копирует поток в новый файл каталога directory и возвращает имя
+    файла.
+
+    Если в потоке больше max_bytes байт, файл удаляется и выбрасывается
+    FileTooLarge.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+        try:
+            written = 0
+            while chunk := stream.read(CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise FileTooLarge(f'Файл больше {max_bytes} байт')
+                file.write(chunk)
+        except BaseException:
+            os.unlink(file.name)
+            raise
+    return Path(file.name).name
@@ -0,0 +1,282 @@
+"""Справочник ингредиентов в массивах NumPy, общий для всех процессов.
+
+Таблица собирается один раз в каталог версии внутри INGREDIENT_TABLE_DIR.
+Воркеры отображают файлы в память (mmap), поэтому страницы с названиями
+лежат в памяти в одном экземпляре, сколько бы воркеров ни было. После
+изменения ингредиентов таблица сбрасывается и пересобирается фоновой
+задачей, а пока её нет, данные читаются из базы.
+"""
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from api import events
+from api.files import write_atomic
+from recipes.models import Ingredient
+
+ARRAYS = ('ids', 'name_ptr', 'names', 'unit_of', 'unit_ptr', 'units',
+          'key_order', 'key_ptr', 'keys', 'rank')
+KEEP_VERSIONS = 2
+
+
+def table_dir():
+    return Path(settings.INGREDIENT_TABLE_DIR)
+
+
+def pointer_path():
+    return table_dir() / 'current'
+
+
+def stamp_path():
+    return table_dir() / 'stale'
+
+
+def stamp():
+    try:
+        return stamp_path().stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def current_version():
+    try:
+        return pointer_path().read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def pack(strings):
+    """Склеивает строки в один буфер UTF-8: строка i лежит в
+    buffer[ptr[i]:ptr[i + 1]]."""
+    encoded = [string.encode() for string in strings]
+    ptr = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=ptr[1:])
+    return ptr, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def make_arrays(rows):
+    """Строит таблицу по строкам (id, name, measurement_unit).
+
+    ids отсортированы для поиска по id, единицы измерения хранятся один
+    раз, а unit_of — номер единицы для каждой строки. keys — названия в
+    нижнем регистре по алфавиту для поиска по началу названия, key_order —
+    номера их строк.
+
+    rows приходят в порядке выдачи базы, rank — место строки в нём. По
+    rank сортируются результаты поиска: порядок байтов UTF-8 не совпадает
+    с правилами сравнения (collation) базы, например для «ё».
+    """
+    rows = list(rows)
+    rank_of = {pk: position for position, (pk, _, _) in enumerate(rows)}
+    rows = sorted(rows)
+    units = sorted({unit for _, _, unit in rows})
+    unit_numbers = {unit: number for number, unit in enumerate(units)}
+    name_ptr, names = pack([name for _, name, _ in rows])
+    unit_ptr, unit_bytes = pack(units)
+    keys = [name.lower() for _, name, _ in rows]
+    key_order = np.array(sorted(range(len(rows)), key=keys.__getitem__),
+                         dtype=np.int32)
+    key_ptr, key_bytes = pack([keys[row] for row in key_order.tolist()])
+    return {
+        'ids': np.array([pk for pk, _, _ in rows], dtype=np.int64),
+        'name_ptr': name_ptr,
+        'names': names,
+        'unit_of': np.array([unit_numbers[unit] for _, _, unit in rows],
+                            dtype=np.int32),
+        'unit_ptr': unit_ptr,
+        'units': unit_bytes,
+        'key_order': key_order,
+        'key_ptr': key_ptr,
+        'keys': key_bytes,
+        'rank': np.array([rank_of[pk] for pk, _, _ in rows], dtype=np.int32),
+    }
+
+
+def save_arrays(directory, arrays):
+    directory.mkdir(parents=True)
+    for name in ARRAYS:
+        np.save(directory / f'{name}.npy', arrays[name])
+
+
+def build_table():
+    """Собирает таблицу из базы и делает её текущей."""
+    directory = table_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    started = stamp()
+    # Читаем с основной БД: реплика может отставать от изменения, из-за
+    # которого таблицу пересобирают. Порядок строк — Ingredient.Meta.ordering,
+    # как у списка ингредиентов из базы.
+    rows = Ingredient.objects.using(DEFAULT_DB_ALIAS).values_list(
+        'id', 'name', 'measurement_unit'
+    )
+    version = str(time.time_ns())
+    temporary = directory / f'.{version}'
+    save_arrays(temporary, make_arrays(rows))
+    os.replace(temporary, directory / version)
+    write_atomic(pointer_path(), version.encode())
+    if stamp() != started:
+        # Ингредиенты поменялись во время сборки, таблицу пересоберёт
+        # задача, поставленная этим изменением.
+        pointer_path().unlink(missing_ok=True)
+    remove_old_versions(version)
+    return version
+
+
+def remove_old_versions(current):
+    versions = sorted(
+        (path for path in table_dir().iterdir()
+         if path.is_dir() and not path.name.startswith('.')),
+        key=lambda path: path.stat().st_mtime, reverse=True
+    )
+    stale = [path for path in versions if path.name != current]
+    for path in stale[KEEP_VERSIONS - 1:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def text(ptr, buffer, row):
+    return buffer[ptr[row]:ptr[row + 1]].tobytes().decode()
+
+
+class IngredientTable:
+    """Таблица одной версии, массивы отображаются в память с диска."""
+
+    def __init__(self, version):
+        self.version = version
+        self.path = table_dir() / version
+        for name in ARRAYS:
+            setattr(self, name,
+                    np.load(self.path / f'{name}.npy', mmap_mode='r'))
+        self.unit_names = tuple(
+            text(self.unit_ptr, self.units, number)
+            for number in range(len(self.unit_ptr) - 1)
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows_of(self, ingredient_ids):
+        """Номера строк для ingredient_ids, -1 для неизвестных id."""
+        ingredient_ids = np.asarray(ingredient_ids, dtype=np.int64)
+        rows = np.searchsorted(self.ids, ingredient_ids)
+        rows[rows >= len(self.ids)] = 0
+        if len(self.ids):
+            rows[self.ids[rows] != ingredient_ids] = -1
+        else:
+            rows[:] = -1
+        return rows
+
+    def row(self, row):
+        return (int(self.ids[row]), text(self.name_ptr, self.names, row),
+                self.unit_names[self.unit_of[row]])
+
+    def in_bulk(self, ingredient_ids):
+        """{id: Ingredient} без запроса к базе, как Manager.in_bulk()."""
+        ingredient_ids = list(ingredient_ids)
+        found = {}
+        for row in self.rows_of(ingredient_ids).tolist():
+            if row >= 0:
+                pk, name, unit = self.row(row)
+                ingredient = Ingredient(id=pk, name=name,
+                                        measurement_unit=unit)
+                ingredient._state.adding = False
+                found[pk] = ingredient
+        return found
+
+    def key(self, position):
+        return self.keys[self.key_ptr[position]:
+                         self.key_ptr[position + 1]].tobytes()
+
+    def lower_bound(self, prefix):
+        low, high = 0, len(self.key_order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.key(middle) < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def search(self, *prefixes):
+        """Строки {id, name, measurement_unit}, название которых без учёта
+        регистра начинается с каждого из prefixes.
+
+        Так же отбирает и упорядочивает строки SearchFilter с
+        search_fields = ('^name',) по queryset с Ingredient.Meta.ordering.
+        """
+        keys = [prefix.lower().encode() for prefix in prefixes]
+        longest = max(keys, key=len)
+        start = self.lower_bound(longest)
+        # Все ключи с этим началом идут подряд: конец диапазона — первый
+        # ключ больше longest + 0xFF, байта, которого нет в UTF-8.
+        end = self.lower_bound(longest + b'\xff')
+        rows = [
+            row
+            for position, row in enumerate(
+                self.key_order[start:end].tolist(), start
+            )
+            if all(self.key(position).startswith(key) for key in keys)
+        ]
+        found = [self.row(row)
+                 for row in sorted(rows, key=self.rank.__getitem__)]
+        return [
+            {'id': pk, 'name': name, 'measurement_unit': unit}
+            for pk, name, unit in found
+        ]
+
+    def names_of(self, ingredient_ids):
+        """Списки названий и единиц для ingredient_ids в том же порядке."""
+        rows = self.rows_of(ingredient_ids)
+        if (rows < 0).any():
+            raise KeyError('Ингредиента нет в таблице')
+        found = [self.row(row) for row in rows.tolist()]
+        return ([name for _, name, _ in found],
+                [unit for _, _, unit in found])
+
+
+_loaded = {'mtime': None, 'table': None}
+_loaded_lock = threading.Lock()
+
+
+def get_table():
+    """Текущая версия таблицы или None, если её нет или она устарела."""
+    try:
+        mtime = pointer_path().stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _loaded['mtime'] != mtime:
+        with _loaded_lock:
+            if _loaded['mtime'] != mtime:
+                version = current_version()
+                try:
+                    _loaded['table'] = version and IngredientTable(version)
+                except FileNotFoundError:
+                    # Таблица прежнего формата без какого-то из ARRAYS:
+                    # читаем из базы до пересборки.
+                    _loaded['table'] = None
+                _loaded['mtime'] = mtime
+    return _loaded['table']
+
+
+def invalidate_table():
+    """Сбрасывает таблицу и ставит её пересборку в очередь.
+
+    Ничего не делает, если таблицу ни разу не собирали.
+    """
+    if not table_dir().exists():
+        return
+    stamp_path().touch()
+    pointer_path().unlink(missing_ok=True)
+    from api.tasks import rebuild_ingredient_table
+    from jobs.queue import enqueue
+    enqueue(rebuild_ingredient_table, key=f'ingredient-table:{stamp()}')
+
+
+@events.subscriber(events.INGREDIENT)
+def ingredients_changed(ids):
+    invalidate_table()
@@ -0,0 +1,79 @@
+import json
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.benchmarks import (compare, ingredient_memory, json_codec,
+                            recipe_update, recipe_validation, runner, seed,
+                            serializers, shopping_list, similarity, startup)
+
+SUITES = {
+    'seed': seed,
+    'load': runner,
+    'compare': compare,
+    'ingredient-memory': ingredient_memory,
+    'json': json_codec,
+    'recipe-update': recipe_update,
+    'recipe-validation': recipe_validation,
+    'serializers': serializers,
+    'shopping-list': shopping_list,
+    'similar': similarity,
+    'startup': startup,
+}
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочные тесты и микробенчмарки API'
+
+    def add_arguments(self, parser):
+        suites = parser.add_subparsers(dest='suite', required=True)
+        for name, suite in SUITES.items():
+            suite_parser = suites.add_parser(name)
+            suite_parser.add_argument(
+                '--output', help='Сохранить результат в JSON-файл'
+            )
+            suite.add_arguments(suite_parser)
+
+    def handle(self, *args, **options):
+        suite = SUITES[options['suite']]
+        try:
+            result = suite.run(options, self.stdout)
+        except (ValueError, OSError) as error:
+            raise CommandError(error)
+        report = {
+            'suite': options['suite'],
+            'commit': current_commit(),
+            'created': timezone.now().isoformat(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'options': {
+                key: value for key, value in options.items()
+                if key not in ('stdout', 'stderr', 'skip_checks')
+                and isinstance(value, (str, int, float, bool, type(None)))
+            },
+            'result': result,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        self.print_result(suite, result)
+
+    def print_result(self, suite, result):
+        format_result = getattr(suite, 'format_result', None)
+        if format_result is None:
+            self.stdout.write(json.dumps(result, ensure_ascii=False,
+                                         indent=2))
+            return
+        for line in format_result(result):
+            self.stdout.write(line)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.catalog import build_catalog, catalog_dir
+
+
+class Command(BaseCommand):
+    help = ('Собирает статический каталог ингредиентов со сжатыми копиями '
+            'для раздачи через nginx')
+
+    def handle(self, *args, **options):
+        filename = build_catalog()
+        self.stdout.write(self.style.SUCCESS(
+            f'Каталог записан в {catalog_dir() / filename}'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.ingredient_table import build_table, table_dir
+
+
+class Command(BaseCommand):
+    help = ('Собирает таблицу ингредиентов, которую воркеры отображают в '
+            'общую память; дальше она пересобирается сама при изменениях')
+
+    def handle(self, *args, **options):
+        version = build_table()
+        self.stdout.write(self.style.SUCCESS(
+            f'Таблица записана в {table_dir() / version}'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.similarity import build_index, index_dir
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает индекс похожих рецептов по ингредиентам; '
+            'запускается периодически, например из cron')
+
+    def handle(self, *args, **options):
+        version = build_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс записан в {index_dir() / version}'
+        ))
@@ -0,0 +1,116 @@
+import json
+from urllib.parse import quote
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.benchmarks.runner import local_host
+from recipes.models import Favorite, Ingredient, Recipe
+from users.models import CustomUser
+
+
+def walk(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from walk(child)
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN (ANALYZE, BUFFERS) для SQL-запросов '
+            'основных эндпоинтов и отмечает последовательные сканирования')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int,
+                            help='id пользователя, от имени которого '
+                                 'выполняются запросы')
+        parser.add_argument('--min-rows', type=int, default=1000,
+                            help='Не отмечать Seq Scan по таблицам меньше '
+                                 'этого размера')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Команда работает только с PostgreSQL.')
+        user_id = options['user'] or (
+            Favorite.objects.order_by('id')
+            .values_list('user_id', flat=True).first()
+        )
+        user = CustomUser.objects.filter(id=user_id).first()
+        recipe = Recipe.objects.order_by('id').first()
+        if user is None or recipe is None:
+            raise CommandError('В базе нет пользователей с избранным.')
+        prefix = Ingredient.objects.values_list('name', flat=True).first()
+        endpoints = (
+            ('recipes:list', '/api/recipes/?limit=6'),
+            ('recipes:list:author',
+             f'/api/recipes/?author={recipe.author_id}&limit=6'),
+            ('recipes:list:is_favorited',
+             '/api/recipes/?is_favorited=1&limit=6'),
+            ('recipes:list:is_in_shopping_cart',
+             '/api/recipes/?is_in_shopping_cart=1&limit=6'),
+            ('recipes:retrieve', f'/api/recipes/{recipe.id}/'),
+            ('recipes:download_shopping_cart',
+             '/api/recipes/download_shopping_cart/'),
+            ('ingredients:search',
+             f'/api/ingredients/?name={quote((prefix or "")[:2])}'),
+            ('users:list', '/api/users/?limit=6'),
+            ('users:retrieve', f'/api/users/{recipe.author_id}/'),
+            ('users:subscriptions',
+             '/api/users/subscriptions/?limit=6&recipes_limit=3'),
+        )
+        client = APIClient(HTTP_HOST=local_host())
+        client.force_authenticate(user)
+        flagged = 0
+        for name, path in endpoints:
+            with CaptureQueriesContext(connection) as context:
+                client.get(path)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name} {path}'))
+            for query in context.captured_queries:
+                if query['sql'].lstrip().upper().startswith('SELECT'):
+                    flagged += self.explain(query['sql'], options)
+        if flagged:
+            self.stdout.write(self.style.WARNING(
+                f'Последовательных сканирований: {flagged}'
+            ))
+
+    def explain(self, sql, options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + sql
+            )
+            result = cursor.fetchone()[0]
+            transaction.set_rollback(True)
+        if isinstance(result, str):
+            result = json.loads(result)
+        plan = result[0]
+        root = plan['Plan']
+        self.stdout.write(
+            f'  {plan["Execution Time"]:8.2f} мс, '
+            f'buffers hit={root.get("Shared Hit Blocks", 0)} '
+            f'read={root.get("Shared Read Blocks", 0)}: {sql[:150]}'
+        )
+        flagged = 0
+        for node in walk(root):
+            if node['Node Type'] != 'Seq Scan':
+                continue
+            relation = node['Relation Name']
+            rows = self.table_rows(relation)
+            if rows < options['min_rows']:
+                continue
+            flagged += 1
+            self.stdout.write(self.style.WARNING(
+                f'    Seq Scan on {relation} (~{rows} строк), '
+                f'фильтр: {node.get("Filter", "-")}, '
+                f'отброшено строк: {node.get("Rows Removed by Filter", 0)}'
+            ))
+        return flagged
+
+    def table_rows(self, relation):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [relation]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else 0
@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.profiling import make_debug_token
+
+
+class Command(BaseCommand):
+    help = 'Выдаёт подписанное значение заголовка для профилирования запроса'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{settings.PROFILING_HEADER}: {make_debug_token()}')
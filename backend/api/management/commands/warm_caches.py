@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from api import recipe_cache
+from api.catalog import build_catalog, catalog_url
+from recipes.models import Favorite
+
+
+class Command(BaseCommand):
+    help = ('Заполняет кеш карточек самых популярных рецептов и собирает '
+            'каталог ингредиентов, например после деплоя')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000,
+                            help='Сколько рецептов с наибольшим числом '
+                                 'добавлений в избранное прогреть')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if settings.INGREDIENT_CATALOG_ENABLED and catalog_url() is None:
+            self.stdout.write(f'Каталог ингредиентов: {build_catalog()}')
+        if not settings.RECIPE_CACHE_ENABLED:
+            raise CommandError('Кеш карточек выключен: RECIPE_CACHE_ENABLED')
+        hottest = list(
+            Favorite.objects.filter(recipe__is_deleted=False)
+            .values('recipe_id').annotate(total=Count('id'))
+            .order_by('-total', 'recipe_id')
+            .values_list('recipe_id', flat=True)[:options['recipes']]
+        )
+        warmed = 0
+        for start in range(0, len(hottest), options['batch_size']):
+            warmed += len(recipe_cache.render(
+                hottest[start:start + options['batch_size']]
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогрето карточек рецептов: {warmed}'
+        ))
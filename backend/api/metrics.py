@@ -0,0 +1,262 @@
+"""Метрики запросов в формате Prometheus.
+
+Каждый воркер gunicorn копит метрики у себя и не реже раза в
+METRICS_FLUSH_INTERVAL секунд сбрасывает их в свой файл в METRICS_DIR.
+/metrics складывает файлы всех воркеров, поэтому ответ не зависит от того,
+какой воркер его отдал. Файлы завершившихся воркеров остаются, чтобы
+счётчики не убывали; каталог очищается при старте gunicorn.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304
+)
+
+_current_stats = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'query_time', 'serializer_time', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+
+def current_stats():
+    return _current_stats.get()
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current_stats.set(stats)
+
+
+def finish_request(token):
+    _current_stats.reset(token)
+
+
+def query_wrapper(execute, sql, params, many, context):
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_time += time.perf_counter() - start
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = defaultdict(self._new_series)
+
+    def _new_series(self):
+        return [[0] * (len(self.buckets) + 1), 0.0]
+
+    def observe(self, labels, value):
+        counts, _ = series = self._series[labels]
+        counts[bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def snapshot(self):
+        return [[labels, counts, total]
+                for labels, (counts, total) in self._series.items()]
+
+    def merge(self, snapshot):
+        for labels, counts, total in snapshot:
+            series = self._series[labels]
+            series[0] = [
+                mine + theirs for mine, theirs in zip(series[0], counts)
+            ]
+            series[1] += total
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else repr(float(bound))
+                yield (f'{self.name}_bucket'
+                       f'{format_labels(labels, le=le)} {cumulative}')
+            yield f'{self.name}_sum{format_labels(labels)} {total!r}'
+            yield f'{self.name}_count{format_labels(labels)} {cumulative}'
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._series = defaultdict(int)
+
+    def inc(self, labels, value=1):
+        self._series[labels] += value
+
+    def snapshot(self):
+        return [[labels, value] for labels, value in self._series.items()]
+
+    def merge(self, snapshot):
+        for labels, value in snapshot:
+            self._series[labels] += value
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        for labels, value in sorted(self._series.items()):
+            yield f'{self.name}{format_labels(labels)} {value}'
+
+
+def escape_label(value):
+    return (str(value).replace('\\', '\\\\')
+            .replace('\n', '\\n').replace('"', '\\"'))
+
+
+def format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    body = ','.join(f'{key}="{escape_label(value)}"' for key, value in pairs)
+    return '{' + body + '}'
+
+
+def labels_from_json(labels):
+    return tuple(tuple(pair) for pair in labels)
+
+
+def metrics_dir():
+    return Path(settings.METRICS_DIR)
+
+
+def clear_metrics_dir():
+    directory = metrics_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.glob('*.json'):
+        path.unlink(missing_ok=True)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flushed = 0.0
+        self.requests = Counter(
+            'foodgram_http_requests_total',
+            'Количество обработанных запросов.'
+        )
+        self.latency = Histogram(
+            'foodgram_http_request_duration_seconds',
+            'Время обработки запроса.',
+            LATENCY_BUCKETS
+        )
+        self.response_size = Histogram(
+            'foodgram_http_response_size_bytes',
+            'Размер тела ответа.',
+            SIZE_BUCKETS
+        )
+        self.db_queries = Histogram(
+            'foodgram_db_queries_per_request',
+            'Количество SQL-запросов за один запрос.',
+            QUERY_COUNT_BUCKETS
+        )
+        self.db_time = Histogram(
+            'foodgram_db_query_duration_seconds',
+            'Суммарное время SQL-запросов за один запрос.',
+            LATENCY_BUCKETS
+        )
+        self.serializer_time = Histogram(
+            'foodgram_serializer_duration_seconds',
+            'Время сериализации ответа.',
+            LATENCY_BUCKETS
+        )
+
+    def record(self, labels, status, duration, size, stats):
+        with self._lock:
+            self.requests.inc(labels + (('status', str(status)),))
+            self.latency.observe(labels, duration)
+            if size is not None:
+                self.response_size.observe(labels, size)
+            self.db_queries.observe(labels, stats.queries)
+            self.db_time.observe(labels, stats.query_time)
+            self.serializer_time.observe(labels, stats.serializer_time)
+        if time.monotonic() - self._flushed >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    @property
+    def metrics(self):
+        return (self.requests, self.latency, self.response_size,
+                self.db_queries, self.db_time, self.serializer_time)
+
+    def flush(self):
+        """Записывает метрики воркера в METRICS_DIR/<pid>.json."""
+        with self._lock:
+            self._flushed = time.monotonic()
+            content = json.dumps(
+                [metric.snapshot() for metric in self.metrics]
+            ).encode()
+        directory = metrics_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{os.getpid()}.json'
+        temporary = path.with_name(f'.{path.name}.{threading.get_ident()}')
+        temporary.write_bytes(content)
+        os.replace(temporary, path)
+
+    def render(self):
+        """Метрики всех воркеров, включая текущий."""
+        self.flush()
+        merged = Registry()
+        for path in metrics_dir().glob('*.json'):
+            try:
+                snapshots = json.loads(path.read_bytes())
+            except (FileNotFoundError, ValueError):
+                continue
+            for metric, snapshot in zip(merged.metrics, snapshots):
+                metric.merge(
+                    [labels_from_json(labels), *values]
+                    for labels, *values in snapshot
+                )
+        lines = []
+        for metric in merged.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class InstrumentedSerializerMixin:
+    def to_representation(self, instance):
+        stats = _current_stats.get()
+        if stats is None or stats.serializing:
+            return super().to_representation(instance)
+        stats.serializing = True
+        start = time.perf_counter()
+        query_time = stats.query_time
+        try:
+            return super().to_representation(instance)
+        finally:
+            # SQL из SerializerMethodField уже учтён во времени запросов.
+            stats.serializer_time += (
+                time.perf_counter() - start
+                - (stats.query_time - query_time)
+            )
+            stats.serializing = False
@@ -0,0 +1,221 @@
+import cProfile
+import gzip
+import random
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.middleware.clickjacking import XFrameOptionsMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from api import events, metrics, profiling
+
+ACCEPTS_BROTLI = re.compile(r'\bbr\b')
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+def view_labels(request, view_func):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        view_class = getattr(view_func, 'view_class', None)
+    initkwargs = getattr(view_func, 'initkwargs', None) or {}
+    view = initkwargs.get('basename') or (
+        view_class.__name__ if view_class else view_func.__name__
+    )
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return (('view', view), ('action', action), ('method', request.method))
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats, token = metrics.start_request()
+        request.metrics_labels = None
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.query_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        duration = time.perf_counter() - start
+        labels = request.metrics_labels
+        if labels is None:
+            labels = (('view', 'unresolved'), ('action', 'none'),
+                      ('method', request.method))
+        size = None if response.streaming else len(response.content)
+        metrics.registry.record(
+            labels, response.status_code, duration, size, stats
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_labels = view_labels(request, view_func)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.store = profiling.ProfileStore()
+
+    def __call__(self, request):
+        if not request.path_info.startswith(settings.PROFILING_PATH_PREFIX):
+            return self.get_response(request)
+        token = request.headers.get(settings.PROFILING_HEADER)
+        forced = bool(token) and profiling.is_valid_debug_token(token)
+        if not forced and random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # В этом потоке уже работает другой профилировщик.
+            profiler = None
+        sql_log = profiling.SQLLog()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sql_log))
+                response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        if forced or duration_ms >= settings.PROFILING_SLOW_MS:
+            self.store.save({
+                'created': timezone.now().isoformat(),
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'duration_ms': duration_ms,
+                'forced': forced,
+                'sql_count': len(sql_log.entries),
+                'sql_time_ms': sql_log.total_ms,
+                'sql': sql_log.entries,
+                'profile': (profiling.format_profile(profiler)
+                            if profiler is not None else ''),
+            })
+        return response
+
+
+class EventBatchMiddleware:
+    """Рассылает события об изменениях один раз в конце запроса."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with events.batch():
+            return self.get_response(request)
+
+
+class CompressionMiddleware:
+    """Сжимает JSON-ответы больше COMPRESSION_MIN_SIZE в brotli или gzip."""
+
+    def __init__(self, get_response):
+        if not settings.COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.streaming
+                or response.has_header('Content-Encoding')
+                or not response.get('Content-Type', '').startswith(
+                    'application/json')
+                or len(response.content) < settings.COMPRESSION_MIN_SIZE):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is not None and ACCEPTS_BROTLI.search(accept_encoding):
+            encoding = 'br'
+            content = brotli.compress(
+                response.content, mode=brotli.MODE_TEXT,
+                quality=settings.COMPRESSION_BROTLI_QUALITY
+            )
+        elif ACCEPTS_GZIP.search(accept_encoding):
+            encoding = 'gzip'
+            content = gzip.compress(
+                response.content,
+                compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0
+            )
+        else:
+            return response
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        # Как в GZipMiddleware: сжатое тело уже не побайтно то же самое.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+def is_api(request):
+    return request.path_info.startswith(settings.API_PATH_PREFIX)
+
+
+class WebOnlyMixin:
+    """Пропускает middleware для запросов к API.
+
+    API авторизуется только токеном, поэтому сессии, CSRF, сообщения и
+    X-Frame-Options нужны лишь админке.
+    """
+
+    def __call__(self, request):
+        if is_api(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class WebSessionMiddleware(WebOnlyMixin, SessionMiddleware):
+    pass
+
+
+class WebCsrfViewMiddleware(WebOnlyMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_api(request):
+            return None
+        return super().process_view(
+            request, callback, callback_args, callback_kwargs
+        )
+
+
+class WebAuthenticationMiddleware(WebOnlyMixin, AuthenticationMiddleware):
+    pass
+
+
+class WebMessageMiddleware(WebOnlyMixin, MessageMiddleware):
+    pass
+
+
+class WebXFrameOptionsMiddleware(WebOnlyMixin, XFrameOptionsMiddleware):
+    pass
@@ -0,0 +1,118 @@
+import io
+import json
+import os
+import pstats
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+SIGNING_SALT = 'api.profiling'
+PROFILE_LINES = 60
+
+
+def make_debug_token():
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('profile')
+
+
+def is_valid_debug_token(value):
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            value, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def format_profile(profiler):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return stream.getvalue()
+
+
+class SQLLog:
+    def __init__(self):
+        self.entries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.entries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'params': repr(params)[:500],
+                'time_ms': (time.perf_counter() - start) * 1000,
+            })
+
+    @property
+    def total_ms(self):
+        return sum(entry['time_ms'] for entry in self.entries)
+
+
+class ProfileStore:
+    def __init__(self, directory=None, max_files=None):
+        self.directory = Path(directory or settings.PROFILING_DIR)
+        self.max_files = max_files or settings.PROFILING_MAX_FILES
+
+    def save(self, capture):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        capture_id = '{:010d}-{}'.format(
+            int(capture['duration_ms']), uuid.uuid4().hex
+        )
+        capture['id'] = capture_id
+        path = self.directory / f'{capture_id}.json'
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(capture, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.rotate()
+        return capture_id
+
+    def rotate(self):
+        files = sorted(self._files(), key=self._mtime)
+        for path in files[:max(len(files) - self.max_files, 0)]:
+            path.unlink(missing_ok=True)
+
+    def slowest(self, limit=50):
+        files = sorted(self._files(), key=lambda path: path.name,
+                       reverse=True)
+        captures = []
+        for path in files[:limit]:
+            capture = self._read(path)
+            if capture is not None:
+                capture.pop('profile', None)
+                capture.pop('sql', None)
+                captures.append(capture)
+        return captures
+
+    def get(self, capture_id):
+        path = self.directory / f'{capture_id}.json'
+        if path.parent != self.directory or not path.exists():
+            return None
+        return self._read(path)
+
+    def _files(self):
+        if not self.directory.exists():
+            return []
+        return list(self.directory.glob('*.json'))
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return path.stat().st_mtime
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
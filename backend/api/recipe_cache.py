@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpRequest
+
+from api import events
+from api.serializers import RecipeReadSerializer
+from recipes.models import Recipe
+
+INGREDIENTS_KEY = 'recipe-cache:ingredients'
+
+
+def recipe_key(recipe_id):
+    return f'recipe-cache:{recipe_id}'
+
+
+def recipe_generation_key(recipe_id):
+    return f'recipe-cache:recipe:{recipe_id}'
+
+
+def author_generation_key(user_id):
+    return f'recipe-cache:author:{user_id}'
+
+
+def generations(keys):
+    found = cache.get_many(keys)
+    return tuple(found.get(key, 0) for key in keys)
+
+
+def generation_keys(recipe_id, author_id):
+    return (recipe_generation_key(recipe_id), author_generation_key(author_id),
+            INGREDIENTS_KEY)
+
+
+def get(recipe_id):
+    """Карточка рецепта для анонимного пользователя или None.
+
+    Запись действительна, пока не сменилось поколение рецепта, его автора
+    (счётчики, аватар) и справочника ингредиентов.
+    """
+    entry = cache.get(recipe_key(recipe_id))
+    if entry is None:
+        return None
+    author_id, stored, data = entry
+    if generations(generation_keys(recipe_id, author_id)) != stored:
+        return None
+    return data
+
+
+def render(recipe_ids):
+    """Рендерит рецепты для анонимного пользователя, кладёт их в кеш и
+    возвращает {id: данные}. Удалённых и несуществующих рецептов в ответе
+    нет.
+
+    Чтение идёт с основной базы: реплика может ещё не видеть изменения,
+    из-за которого запись сбросили.
+    """
+    recipe_ids = list(recipe_ids)
+    # Поколения рецептов читаются до самих рецептов: правка, закоммиченная
+    # между чтениями, не попадёт в кеш под новым поколением. Автор
+    # известен только после чтения, его данные могут отстать не дольше
+    # RECIPE_CACHE_TTL.
+    found = cache.get_many(
+        [recipe_generation_key(pk) for pk in recipe_ids] + [INGREDIENTS_KEY]
+    )
+    request = HttpRequest()
+    request.user = AnonymousUser()
+    recipes = list(RecipeReadSerializer.prepare_queryset(
+        Recipe.objects.using(DEFAULT_DB_ALIAS).filter(
+            id__in=recipe_ids, is_deleted=False
+        ),
+        request,
+    ))
+    found.update(cache.get_many(
+        [author_generation_key(recipe.author_id) for recipe in recipes]
+    ))
+    rendered = {}
+    entries = {}
+    for recipe in recipes:
+        data = RecipeReadSerializer(recipe).data
+        rendered[recipe.id] = data
+        entries[recipe_key(recipe.id)] = (
+            recipe.author_id,
+            tuple(found.get(key, 0)
+                  for key in generation_keys(recipe.id, recipe.author_id)),
+            data,
+        )
+    cache.set_many(entries, settings.RECIPE_CACHE_TTL)
+    return rendered
+
+
+def bump(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Поколения живут без срока, иначе запись со старым
+            # поколением снова стала бы действительной.
+            cache.add(key, 1, None)
+
+
+@events.subscriber(events.RECIPE)
+def recipes_changed(ids):
+    if settings.RECIPE_CACHE_ENABLED:
+        bump(recipe_generation_key(recipe_id) for recipe_id in ids)
+
+
+@events.subscriber(events.USER)
+def users_changed(ids):
+    if settings.RECIPE_CACHE_ENABLED:
+        bump(author_generation_key(user_id) for user_id in ids)
+
+
+@events.subscriber(events.INGREDIENT)
+def ingredients_changed(ids):
+    if settings.RECIPE_CACHE_ENABLED:
+        bump((INGREDIENTS_KEY,))
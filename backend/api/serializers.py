@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Value
 from django.contrib.auth import get_user_model
+from django.urls import reverse
 from drf_extra_fields.fields import Base64ImageField
 from djoser.serializers import UserSerializer
 from recipes.models import (
@@ -11,10 +13,14 @@ from recipes.models import (
     ShoppingCart
 )
 from users.models import Subscription, CustomUser
+from jobs.models import Job
+from api import events
+from api.ingredient_table import get_table
+from api.metrics import InstrumentedSerializerMixin
 
 User = get_user_model()
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(InstrumentedSerializerMixin, UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = serializers.SerializerMethodField()
     first_name = serializers.CharField(required=True)
@@ -23,7 +29,8 @@ class CustomUserSerializer(UserSerializer):
     class Meta(UserSerializer.Meta):
         model = CustomUser
         fields = ('id', 'email', 'username', 'first_name',
-                  'last_name', 'avatar', 'is_subscribed')
+                  'last_name', 'avatar', 'is_subscribed', 'recipes_count',
+                  'followers_count', 'following_count')
 
     def get_is_subscribed(self, obj):
         user = self.context.get('request').user
@@ -37,7 +44,8 @@ class CustomUserSerializer(UserSerializer):
         return None
 
 
-class AvatarSerializer(serializers.ModelSerializer):
+class AvatarSerializer(InstrumentedSerializerMixin,
+                       serializers.ModelSerializer):
     avatar = Base64ImageField(required=True)
 
     class Meta:
@@ -56,13 +64,15 @@ class AvatarSerializer(serializers.ModelSerializer):
         return instance
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+class ShortRecipeSerializer(InstrumentedSerializerMixin,
+                            serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time',)
 
 
-class SubscriptionUserSerializer(serializers.ModelSerializer):
+class SubscriptionUserSerializer(InstrumentedSerializerMixin,
+                                 serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.SerializerMethodField()
@@ -83,26 +93,45 @@ class SubscriptionUserSerializer(serializers.ModelSerializer):
             limit = int(request.query_params.get('recipes_limit'))
         except (ValueError, TypeError):
             limit = None
-        recipes = obj.recipes.all()
+        recipes = obj.recipes.filter(is_deleted=False)
         if limit:
             recipes = recipes[:limit]
         return ShortRecipeSerializer(recipes, many=True, context=self.context).data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(InstrumentedSerializerMixin,
+                           serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = '__all__'
         read_only_fields = ('id',)
 
 
-class IngredientInRecipeSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source='ingredient'
-    )
+class IngredientInRecipeListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        table = get_table()
+        ingredients = (table or Ingredient.objects).in_bulk(
+            {item['ingredient_id'] for item in items}
+        )
+        missing = sorted(
+            {item['ingredient_id'] for item in items} - ingredients.keys()
+        )
+        if missing:
+            raise serializers.ValidationError(
+                'Ингредиенты не найдены: '
+                + ', '.join(str(ingredient_id) for ingredient_id in missing)
+            )
+        for item in items:
+            item['ingredient'] = ingredients[item.pop('ingredient_id')]
+        return items
+
+
+class IngredientInRecipeSerializer(InstrumentedSerializerMixin,
+                                   serializers.ModelSerializer):
+    id = serializers.IntegerField(source='ingredient_id')
     name = serializers.CharField(source='ingredient.name', read_only=True)
     measurement_unit = serializers.CharField(
         source='ingredient.measurement_unit',
@@ -112,14 +141,18 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = IngredientInRecipe
         fields = ('id', 'name', 'measurement_unit', 'amount')
+        list_serializer_class = IngredientInRecipeListSerializer
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(InstrumentedSerializerMixin,
+                       serializers.ModelSerializer):
     ingredients = IngredientInRecipeSerializer(
         source='ingredient_amounts',
         many=True
     )
     author = CustomUserSerializer(read_only=True)
+    # Файл сохраняется в запросе: ответ отдаёт его URL, и к этому моменту
+    # файл уже должен быть в хранилище.
     image = Base64ImageField(required=False)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
@@ -138,6 +171,9 @@ class RecipeSerializer(serializers.ModelSerializer):
         ingredient_data = validated_data.pop('ingredient_amounts')
         recipe = Recipe.objects.create(**validated_data)
         self._set_ingredients(recipe, ingredient_data)
+        events.emit(events.RECIPE, recipe.id)
+        # У автора изменилось число рецептов.
+        events.emit(events.USER, recipe.author_id)
         return recipe
 
     @transaction.atomic
@@ -147,8 +183,8 @@ class RecipeSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         instance.save()
         if ingredient_data is not None:
-            instance.ingredient_amounts.all().delete()
-            self._set_ingredients(instance, ingredient_data)
+            self._update_ingredients(instance, ingredient_data)
+        events.emit(events.RECIPE, instance.id)
         return instance
 
     def _set_ingredients(self, recipe, ingredient_data):
@@ -161,6 +197,32 @@ class RecipeSerializer(serializers.ModelSerializer):
             for ingredient_data in ingredient_data
         ])
 
+    def _update_ingredients(self, recipe, ingredient_data):
+        existing = {
+            row.ingredient_id: row for row in recipe.ingredient_amounts.all()
+        }
+        changed = []
+        added = []
+        for item in ingredient_data:
+            row = existing.pop(item['ingredient'].id, None)
+            if row is None:
+                added.append(IngredientInRecipe(
+                    recipe=recipe,
+                    ingredient=item['ingredient'],
+                    amount=item['amount']
+                ))
+            elif row.amount != item['amount']:
+                row.amount = item['amount']
+                changed.append(row)
+        if existing:
+            IngredientInRecipe.objects.filter(
+                id__in=[row.id for row in existing.values()]
+            ).delete()
+        if changed:
+            IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        if added:
+            IngredientInRecipe.objects.bulk_create(added)
+
     def validate_image(self, value):
         if not value:
             raise serializers.ValidationError('У рецепта должна быть картинка')
@@ -218,3 +280,151 @@ class RecipeSerializer(serializers.ModelSerializer):
         representation = super().to_representation(instance)
         representation['image'] = instance.image.url
         return representation
+
+
+def file_url(file, request=None):
+    if not file:
+        return None
+    if request is None:
+        return file.url
+    return request.build_absolute_uri(file.url)
+
+
+def subscribed_to(user, outer_ref):
+    if user.is_anonymous:
+        return Value(False)
+    return Exists(Subscription.objects.filter(user=user, following=outer_ref))
+
+
+def in_user_list(model, user):
+    if user.is_anonymous:
+        return Value(False)
+    return Exists(model.objects.filter(user=user, recipe=OuterRef('pk')))
+
+
+class IngredientReadSerializer(InstrumentedSerializerMixin,
+                               serializers.BaseSerializer):
+    """Список ингредиентов из строк .values() без ModelSerializer."""
+
+    @staticmethod
+    def prepare_queryset(queryset, request):
+        return queryset.values('id', 'name', 'measurement_unit')
+
+    def to_representation(self, row):
+        return row
+
+
+class RecipeReadSerializer(InstrumentedSerializerMixin,
+                           serializers.BaseSerializer):
+    """Ответ RecipeSerializer для списка и карточки рецепта.
+
+    Флаги и ингредиенты берутся из аннотаций и prefetch, которые
+    добавляет prepare_queryset, поэтому запросов на объект нет.
+    """
+
+    @staticmethod
+    def prepare_queryset(queryset, request):
+        return queryset.select_related('author').prefetch_related(
+            'ingredient_amounts__ingredient'
+        ).annotate(
+            is_favorited=in_user_list(Favorite, request.user),
+            is_in_shopping_cart=in_user_list(ShoppingCart, request.user),
+            author_is_subscribed=subscribed_to(request.user,
+                                               OuterRef('author')),
+        )
+
+    def to_representation(self, recipe):
+        author = recipe.author
+        return {
+            'id': recipe.id,
+            'author': {
+                'id': author.id,
+                'email': author.email,
+                'username': author.username,
+                'first_name': author.first_name,
+                'last_name': author.last_name,
+                'avatar': file_url(author.avatar),
+                'is_subscribed': recipe.author_is_subscribed,
+                'recipes_count': author.recipes_count,
+                'followers_count': author.followers_count,
+                'following_count': author.following_count,
+            },
+            'ingredients': [
+                {
+                    'id': amount.ingredient_id,
+                    'name': amount.ingredient.name,
+                    'measurement_unit': amount.ingredient.measurement_unit,
+                    'amount': amount.amount,
+                }
+                for amount in recipe.ingredient_amounts.all()
+            ],
+            'is_favorited': recipe.is_favorited,
+            'is_in_shopping_cart': recipe.is_in_shopping_cart,
+            'name': recipe.name,
+            'image': recipe.image.url,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        }
+
+
+class SubscriptionReadSerializer(InstrumentedSerializerMixin,
+                                 serializers.BaseSerializer):
+    """Ответ SubscriptionUserSerializer для списка подписок.
+
+    Рецепты подгружаются одним prefetch с ограничением recipes_limit.
+    """
+
+    @staticmethod
+    def prepare_queryset(queryset, request):
+        try:
+            limit = int(request.query_params.get('recipes_limit'))
+        except (ValueError, TypeError):
+            limit = None
+        recipes = Recipe.objects.filter(is_deleted=False).only(
+            'id', 'name', 'image', 'cooking_time', 'author_id'
+        )
+        if limit and limit > 0:
+            recipes = recipes[:limit]
+        return queryset.prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
+
+    def to_representation(self, user):
+        request = self.context.get('request')
+        return {
+            'email': user.email,
+            'id': user.id,
+            'username': user.username,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'is_subscribed': True,
+            'recipes': [
+                {
+                    'id': recipe.id,
+                    'name': recipe.name,
+                    'image': file_url(recipe.image, request),
+                    'cooking_time': recipe.cooking_time,
+                }
+                for recipe in user.limited_recipes
+            ],
+            'recipes_count': user.recipes_count,
+            'avatar': file_url(user.avatar, request),
+        }
+
+
+class JobSerializer(InstrumentedSerializerMixin,
+                    serializers.ModelSerializer):
+    url = serializers.HyperlinkedIdentityField(view_name='jobs-detail')
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ('id', 'url', 'name', 'status', 'attempts', 'created_at',
+                  'started_at', 'finished_at', 'download_url')
+
+    def get_download_url(self, obj):
+        if obj.status != Job.SUCCEEDED or 'content' not in (obj.result or {}):
+            return None
+        return self.context['request'].build_absolute_uri(
+            reverse('jobs-download', args=(obj.pk,))
+        )
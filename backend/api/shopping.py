@@ -0,0 +1,99 @@
+import csv
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F, Sum
+
+from api.ingredient_table import get_table
+from recipes.models import IngredientInRecipe
+
+FILENAME = 'shopping_list.txt'
+
+
+@lru_cache(maxsize=None)
+def unit_conversions(path=None):
+    """Единица -> (базовая единица, сколько базовых в одной)."""
+    path = path or settings.DATA_DIR / 'unit_conversions.csv'
+    try:
+        with open(path, encoding='utf-8', newline='') as file:
+            return {
+                unit.strip(): (base.strip(), float(factor))
+                for unit, base, factor in csv.reader(file)
+            }
+    except FileNotFoundError:
+        return {}
+
+
+def cart_totals(user_id):
+    """Суммы по ингредиентам корзины с учётом порций, по алфавиту."""
+    carted = IngredientInRecipe.objects.filter(recipe__in_cart__user=user_id,
+                                               recipe__is_deleted=False)
+    table = get_table()
+    if table is not None:
+        # Названия берутся из общей таблицы, база только суммирует по id
+        # без соединения с ингредиентами.
+        totals = list(
+            carted.values('ingredient_id')
+            .annotate(total=Sum(F('amount') * F('recipe__in_cart__servings')))
+            .order_by().values_list('ingredient_id', 'total')
+        )
+        try:
+            names, units = table.names_of(
+                [ingredient_id for ingredient_id, _ in totals]
+            )
+        except KeyError:
+            pass
+        else:
+            return sorted(zip(names, units,
+                              (total for _, total in totals)))
+    return list(
+        carted.values('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(total=Sum(F('amount') * F('recipe__in_cart__servings')))
+        .order_by('ingredient__name')
+        .values_list('ingredient__name', 'ingredient__measurement_unit',
+                     'total')
+    )
+
+
+def normalize(totals, units, conversions):
+    """Переводит количества в самую крупную совместимую единицу.
+
+    Выбирается единица, в которой количество не меньше единицы и
+    записывается не больше чем двумя знаками после запятой.
+    Возвращает (amounts, units).
+    """
+    own = [conversions.get(unit, (unit, 1.0)) for unit in units]
+    base_units = np.array([base for base, _ in own], dtype=object)
+    base_totals = np.asarray(totals, dtype=np.float64) * np.array(
+        [factor for _, factor in own]
+    )
+    amounts = base_totals.copy()
+    result_units = base_units.copy()
+    for unit, (base, factor) in sorted(conversions.items(),
+                                       key=lambda item: item[1][1]):
+        converted = base_totals / factor
+        cents = converted * 100
+        better = ((base_units == base) & (converted >= 1)
+                  & (np.abs(cents - np.round(cents)) < 1e-6))
+        amounts[better] = converted[better]
+        result_units[better] = unit
+    return amounts, result_units
+
+
+def format_amount(amount):
+    if amount == int(amount):
+        return str(int(amount))
+    return f'{amount:.2f}'.rstrip('0')
+
+
+def shopping_list(user_id):
+    rows = cart_totals(user_id)
+    if not rows:
+        return ''
+    names, units, totals = zip(*rows)
+    amounts, units = normalize(totals, units, unit_conversions())
+    return '\n'.join(
+        f'{name} ({unit}) - {format_amount(amount)}'
+        for name, unit, amount in zip(names, units, amounts.tolist())
+    )
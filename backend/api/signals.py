@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api import changelog, events
+from recipes.models import Change, Favorite, Ingredient, Recipe, ShoppingCart
+from users.models import CustomUser, Subscription
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    events.emit(events.INGREDIENT, instance.id)
+
+
+# Запись журнала изменений для объекта: (тип, id объекта, владелец).
+CHANGE_KEYS = {
+    Recipe: lambda recipe: (Change.RECIPE, recipe.id, None),
+    Favorite: lambda favorite: (Change.FAVORITE, favorite.recipe_id,
+                                favorite.user_id),
+    ShoppingCart: lambda item: (Change.SHOPPING_CART, item.recipe_id,
+                                item.user_id),
+    Subscription: lambda subscription: (Change.SUBSCRIPTION,
+                                        subscription.following_id,
+                                        subscription.user_id),
+}
+
+
+def cascaded(instance, origin):
+    # Об удалении рецепта клиент узнаёт из его записи и удаляет связанные
+    # объекты сам, а удалённому владельцу синхронизировать уже нечего.
+    if isinstance(origin, Recipe):
+        return True
+    return isinstance(origin, CustomUser) and origin.pk == instance.user_id
+
+
+def object_saved(sender, instance, **kwargs):
+    changelog.record_rows([CHANGE_KEYS[sender](instance)])
+
+
+def object_deleted(sender, instance, origin=None, **kwargs):
+    if sender is Recipe or not cascaded(instance, origin):
+        changelog.record_rows([CHANGE_KEYS[sender](instance)], deleted=True)
+
+
+for model in CHANGE_KEYS:
+    post_save.connect(object_saved, sender=model)
+    post_delete.connect(object_deleted, sender=model)
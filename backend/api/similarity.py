@@ -0,0 +1,289 @@
+import json
+import os
+import shutil
+import threading
+import time
+from itertools import chain
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from api import events
+from api.files import file_lock, write_atomic
+from recipes.models import IngredientInRecipe
+
+ARRAYS = ('recipe_ids', 'sizes', 'ingredient_ptr', 'postings')
+DELTA = 'delta.jsonl'
+LOCK = 'delta.lock'
+KEEP_VERSIONS = 2
+
+
+def index_dir():
+    return Path(settings.SIMILARITY_INDEX_DIR)
+
+
+def pointer_path():
+    return index_dir() / 'current'
+
+
+def delta_lock(shared=False):
+    """Запись в журнал (shared) не пересекается с переключением версии:
+    иначе строка, дописанная в журнал прежней версии после переноса его
+    хвоста, потеряется."""
+    directory = index_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    return file_lock(directory / LOCK, shared)
+
+
+def current_version():
+    try:
+        return pointer_path().read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def make_arrays(pairs):
+    """Строит инвертированный индекс по парам (recipe_id, ingredient_id).
+
+    recipe_ids — отсортированные id рецептов, sizes — число ингредиентов
+    в каждом, postings[ingredient_ptr[i]:ingredient_ptr[i + 1]] — номера
+    строк рецептов с ингредиентом i.
+    """
+    recipe_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+    ingredients = pairs[:, 1]
+    order = np.lexsort((rows, ingredients))
+    ingredient_ptr = np.zeros(
+        int(ingredients.max()) + 2 if len(ingredients) else 1, dtype=np.int64
+    )
+    np.cumsum(np.bincount(ingredients, minlength=len(ingredient_ptr) - 1),
+              out=ingredient_ptr[1:])
+    sizes = np.bincount(rows, minlength=len(recipe_ids)).astype(np.int32)
+    return {
+        'recipe_ids': recipe_ids,
+        'sizes': sizes,
+        'ingredient_ptr': ingredient_ptr,
+        'postings': rows[order].astype(np.int32),
+    }
+
+
+def save_arrays(directory, arrays):
+    directory.mkdir(parents=True)
+    for name in ARRAYS:
+        np.save(directory / f'{name}.npy', arrays[name])
+
+
+def build_index():
+    """Пересобирает индекс из базы и делает его текущим.
+
+    Изменения, записанные в журнал прежней версии во время сборки,
+    переносятся в журнал новой. Переключение и перенос идут под
+    delta_lock, поэтому запись в прежний журнал после переноса
+    невозможна.
+    """
+    directory = index_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = current_version()
+    offset = delta_size(previous)
+    rows = (
+        IngredientInRecipe.objects.using(DEFAULT_DB_ALIAS).order_by()
+        .values_list('recipe_id', 'ingredient_id').iterator(chunk_size=50000)
+    )
+    pairs = np.fromiter(chain.from_iterable(rows), dtype=np.int64)
+    version = str(time.time_ns())
+    temporary = directory / f'.{version}'
+    save_arrays(temporary, make_arrays(pairs.reshape(-1, 2)))
+    (temporary / DELTA).touch()
+    os.replace(temporary, directory / version)
+    with delta_lock():
+        write_atomic(pointer_path(), version.encode())
+        if previous is not None:
+            with open(directory / previous / DELTA, 'rb') as source:
+                source.seek(offset)
+                tail = source.read()
+            if tail:
+                with open(directory / version / DELTA, 'ab') as target:
+                    target.write(tail)
+    remove_old_versions(version)
+    return version
+
+
+def remove_old_versions(current):
+    versions = sorted(
+        (path for path in index_dir().iterdir()
+         if path.is_dir() and not path.name.startswith('.')),
+        key=lambda path: path.stat().st_mtime, reverse=True
+    )
+    stale = [path for path in versions if path.name != current]
+    for path in stale[KEEP_VERSIONS - 1:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def delta_size(version):
+    if version is None:
+        return 0
+    try:
+        return (index_dir() / version / DELTA).stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+class SimilarityIndex:
+    """Индекс одной версии: массивы отображаются в память с диска и
+    разделяются всеми процессами, журнал изменений дочитывается по мере
+    роста."""
+
+    def __init__(self, version):
+        self.version = version
+        self.path = index_dir() / version
+        for name in ARRAYS:
+            setattr(self, name,
+                    np.load(self.path / f'{name}.npy', mmap_mode='r'))
+        self.delta = {}
+        self.delta_offset = 0
+        self.lock = threading.Lock()
+
+    def refresh_delta(self):
+        size = delta_size(self.version)
+        if size <= self.delta_offset:
+            return self.delta
+        with self.lock, open(self.path / DELTA, 'rb') as file:
+            file.seek(self.delta_offset)
+            chunk = file.read(size - self.delta_offset)
+            # Недописанную последнюю строку дочитаем в следующий раз.
+            chunk = chunk[:chunk.rfind(b'\n') + 1]
+            delta = dict(self.delta)
+            for line in chunk.splitlines():
+                entry = json.loads(line)
+                known = delta.get(entry['recipe'])
+                if known is None or known[0] <= entry['at']:
+                    delta[entry['recipe']] = (entry['at'],
+                                              frozenset(entry['ingredients']))
+            self.delta = delta
+            self.delta_offset += len(chunk)
+        return self.delta
+
+    def postings_of(self, ingredient):
+        if ingredient + 1 >= len(self.ingredient_ptr):
+            return self.postings[:0]
+        return self.postings[self.ingredient_ptr[ingredient]:
+                             self.ingredient_ptr[ingredient + 1]]
+
+    def query(self, ingredients, limit, exclude=None):
+        """Возвращает [(recipe_id, score)] по убыванию косинусной близости
+        наборов ингредиентов.
+
+        Ингредиенты, которые встречаются больше чем в
+        SIMILARITY_MAX_POSTINGS рецептах (соль, вода), почти ничего не
+        говорят о сходстве и при поиске кандидатов пропускаются.
+        """
+        ingredients = sorted(set(ingredients))
+        if not ingredients:
+            return []
+        lists = [self.postings_of(ingredient) for ingredient in ingredients]
+        rare = [
+            (ingredient, postings)
+            for ingredient, postings in zip(ingredients, lists)
+            if len(postings) <= settings.SIMILARITY_MAX_POSTINGS
+        ] or [min(zip(ingredients, lists), key=lambda item: len(item[1]))]
+        used = frozenset(ingredient for ingredient, _ in rare)
+        rows, overlap = np.unique(
+            np.concatenate([postings for _, postings in rare]),
+            return_counts=True
+        )
+        scores = overlap / np.sqrt(
+            self.sizes[rows].astype(np.float64) * len(ingredients)
+        )
+        recipe_ids = self.recipe_ids[rows]
+        delta = self.refresh_delta()
+        hidden = list(delta)
+        if exclude is not None:
+            hidden.append(exclude)
+        if hidden:
+            keep = ~np.isin(recipe_ids, hidden)
+            recipe_ids, scores = recipe_ids[keep], scores[keep]
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            recipe_ids, scores = recipe_ids[top], scores[top]
+        result = list(zip(recipe_ids.tolist(), scores.tolist()))
+        for recipe_id, (_, others) in delta.items():
+            common = len(used & others)
+            if recipe_id != exclude and common:
+                result.append((recipe_id, common / (
+                    len(others) * len(ingredients)) ** 0.5))
+        result.sort(key=lambda item: (-item[1], item[0]))
+        return result[:limit]
+
+
+_loaded = {'mtime': None, 'index': None}
+_loaded_lock = threading.Lock()
+
+
+def get_index():
+    """Текущая версия индекса или None, если индекс ещё не собран."""
+    try:
+        mtime = pointer_path().stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _loaded['mtime'] != mtime:
+        with _loaded_lock:
+            if _loaded['mtime'] != mtime:
+                version = current_version()
+                _loaded['index'] = version and SimilarityIndex(version)
+                _loaded['mtime'] = mtime
+    return _loaded['index']
+
+
+def similar_recipes(recipe_id, limit):
+    index = get_index()
+    if index is None:
+        return []
+    ingredients = IngredientInRecipe.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('ingredient_id', flat=True)
+    return [
+        recipe for recipe, _ in index.query(list(ingredients), limit,
+                                            exclude=recipe_id)
+    ]
+
+
+def append_delta(recipes):
+    """Дописывает в журнал текущей версии {recipe_id: ингредиенты}.
+
+    Рецепт с пустым набором ингредиентов (удалённый) пропадает из выдачи.
+    """
+    at = time.time()
+    # Каждая строка уходит в файл отдельным write() без буфера в режиме
+    # O_APPEND, поэтому несколько процессов могут дописывать журнал
+    # одновременно.
+    with delta_lock(shared=True):
+        version = current_version()
+        if version is None:
+            return
+        with open(index_dir() / version / DELTA, 'ab', buffering=0) as file:
+            for recipe_id, ingredients in recipes.items():
+                file.write(json.dumps({
+                    'recipe': recipe_id, 'ingredients': sorted(ingredients),
+                    'at': at,
+                }).encode() + b'\n')
+    index = get_index()
+    if (index is not None and index.version == version
+            and len(index.refresh_delta()) >= settings.SIMILARITY_DELTA_LIMIT):
+        from api.tasks import rebuild_similarity_index
+        from jobs.queue import enqueue
+        enqueue(rebuild_similarity_index, key=f'similarity-index:{version}')
+
+
+@events.subscriber(events.RECIPE)
+def recipes_changed(ids):
+    if current_version() is None:
+        return
+    recipes = {recipe_id: [] for recipe_id in ids}
+    for recipe_id, ingredient_id in IngredientInRecipe.objects.using(
+        DEFAULT_DB_ALIAS
+    ).filter(recipe_id__in=ids, recipe__is_deleted=False).values_list(
+        'recipe_id', 'ingredient_id'
+    ):
+        recipes[recipe_id].append(ingredient_id)
+    append_delta(recipes)
@@ -0,0 +1,71 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from api.catalog import build_catalog
+from api.deletion import purge_deleted as purge
+from api.ingredient_table import build_table
+from api.shopping import FILENAME, shopping_list
+from api.similarity import build_index
+from jobs.queue import checkpoint, current_job, task
+from recipes.exchange import IMAGE_PREFIX, Importer
+from users.models import CustomUser
+
+
+@task()
+def delete_file(payload):
+    default_storage.delete(payload['name'])
+
+
+@task()
+def render_shopping_list(payload):
+    return {
+        'filename': FILENAME,
+        'content_type': 'text/plain',
+        'content': shopping_list(payload['user_id']),
+    }
+
+
+@task()
+def import_recipe_file(payload):
+    path = Path(settings.IMPORT_DIR) / payload['name']
+    job = current_job()
+    # Через API можно сослаться только на картинку рецепта, а не на чужой
+    # аватар. Позиция сохраняется в транзакции каждой пачки: она продлевает
+    # срок задачи, а попытка после сбоя продолжит с неё без повторов.
+    importer = Importer(
+        author=CustomUser.objects.get(id=payload['user_id']),
+        image_prefix=IMAGE_PREFIX,
+        checkpoint=lambda importer, line: checkpoint(importer.state(line)),
+    )
+    start = importer.resume(job.result) if job and job.result else 0
+    try:
+        with open(path, 'rb') as file:
+            summary = importer.run(file, start=start).summary()
+    except Exception:
+        if job is None or job.attempts >= job.max_attempts:
+            path.unlink(missing_ok=True)
+        raise
+    path.unlink(missing_ok=True)
+    return summary
+
+
+@task()
+def rebuild_ingredient_catalog(payload):
+    return {'filename': build_catalog()}
+
+
+@task()
+def rebuild_similarity_index(payload):
+    return {'version': build_index()}
+
+
+@task()
+def rebuild_ingredient_table(payload):
+    return {'version': build_table()}
+
+
+@task()
+def purge_deleted(payload):
+    return purge()
@@ -0,0 +1,25 @@
+from django.contrib import admin
+from django.contrib.admin.sites import AdminSite
+from django.test import TestCase
+
+from api.admin_tools import SoftDeleteAdmin
+from api.tests.test_sync import create_recipe, create_user
+from recipes.models import Recipe
+
+
+class SoftDeleteAdminTests(TestCase):
+
+    def test_deleter_is_required(self):
+        class NoDeleterAdmin(SoftDeleteAdmin):
+            pass
+
+        errors = NoDeleterAdmin(Recipe, AdminSite()).check()
+        self.assertIn('api.E001', [error.id for error in errors])
+
+    def test_delete_queryset_uses_deleter(self):
+        recipe = create_recipe(create_user('author'))
+        model_admin = admin.site._registry[Recipe]
+        self.assertEqual(model_admin.check(), [])
+        model_admin.delete_queryset(None, Recipe.objects.all())
+        recipe.refresh_from_db()
+        self.assertTrue(recipe.is_deleted)
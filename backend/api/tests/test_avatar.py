@@ -0,0 +1,15 @@
+from django.test import TestCase
+
+from api.tasks import delete_file
+from api.views.users import delete_file_later
+from jobs.models import Job
+
+
+class DeleteFileLaterTests(TestCase):
+
+    def test_reused_name_is_deleted_again(self):
+        delete_file_later('users/avatars/avatar.png')
+        delete_file_later('users/avatars/avatar.png')
+        self.assertEqual(
+            Job.objects.filter(name=delete_file.task_name).count(), 2
+        )
@@ -0,0 +1,97 @@
+import tempfile
+import threading
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.catalog import build_catalog, invalidate_catalog
+from api.files import write_atomic
+from api.tasks import rebuild_ingredient_catalog
+from jobs import queue
+from jobs.models import Job
+from recipes.models import Ingredient
+
+
+class IngredientCatalogTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(
+            INGREDIENT_CATALOG_ENABLED=True,
+            INGREDIENT_CATALOG_DIR=Path(directory.name)
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def jobs(self):
+        return Job.objects.filter(name=rebuild_ingredient_catalog.task_name)
+
+    def test_missing_catalog_is_served_from_database(self):
+        client = APIClient()
+        for _ in range(3):
+            response = client.get('/api/ingredients/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()[0]['name'], 'Соль')
+        # Безопасный GET ничего не пишет: сборку ставят деплой и изменения
+        # ингредиентов.
+        self.assertFalse(self.jobs().exists())
+
+    def test_built_catalog_redirects(self):
+        filename = build_catalog()
+        response = APIClient().get('/api/ingredients/')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].endswith(filename))
+        self.assertFalse(self.jobs().exists())
+
+    def test_build_job_enables_redirect(self):
+        invalidate_catalog()
+        job = queue.run(queue.claim())
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        response = APIClient().get('/api/ingredients/')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].endswith(job.result['filename']))
+
+    def test_every_invalidation_schedules_a_build(self):
+        build_catalog()
+        invalidate_catalog()
+        build_catalog()
+        invalidate_catalog()
+        self.assertEqual(self.jobs().count(), 2)
+
+    def test_failed_build_can_be_scheduled_again(self):
+        build_catalog()
+        invalidate_catalog()
+        failed = self.jobs().get()
+        failed.status = Job.FAILED
+        failed.save()
+        key = failed.idempotency_key
+        job = queue.enqueue(rebuild_ingredient_catalog, key=key)
+        self.assertNotEqual(job.pk, failed.pk)
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(queue.enqueue(rebuild_ingredient_catalog,
+                                       key=key).pk, job.pk)
+
+
+class WriteAtomicTests(TestCase):
+
+    def test_concurrent_writers_do_not_mix(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'file'
+            contents = [bytes([number]) * 100_000 for number in range(8)]
+            threads = [
+                threading.Thread(target=write_atomic, args=(path, content))
+                for content in contents
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertIn(path.read_bytes(), contents)
+            self.assertEqual([item.name for item in Path(directory).iterdir()],
+                             ['file'])
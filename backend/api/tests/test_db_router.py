@@ -0,0 +1,80 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api import db_router
+from api.tests.test_sync import create_recipe, create_user
+from recipes.models import Ingredient
+
+REPLICA = 'replica_test'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTests(TestCase):
+    """Реплику заменяет отдельная база SQLite в памяти с другими данными,
+    поэтому по ответу видно, из какой базы он прочитан."""
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings[REPLICA] = connections.configure_settings({
+            DEFAULT_DB_ALIAS: {},
+            REPLICA: {'ENGINE': 'django.db.backends.sqlite3',
+                      'NAME': ':memory:'},
+        })[REPLICA]
+        with connections[REPLICA].schema_editor() as editor:
+            editor.create_model(Ingredient)
+        # Задаётся здесь, а не в классе: тестовый раннер создаёт базы
+        # только для известных ему псевдонимов.
+        cls.databases = {DEFAULT_DB_ALIAS, REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        cache.clear()
+        db_router.lag_monitor._checked.clear()
+        self.ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        Ingredient.objects.using(REPLICA).create(
+            id=self.ingredient.id, name='Соль с реплики', measurement_unit='г'
+        )
+        self.user = create_user('reader')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def names(self, client=None):
+        response = (client or self.client).get('/api/ingredients/')
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.json()]
+
+    def test_safe_reads_go_to_replica(self):
+        self.assertEqual(self.names(), ['Соль с реплики'])
+        response = self.client.get(f'/api/ingredients/{self.ingredient.id}/')
+        self.assertEqual(response.json()['name'], 'Соль с реплики')
+
+    def test_write_pins_user_to_primary(self):
+        recipe = create_recipe(create_user('author'))
+        response = self.client.post(f'/api/recipes/{recipe.id}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.names(), ['Соль'])
+        self.assertEqual(self.names(APIClient()), ['Соль с реплики'])
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch.object(db_router.LagMonitor, 'lag',
+                               return_value=float('inf')):
+            self.assertEqual(self.names(), ['Соль'])
+
+    def test_alias_is_reset_after_response(self):
+        self.names()
+        self.assertIsNone(db_router._read_alias.get())
+        self.assertEqual(db_router.ReplicaRouter().db_for_read(Ingredient),
+                         DEFAULT_DB_ALIAS)
@@ -0,0 +1,87 @@
+from functools import partial
+from unittest import mock
+
+from django.contrib import admin
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from api import events
+from api.tests.test_sync import create_recipe, create_user
+from recipes.exchange import Importer
+from recipes.models import Favorite, Ingredient
+
+
+class EventBatchTests(TransactionTestCase):
+
+    def setUp(self):
+        self.dispatched = []
+        subscribers = mock.patch.dict(
+            events.SUBSCRIBERS, {events.RECIPE: [self.dispatched.append]}
+        )
+        subscribers.start()
+        self.addCleanup(subscribers.stop)
+
+    def test_flush_dispatches_inside_outer_batch(self):
+        with events.batch():
+            with events.batch():
+                events.committed({(events.RECIPE, 1)})
+            self.assertEqual(self.dispatched, [])
+            with events.batch(flush=True):
+                events.committed({(events.RECIPE, 2)})
+            self.assertEqual(self.dispatched, [{2}])
+        self.assertEqual(self.dispatched, [{2}, {1}])
+
+    def test_import_dispatches_each_batch(self):
+        Ingredient.objects.create(name='вода', measurement_unit='мл')
+        importer = Importer(author=create_user('author'), batch_size=1)
+        importer.check_image = lambda name: True
+        line = ('{"name": "Суп", "text": "Текст", "cooking_time": 30, '
+                '"image": "recipes/soup.png", "ingredients": [{"name": '
+                '"вода", "measurement_unit": "мл", "amount": 500}]}')
+        with events.batch():
+            importer.run([line, line, line])
+            self.assertEqual([len(ids) for ids in self.dispatched],
+                             [1, 1, 1])
+
+
+class WritePathEventTests(TestCase):
+
+    def setUp(self):
+        self.dispatched = []
+        subscribers = mock.patch.dict(events.SUBSCRIBERS, {
+            kind: [partial(self.record, kind)]
+            for kind in (events.RECIPE, events.USER)
+        })
+        subscribers.start()
+        self.addCleanup(subscribers.stop)
+        self.reader = create_user('reader')
+        self.recipe = create_recipe(create_user('author'))
+
+    def record(self, kind, ids):
+        self.dispatched.append((kind, ids))
+
+    def test_favorite_and_cart_emit_events(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        expected = [(events.RECIPE, {self.recipe.id}),
+                    (events.USER, {self.reader.id})]
+        for url in ('favorite', 'shopping_cart'):
+            for method in (client.post, client.delete):
+                self.dispatched.clear()
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = method(
+                        f'/api/recipes/{self.recipe.id}/{url}/'
+                    )
+                self.assertLess(response.status_code, 300)
+                self.assertCountEqual(self.dispatched, expected)
+
+    def test_admin_delete_emits_events(self):
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.site._registry[Favorite].delete_queryset(
+                None, Favorite.objects.all()
+            )
+        self.assertCountEqual(self.dispatched, [
+            (events.RECIPE, {self.recipe.id}),
+            (events.USER, {self.reader.id}),
+        ])
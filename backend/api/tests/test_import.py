@@ -0,0 +1,94 @@
+import json
+import tempfile
+from functools import partial
+from pathlib import Path
+from unittest import mock
+
+from django.db.models import F
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.tests.test_sync import create_user
+from jobs import queue
+from jobs.models import Job
+from recipes.exchange import Importer
+from recipes.models import Ingredient, Recipe
+
+
+def line(image):
+    return json.dumps({
+        'name': 'Суп', 'text': 'Текст', 'cooking_time': 30, 'image': image,
+        'ingredients': [{'name': 'вода', 'measurement_unit': 'мл',
+                         'amount': 500}],
+    }, ensure_ascii=False)
+
+
+class ImportTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        override = override_settings(MEDIA_ROOT=self.root / 'media',
+                                     IMPORT_DIR=self.root / 'imports',
+                                     JOBS_RETRY_DELAY=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        for name in ('recipes/soup.png', 'users/avatars/avatar.png'):
+            path = self.root / 'media' / name
+            path.parent.mkdir(parents=True)
+            path.write_bytes(b'png')
+        Ingredient.objects.create(name='вода', measurement_unit='мл')
+        self.client = APIClient()
+        self.client.force_authenticate(create_user('author'))
+
+    def test_import_runs_as_job(self):
+        body = '\n'.join([
+            line('recipes/soup.png'),
+            line('users/avatars/avatar.png'),
+            line('recipes/../users/avatars/avatar.png'),
+        ])
+        response = self.client.post('/api/recipes/import/', body,
+                                    content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Recipe.objects.count(), 0)
+        job = queue.run(queue.claim())
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result['created'], 1)
+        self.assertEqual([error['line'] for error in job.result['errors']],
+                         [2, 3])
+        self.assertEqual(Recipe.objects.get().image.name, 'recipes/soup.png')
+        self.assertEqual(list((self.root / 'imports').iterdir()), [])
+
+    def post(self, lines):
+        return self.client.post('/api/recipes/import/', '\n'.join(lines),
+                                content_type='application/x-ndjson')
+
+    @override_settings(IMPORT_MAX_BYTES=100)
+    def test_body_over_limit_is_rejected(self):
+        response = self.post([line('recipes/soup.png')] * 3)
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(list((self.root / 'imports').iterdir()), [])
+
+    @mock.patch('api.tasks.Importer', partial(Importer, batch_size=1))
+    def test_retry_continues_after_last_batch(self):
+        self.post([line('recipes/soup.png')] * 3)
+        with mock.patch('recipes.exchange.refresh_counts',
+                        side_effect=[None, RuntimeError]):
+            job = queue.run(queue.claim())
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(Recipe.objects.count(), 1)
+        job = queue.run(queue.claim())
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result['created'], 3)
+        self.assertEqual(Recipe.objects.count(), 3)
+
+    def test_lost_job_writes_nothing(self):
+        self.post([line('recipes/soup.png')])
+        job = queue.claim()
+        # Пока задача шла, её счёл зависшей и забрал другой воркер.
+        Job.objects.filter(pk=job.pk).update(attempts=F('attempts') + 1)
+        queue.run(job)
+        self.assertEqual(Recipe.objects.count(), 0)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.RUNNING)
@@ -0,0 +1,46 @@
+import tempfile
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.ingredient_table import build_table
+from recipes.models import Ingredient
+
+# Кириллица в нижнем регистре: LIKE в SQLite не учитывает регистр только
+# для ASCII, а PostgreSQL нашёл бы и «Сыр».
+NAMES = ('salt flakes', 'SALTPETER', 'Salt', 'sage', 'сёмга', 'сельдь',
+         'соль', 'сыр')
+PREFIXES = ('s', 'S', 'salt', 'SALT', 'с', 'се', 'сё')
+
+
+class IngredientSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г') for name in NAMES
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(INGREDIENT_TABLE_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def search(self):
+        client = APIClient()
+        return {
+            prefix: client.get('/api/ingredients/', {'name': prefix}).json()
+            for prefix in PREFIXES
+        }
+
+    def test_table_matches_search_filter(self):
+        expected = self.search()
+        build_table()
+        with self.assertNumQueries(0):
+            found = self.search()
+        for prefix in PREFIXES:
+            with self.subTest(prefix=prefix):
+                self.assertTrue(expected[prefix])
+                self.assertEqual(found[prefix], expected[prefix])
@@ -0,0 +1,59 @@
+import tempfile
+
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import ValidationError
+
+from api.ingredient_table import build_table
+from api.serializers import RecipeSerializer
+from recipes.models import Ingredient
+
+SIZES = (1, 50, 200)
+
+
+class IngredientValidationQueriesTests(TestCase):
+    """Проверка ингредиентов рецепта не зависит от их числа по запросам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(max(SIZES))
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(INGREDIENT_TABLE_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def validate(self, data):
+        return RecipeSerializer().fields['ingredients'].run_validation(data)
+
+    def payload(self, size):
+        return [{'id': ingredient.id, 'amount': 10}
+                for ingredient in self.ingredients[:size]]
+
+    def test_one_query_for_any_number_of_ingredients(self):
+        for size in SIZES:
+            with self.subTest(size=size), self.assertNumQueries(1):
+                items = self.validate(self.payload(size))
+            self.assertEqual(
+                [item['ingredient'] for item in items],
+                self.ingredients[:size]
+            )
+
+    def test_no_queries_with_ingredient_table(self):
+        build_table()
+        for size in SIZES:
+            with self.subTest(size=size), self.assertNumQueries(0):
+                items = self.validate(self.payload(size))
+            self.assertEqual(
+                [item['ingredient'].name for item in items],
+                [ingredient.name for ingredient in self.ingredients[:size]]
+            )
+
+    def test_unknown_ingredient(self):
+        missing = max(ingredient.id for ingredient in self.ingredients) + 1
+        with self.assertNumQueries(1), self.assertRaises(ValidationError):
+            self.validate(self.payload(1) + [{'id': missing, 'amount': 1}])
@@ -0,0 +1,69 @@
+import json
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from api import metrics
+
+
+class RegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(METRICS_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.directory = directory.name
+
+    def record(self, registry, queries=1):
+        stats = metrics.RequestStats()
+        stats.queries = queries
+        registry.record((('view', 'recipes'),), 200, 0.01, 100, stats)
+
+    def test_render_sums_all_workers(self):
+        other = metrics.Registry()
+        self.record(other, queries=3)
+        # Файл другого воркера: то же содержимое под чужим pid.
+        with open(f'{self.directory}/1.json', 'w') as file:
+            json.dump([metric.snapshot() for metric in other.metrics], file)
+        registry = metrics.Registry()
+        self.record(registry)
+        self.record(registry)
+        rendered = registry.render()
+        self.assertIn(
+            'foodgram_http_requests_total{view="recipes",status="200"} 3',
+            rendered
+        )
+        self.assertIn(
+            'foodgram_db_queries_per_request_sum{view="recipes"} 5',
+            rendered
+        )
+
+    def test_clear_metrics_dir(self):
+        registry = metrics.Registry()
+        self.record(registry)
+        registry.flush()
+        metrics.clear_metrics_dir()
+        self.assertNotIn('status="200"', metrics.Registry().render())
+
+
+class SerializerTimeTests(SimpleTestCase):
+
+    def test_query_time_is_not_counted_twice(self):
+        class Base:
+            def to_representation(self, instance):
+                stats = metrics.current_stats()
+                stats.query_time += 10
+                return instance
+
+        class Serializer(metrics.InstrumentedSerializerMixin, Base):
+            pass
+
+        stats, token = metrics.start_request()
+        try:
+            Serializer().to_representation(1)
+        finally:
+            metrics.finish_request(token)
+        self.assertEqual(stats.query_time, 10)
+        self.assertLess(stats.serializer_time, 1)
@@ -0,0 +1,59 @@
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe
+from users.models import CustomUser
+
+
+def create_recipes(author, ingredients, count):
+    recipes = Recipe.objects.bulk_create(
+        Recipe(author=author, name=f'Рецепт {number}', text='Текст',
+               cooking_time=10, image='recipes/test.png')
+        for number in range(count)
+    )
+    IngredientInRecipe.objects.bulk_create(
+        IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=1)
+        for recipe in recipes
+        for ingredient in ingredients
+    )
+    return recipes
+
+
+class RecipeListQueriesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(
+            email='author@example.com', username='author', password='pass',
+            first_name='Автор', last_name='Рецептов'
+        )
+        cls.reader = CustomUser.objects.create_user(
+            email='reader@example.com', username='reader', password='pass',
+            first_name='Читатель', last_name='Рецептов'
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(3)
+        )
+
+    def count_queries(self, client, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_page_size(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        create_recipes(self.author, self.ingredients, 2)
+        few = self.count_queries(client, '/api/recipes/?limit=20')
+        create_recipes(self.author, self.ingredients, 10)
+        many = self.count_queries(client, '/api/recipes/?limit=20')
+        self.assertEqual(few, many)
+
+    def test_ingredient_list_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = APIClient().get('/api/ingredients/')
+        self.assertEqual(len(response.json()), len(self.ingredients))
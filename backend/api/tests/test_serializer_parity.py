@@ -0,0 +1,93 @@
+import json
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.serializers import (IngredientSerializer, RecipeSerializer,
+                             SubscriptionUserSerializer)
+from api.tests.test_sync import create_recipe, create_user
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe,
+                            Recipe, ShoppingCart)
+from users.models import CustomUser, Subscription
+
+
+class ReadSerializerParityTests(TestCase):
+    """Облегчённые сериализаторы чтения отдают то же, что прежние
+    ModelSerializer на тех же данных."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.author.avatar = 'users/avatars/author.png'
+        cls.author.save()
+        cls.reader = create_user('reader')
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        water = Ingredient.objects.create(name='Вода', measurement_unit='мл')
+        cls.recipes = [create_recipe(cls.author, f'Рецепт {number}')
+                       for number in range(3)]
+        for recipe in cls.recipes:
+            IngredientInRecipe.objects.create(recipe=recipe, ingredient=salt,
+                                              amount=5)
+        IngredientInRecipe.objects.create(recipe=cls.recipes[0],
+                                          ingredient=water, amount=300)
+        Favorite.objects.create(user=cls.reader, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.reader, recipe=cls.recipes[1])
+        Subscription.objects.create(user=cls.reader, following=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        if user.is_authenticated:
+            client.force_authenticate(user)
+        return client
+
+    def expected(self, serializer_class, instance, path, user, **kwargs):
+        request = Request(APIRequestFactory().get(path))
+        request.user = user
+        data = serializer_class(instance, context={'request': request},
+                                **kwargs).data
+        return json.loads(JSONRenderer().render(data))
+
+    def test_recipes(self):
+        for user in (AnonymousUser(), self.reader):
+            for cache_enabled in (False, True):
+                with self.subTest(user=user, cache=cache_enabled), \
+                        override_settings(RECIPE_CACHE_ENABLED=cache_enabled):
+                    client = self.client_for(user)
+                    results = client.get('/api/recipes/').json()['results']
+                    self.assertEqual(len(results), len(self.recipes))
+                    for item in results:
+                        path = f'/api/recipes/{item["id"]}/'
+                        expected = self.expected(
+                            RecipeSerializer,
+                            Recipe.objects.get(id=item['id']), path, user
+                        )
+                        self.assertEqual(item, expected)
+                        self.assertEqual(client.get(path).json(), expected)
+
+    def test_subscriptions(self):
+        for query in ('', '?recipes_limit=2'):
+            with self.subTest(query=query):
+                path = f'/api/users/subscriptions/{query}'
+                response = self.client_for(self.reader).get(path)
+                self.assertEqual(
+                    response.json()['results'],
+                    [self.expected(SubscriptionUserSerializer,
+                                   CustomUser.objects.get(id=self.author.id),
+                                   'http://testserver' + path, self.reader)]
+                )
+
+    def test_ingredients(self):
+        for user in (AnonymousUser(), self.reader):
+            with self.subTest(user=user):
+                response = self.client_for(user).get('/api/ingredients/')
+                self.assertEqual(response.json(), self.expected(
+                    IngredientSerializer, Ingredient.objects.all(),
+                    '/api/ingredients/', user, many=True
+                ))
@@ -0,0 +1,61 @@
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from api import similarity
+from api.tests.test_sync import create_recipe, create_user
+from recipes.models import Ingredient, IngredientInRecipe
+
+
+class SimilarityIndexTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(SIMILARITY_INDEX_DIR=Path(directory.name))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.ingredient = Ingredient.objects.create(name='Соль',
+                                                    measurement_unit='г')
+        self.recipe = create_recipe(create_user('author'))
+        IngredientInRecipe.objects.create(recipe=self.recipe,
+                                          ingredient=self.ingredient,
+                                          amount=1)
+
+    def test_update_during_switch_is_kept(self):
+        similarity.build_index()
+        read = threading.Event()
+        moved = threading.Event()
+        writer = threading.Thread(target=similarity.append_delta, args=(
+            {self.recipe.id: []},
+        ))
+        current_version = similarity.current_version
+        remove_old_versions = similarity.remove_old_versions
+
+        def writer_version():
+            version = current_version()
+            if threading.current_thread() is writer:
+                # Писатель прочитал прежнюю версию и ждёт конца переноса
+                # хвоста журнала: без блокировки его строка ушла бы в
+                # прежний журнал и потерялась.
+                read.set()
+                moved.wait(timeout=0.5)
+            return version
+
+        def remove_versions(current):
+            moved.set()
+            remove_old_versions(current)
+
+        with mock.patch.object(similarity, 'current_version',
+                               writer_version), \
+                mock.patch.object(similarity, 'remove_old_versions',
+                                  remove_versions):
+            writer.start()
+            read.wait()
+            version = similarity.build_index()
+            writer.join()
+        delta = similarity.SimilarityIndex(version).refresh_delta()
+        self.assertEqual(delta[self.recipe.id][1], frozenset())
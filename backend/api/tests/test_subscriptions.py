@@ -0,0 +1,24 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.deletion import delete_recipes
+from api.tests.test_sync import create_recipe, create_user
+from recipes.models import Recipe
+
+
+class SubscribeTests(TestCase):
+
+    def test_deleted_recipes_are_not_listed(self):
+        author = create_user('author')
+        reader = create_user('reader')
+        kept = create_recipe(author, 'Оставлен')
+        deleted = create_recipe(author, 'Удалён')
+        delete_recipes(Recipe.objects.filter(id=deleted.id))
+        client = APIClient()
+        client.force_authenticate(reader)
+        response = client.post(f'/api/users/{author.id}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['recipes']],
+            [kept.id]
+        )
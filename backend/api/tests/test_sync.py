@@ -0,0 +1,169 @@
+from unittest import mock
+
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api import changelog
+from api.deletion import delete_recipes
+from recipes.models import Change, Favorite, Recipe, ShoppingCart
+from users.models import CustomUser, Subscription
+
+
+def create_user(name):
+    return CustomUser.objects.create_user(
+        email=f'{name}@example.com', username=name, password='pass',
+        first_name=name, last_name=name
+    )
+
+
+def create_recipe(author, name='Рецепт'):
+    return Recipe.objects.create(author=author, name=name, text='Текст',
+                                 cooking_time=10, image='recipes/test.png')
+
+
+class SyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.reader = create_user('reader')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def sync(self, **params):
+        response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def sync_all(self, cursor=None, limit=100):
+        results = []
+        while True:
+            params = {'limit': limit}
+            if cursor:
+                params['cursor'] = cursor
+            page = self.sync(**params)
+            results += page['results']
+            cursor = page['cursor']
+            if not page['has_more']:
+                return results, cursor
+
+    def keys(self, results):
+        return [(row['type'], row['deleted'],
+                 row['object'].get('id') or row['object'].get('recipe')
+                 or row['object'].get('author'))
+                for row in results]
+
+    def test_pages_cover_all_sources_in_order(self):
+        first = create_recipe(self.author, 'Первый')
+        second = create_recipe(self.author, 'Второй')
+        Favorite.objects.create(user=self.reader, recipe=first)
+        ShoppingCart.objects.create(user=self.reader, recipe=second,
+                                    servings=3)
+        Subscription.objects.create(user=self.reader, following=self.author)
+        # Чужие записи в ленту не попадают.
+        Favorite.objects.create(user=self.author, recipe=second)
+        results, _ = self.sync_all(limit=2)
+        self.assertEqual(self.keys(results), [
+            (Change.RECIPE, False, first.id),
+            (Change.RECIPE, False, second.id),
+            (Change.FAVORITE, False, first.id),
+            (Change.SHOPPING_CART, False, second.id),
+            (Change.SUBSCRIPTION, False, self.author.id),
+        ])
+        self.assertEqual(results[3]['object']['servings'], 3)
+        self.assertEqual(results[0]['object']['name'], 'Первый')
+
+    def test_cursor_returns_only_later_changes(self):
+        recipe = create_recipe(self.author)
+        _, cursor = self.sync_all()
+        self.assertEqual(self.sync_all(cursor)[0], [])
+        Favorite.objects.create(user=self.reader, recipe=recipe)
+        self.assertEqual(self.keys(self.sync_all(cursor)[0]),
+                         [(Change.FAVORITE, False, recipe.id)])
+
+    def test_deletions_are_delivered(self):
+        recipe = create_recipe(self.author)
+        favorite = Favorite.objects.create(user=self.reader, recipe=recipe)
+        _, cursor = self.sync_all()
+        favorite.delete()
+        Subscription.objects.create(user=self.reader, following=self.author)
+        Subscription.objects.filter(user=self.reader).delete()
+        delete_recipes(Recipe.objects.filter(id=recipe.id))
+        results, _ = self.sync_all(cursor, limit=1)
+        self.assertEqual(self.keys(results), [
+            (Change.FAVORITE, True, recipe.id),
+            (Change.SUBSCRIPTION, True, self.author.id),
+            (Change.RECIPE, True, recipe.id),
+        ])
+
+    def test_object_keeps_only_its_latest_change(self):
+        recipe = create_recipe(self.author)
+        Favorite.objects.create(user=self.reader, recipe=recipe).delete()
+        Favorite.objects.create(user=self.reader, recipe=recipe)
+        self.assertEqual(
+            Change.objects.filter(kind=Change.FAVORITE).count(), 1
+        )
+        self.assertEqual(self.keys(self.sync_all()[0])[-1],
+                         (Change.FAVORITE, False, recipe.id))
+
+    def test_schema_keeps_one_change_per_object(self):
+        recipe = create_recipe(self.author)
+        for user in (None, self.reader):
+            Change.objects.create(kind=Change.FAVORITE, object_id=recipe.id,
+                                  user=user)
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                Change.objects.create(kind=Change.FAVORITE,
+                                      object_id=recipe.id, user=user)
+
+    def test_conflicting_insert_is_retried(self):
+        recipe = create_recipe(self.author)
+        bulk_create = Change.objects.bulk_create
+        calls = []
+
+        def racing(objects):
+            calls.append(objects)
+            if len(calls) == 1:
+                # Ту же запись успела вставить другая транзакция.
+                raise IntegrityError
+            return bulk_create(objects)
+
+        with mock.patch.object(Change.objects, 'bulk_create', racing):
+            changelog.record(Change.FAVORITE, [recipe.id], self.reader.id)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(Change.objects.filter(
+            kind=Change.FAVORITE, user=self.reader
+        ).count(), 1)
+
+    def test_change_committed_late_is_not_skipped(self):
+        recipe = create_recipe(self.author)
+        Change.objects.all().delete()
+        # Запись с меньшим id, но из транзакции, которая ещё не завершена.
+        Change.objects.create(kind=Change.RECIPE, object_id=recipe.id,
+                              txid=10)
+        Change.objects.create(kind=Change.SUBSCRIPTION,
+                              object_id=self.author.id, user=self.reader,
+                              txid=5, deleted=True)
+        with mock.patch('api.changelog.horizon', return_value=8):
+            page = self.sync(cursor='-1.0')
+        self.assertEqual(self.keys(page['results']),
+                         [(Change.SUBSCRIPTION, True, self.author.id)])
+        self.assertEqual(page['cursor'], '8.0')
+        with mock.patch('api.changelog.horizon', return_value=11):
+            page = self.sync(cursor=page['cursor'])
+        self.assertEqual(self.keys(page['results']),
+                         [(Change.RECIPE, False, recipe.id)])
+        self.assertEqual(page['cursor'], '11.0')
+
+    def test_anonymous_gets_only_recipes(self):
+        recipe = create_recipe(self.author)
+        Favorite.objects.create(user=self.reader, recipe=recipe)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.keys(self.sync_all()[0]),
+                         [(Change.RECIPE, False, recipe.id)])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/sync/', {'cursor': '1.2.3'})
+        self.assertEqual(response.status_code, 400)
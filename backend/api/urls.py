@@ -1,15 +1,19 @@
 from django.urls import include, path
 from rest_framework import routers
 
+from api.views.jobs import JobViewSet
 from api.views.users import CustomUserViewSet
 from api.views.recipes import RecipeViewSet, IngredientViewSet
+from api.views.sync import SyncView
 
 router = routers.DefaultRouter()
 router.register('users', CustomUserViewSet, basename='users')
 router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
+router.register('jobs', JobViewSet, basename='jobs')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('sync/', SyncView.as_view(), name='sync'),
     path('auth/', include('djoser.urls.authtoken')),
 ]
\ No newline at end of file
@@ -0,0 +1,28 @@
+from django.http import HttpResponse
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from api.serializers import JobSerializer
+from jobs.models import Job
+
+
+class JobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    serializer_class = JobSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return Job.objects.filter(owner=self.request.user)
+
+    @action(methods=['get'], detail=True, url_path='download')
+    def download(self, request, pk=None):
+        job = self.get_object()
+        result = job.result or {}
+        if job.status != Job.SUCCEEDED or 'content' not in result:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        response = HttpResponse(result['content'],
+                                content_type=result['content_type'])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{result["filename"]}"'
+        )
+        return response
@@ -0,0 +1,10 @@
+from django.http import HttpResponse
+
+from api.metrics import registry
+
+
+def metrics_view(request):
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,29 @@
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404
+from django.shortcuts import render
+
+from api.profiling import ProfileStore
+
+
+@staff_member_required
+def profile_list(request):
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Медленные запросы',
+        'captures': ProfileStore().slowest(),
+    }
+    return render(request, 'admin/profiling/list.html', context)
+
+
+@staff_member_required
+def profile_detail(request, capture_id):
+    capture = ProfileStore().get(capture_id)
+    if capture is None:
+        raise Http404
+    context = {
+        **admin.site.each_context(request),
+        'title': f'{capture["method"]} {capture["path"]}',
+        'capture': capture,
+    }
+    return render(request, 'admin/profiling/detail.html', context)
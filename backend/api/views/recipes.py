@@ -1,20 +1,57 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import viewsets, permissions, serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
-from django.db.models import Sum
+from django.http import (HttpResponse, HttpResponseRedirect,
+                         StreamingHttpResponse)
+from django.conf import settings
 
 from urlshortner.utils import shorten_url
-from recipes.models import Ingredient, Recipe, Favorite, ShoppingCart, IngredientInRecipe
-from api.serializers import IngredientSerializer, RecipeSerializer
+from recipes.exchange import export_lines
+from recipes.models import Ingredient, Recipe, Favorite, ShoppingCart
+from api.serializers import (
+    IngredientReadSerializer,
+    IngredientSerializer,
+    JobSerializer,
+    RecipeReadSerializer,
+    RecipeSerializer,
+    ShortRecipeSerializer,
+)
 from api.permissions import IsAuthorOrReadOnly
 from api.pagination import UserPagination
 from api.filters.recipes import IngredientSearchFilter, RecipeFilter
+from api.db_router import ReplicaReadMixin
+from api import events, recipe_cache
+from api.catalog import catalog_url
+from api.ingredient_table import get_table
+from api.deletion import delete_recipes
+from api.files import FileTooLarge, save_stream
+from api.shopping import FILENAME as SHOPPING_LIST_FILENAME, shopping_list
+from api.similarity import similar_recipes
+from api.tasks import import_recipe_file, render_shopping_list
+from jobs.queue import enqueue
 
+SERVINGS_FIELD = serializers.IntegerField(min_value=1, max_value=32767)
+SIMILAR_LIMIT_FIELD = serializers.IntegerField(min_value=1, max_value=50)
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+
+class PreparedQuerysetMixin:
+    """Даёт сериализатору действия подготовить queryset: select_related,
+    prefetch и аннотации, которые он читает (prepare_queryset)."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, "prepare_queryset"):
+            queryset = serializer_class.prepare_queryset(
+                queryset, self.request
+            )
+        return queryset
+
+
+class IngredientViewSet(PreparedQuerysetMixin, ReplicaReadMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
@@ -22,26 +59,75 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (IngredientSearchFilter,)
     search_fields = ("^name",)
 
+    def list(self, request, *args, **kwargs):
+        if (settings.INGREDIENT_CATALOG_ENABLED
+                and not request.query_params.get("name")):
+            url = catalog_url()
+            if url is not None:
+                return HttpResponseRedirect(url)
+        table = get_table()
+        terms = IngredientSearchFilter().get_search_terms(request)
+        if table is not None and terms:
+            return Response(table.search(*terms))
+        return super().list(request, *args, **kwargs)
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return IngredientReadSerializer
+        return super().get_serializer_class()
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
+class RecipeViewSet(PreparedQuerysetMixin, ReplicaReadMixin,
+                    viewsets.ModelViewSet):
+    queryset = Recipe.objects.filter(is_deleted=False)
     serializer_class = RecipeSerializer
     pagination_class = UserPagination
     permission_classes = (IsAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    replica_actions = ('list', 'retrieve', 'download_shopping_cart')
+
+    def get_serializer_class(self):
+        if self.action in ("list", "retrieve"):
+            return RecipeReadSerializer
+        return super().get_serializer_class()
+
+    def retrieve(self, request, *args, **kwargs):
+
+        if (not settings.RECIPE_CACHE_ENABLED
+                or request.user.is_authenticated
+                or not kwargs["pk"].isdigit()):
+            return super().retrieve(request, *args, **kwargs)
+        recipe_id = int(kwargs["pk"])
+        data = recipe_cache.get(recipe_id)
+        if data is None:
+            data = recipe_cache.render([recipe_id]).get(recipe_id)
+            if data is None:
+                return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
 
     def perform_create(self, serializer):
 
         serializer.save(author=self.request.user)
 
-    def add_delete_recipe(self, request, user, recipe, model):
+    def perform_destroy(self, instance):
+
+        delete_recipes(Recipe.objects.filter(pk=instance.pk))
+
+    @staticmethod
+    def recipe_marked(user, recipe):
+        # Меняются флаги рецепта у пользователя и его списки.
+        events.emit(events.RECIPE, recipe.id)
+        events.emit(events.USER, user.id)
+
+    def add_delete_recipe(self, request, user, recipe, model, **fields):
 
         obj = model.objects.filter(user=user, recipe=recipe).first()
         if request.method == "POST":
             if obj:
                 return Response(status=status.HTTP_400_BAD_REQUEST)
-            model.objects.create(user=user, recipe=recipe)
+            model.objects.create(user=user, recipe=recipe, **fields)
+            self.recipe_marked(user, recipe)
             return Response(
                 data={
                     "id": recipe.id,
@@ -54,6 +140,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         if obj:
             obj.delete()
+            self.recipe_marked(user, recipe)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
@@ -66,7 +153,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def favorite(self, request, pk=None):
 
         user = request.user
-        recipe = get_object_or_404(Recipe, id=pk)
+        recipe = get_object_or_404(Recipe, id=pk, is_deleted=False)
         return self.add_delete_recipe(request, user, recipe, Favorite)
 
     @action(
@@ -78,46 +165,124 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def shopping_cart(self, request, pk=None):
 
         user = request.user
-        recipe = get_object_or_404(Recipe, id=pk)
-        return self.add_delete_recipe(request, user, recipe, ShoppingCart)
+        recipe = get_object_or_404(Recipe, id=pk, is_deleted=False)
+        fields = {}
+        if request.method == "POST":
+            fields["servings"] = SERVINGS_FIELD.run_validation(
+                request.data.get("servings", 1)
+            )
+        return self.add_delete_recipe(
+            request, user, recipe, ShoppingCart, **fields
+        )
+
+    @action(methods=["get"], detail=True)
+    def similar(self, request, pk=None):
+
+        recipe = get_object_or_404(Recipe, id=pk, is_deleted=False)
+        limit = SIMILAR_LIMIT_FIELD.run_validation(
+            request.query_params.get("limit", 6)
+        )
+        ids = similar_recipes(recipe.id, limit)
+        recipes = Recipe.objects.filter(is_deleted=False).in_bulk(ids)
+        serializer = ShortRecipeSerializer(
+            [recipes[recipe_id] for recipe_id in ids if recipe_id in recipes],
+            many=True,
+            context={"request": request},
+        )
+        return Response(serializer.data)
+
+    @action(
+        methods=["get"],
+        detail=False,
+        url_path="export",
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def export_recipes(self, request):
+
+        queryset = self.filter_queryset(
+            Recipe.objects.filter(is_deleted=False)
+        )
+        response = StreamingHttpResponse(
+            export_lines(queryset), content_type="application/x-ndjson"
+        )
+        response["Content-Disposition"] = (
+            'attachment; filename="recipes.jsonl"'
+        )
+        return response
+
+    @action(
+        methods=["post"],
+        detail=False,
+        url_path="import",
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def import_recipes(self, request):
+
+        # Тело копируется в файл из потока, без разбора через
+        # request.data, а рецепты записывает фоновая задача: большой файл
+        # не уложится в таймаут воркера gunicorn.
+        try:
+            name = save_stream(settings.IMPORT_DIR, request._request,
+                               settings.IMPORT_MAX_BYTES)
+        except FileTooLarge as error:
+            return Response(
+                {"detail": str(error)},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        job = enqueue(
+            import_recipe_file,
+            {"name": name, "user_id": request.user.id},
+            owner=request.user,
+        )
+        serializer = JobSerializer(job, context={"request": request})
+        return Response(
+            serializer.data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": serializer.data["url"]},
+        )
 
     @action(methods=["get"], detail=True, url_path="get-link")
     def get_short_link(self, request, pk=None):
 
-        get_object_or_404(Recipe, id=pk)
+        get_object_or_404(Recipe, id=pk, is_deleted=False)
         default_link = request.build_absolute_uri(f"/api/recipes/{pk}/")
+        # Строку ссылки пишем здесь, а не в очереди: клиент открывает
+        # ссылку сразу, и до выполнения задачи редирект отдавал бы 404.
+        # Постановка в очередь — такая же вставка строки (Job).
         short_link = shorten_url(url=default_link, is_permanent=False)
         return Response(data={"short-link": short_link})
 
     @action(
-        methods=["get"],
+        methods=["get", "post"],
         detail=False,
         url_path="download_shopping_cart",
         permission_classes=(permissions.IsAuthenticated,),
     )
     def download_shopping_cart(self, request):
 
-        recipes = Recipe.objects.filter(in_cart__user=request.user)
-
-        ingredients = (
-            IngredientInRecipe.objects.filter(recipe__in=recipes)
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(total_amount=Sum("amount"))
-            .order_by("ingredient__name")
-        )
-
-        shopping_list = []
-        for item in ingredients:
-            name = item["ingredient__name"]
-            unit = item["ingredient__measurement_unit"]
-            amount = item["total_amount"]
-            shopping_list.append(f"{name} ({unit}) - {amount}")
+        if request.method == "POST":
+            if not ShoppingCart.objects.filter(user=request.user).exists():
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+            key = request.headers.get("Idempotency-Key")
+            job = enqueue(
+                render_shopping_list,
+                {"user_id": request.user.id},
+                owner=request.user,
+                key=key and f"shopping-list:{request.user.id}:{key}",
+            )
+            serializer = JobSerializer(job, context={"request": request})
+            return Response(
+                serializer.data,
+                status=status.HTTP_202_ACCEPTED,
+                headers={"Location": serializer.data["url"]},
+            )
 
-        if not shopping_list:
+        content = shopping_list(request.user.id)
+        if not content:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        content = "\n".join(shopping_list)
-        filename = "shopping_list.txt"
         response = HttpResponse(content, content_type="text/plain")
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
-        return response
\ No newline at end of file
+        response["Content-Disposition"] = (
+            f'attachment; filename="{SHOPPING_LIST_FILENAME}"'
+        )
+        return response
@@ -0,0 +1,165 @@
+from datetime import timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import permissions, serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api import changelog
+from api.serializers import RecipeReadSerializer
+from recipes.models import Change, Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+LIMIT_FIELD = serializers.IntegerField(min_value=1, max_value=1000)
+# Поле, которым клиент находит объект у себя.
+KEYS = {
+    Change.RECIPE: 'id',
+    Change.FAVORITE: 'recipe',
+    Change.SHOPPING_CART: 'recipe',
+    Change.SUBSCRIPTION: 'author',
+}
+
+
+def encode_cursor(position):
+    return '{}.{}'.format(*position)
+
+
+def decode_cursor(value):
+    try:
+        txid, pk = (int(part) for part in value.split('.'))
+    except ValueError:
+        raise serializers.ValidationError({'cursor': 'Некорректный курсор.'})
+    return txid, pk
+
+
+def start_position(request):
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        return decode_cursor(cursor)
+    since = request.query_params.get('updated_since')
+    if not since:
+        return -1, 0
+    moment = parse_datetime(since)
+    if moment is None:
+        raise serializers.ValidationError(
+            {'updated_since': 'Ожидается дата и время в формате ISO 8601.'}
+        )
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    # Время записи задают часы приложения, поэтому updated_since — только
+    # приблизительная точка входа, дальше порядок задаёт курсор.
+    first = Change.objects.filter(created_at__gte=moment).order_by(
+        'txid', 'id'
+    ).values_list('txid', 'id').first()
+    if first is None:
+        return end_position(changelog.horizon())
+    txid, pk = first
+    return txid, pk - 1
+
+
+def end_position(horizon):
+    """Позиция, до которой все изменения уже видны."""
+    if horizon is not None:
+        return horizon, 0
+    last = Change.objects.order_by('-id').values_list('id', flat=True).first()
+    return 0, last or 0
+
+
+class SyncView(APIView):
+    """Изменения рецептов, избранного, корзины и подписок после курсора.
+
+    Изменения отдаются из журнала Change в порядке (txid, id). Курсор из
+    ответа передаётся в следующий запрос, пока has_more не станет false.
+    """
+
+    permission_classes = (permissions.AllowAny,)
+
+    def get(self, request):
+        position = start_position(request)
+        limit = LIMIT_FIELD.run_validation(
+            request.query_params.get('limit', 100)
+        )
+        horizon = changelog.horizon()
+        # Конец считается до выборки: запись, закоммиченную между ними,
+        # курсор не перескочит.
+        end = end_position(horizon)
+        txid, pk = position
+        changes = Change.objects.filter(
+            self.owners(request.user),
+            Q(txid__gt=txid) | Q(txid=txid, id__gt=pk),
+        )
+        if horizon is not None:
+            changes = changes.filter(txid__lt=horizon)
+        changes = list(changes.order_by('txid', 'id')[:limit + 1])
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        if changes:
+            position = changes[-1].txid, changes[-1].id
+        if not has_more:
+            position = max(position, end)
+        return Response({
+            'results': self.entries(request, changes),
+            'cursor': encode_cursor(position),
+            'has_more': has_more,
+        })
+
+    @staticmethod
+    def owners(user):
+        owners = Q(user__isnull=True)
+        if user.is_authenticated:
+            owners |= Q(user=user)
+        return owners
+
+    def entries(self, request, changes):
+        """Текущее состояние изменённых объектов: отсутствующий объект
+        отдаётся удалённым."""
+        ids = {kind: set() for kind in KEYS}
+        for change in changes:
+            if not change.deleted:
+                ids[change.kind].add(change.object_id)
+        found = self.objects(request, ids)
+        return [
+            {'type': change.kind, 'deleted': False,
+             'object': found[change.kind][change.object_id]}
+            if change.object_id in found[change.kind]
+            else {'type': change.kind, 'deleted': True,
+                  'object': {KEYS[change.kind]: change.object_id}}
+            for change in changes
+        ]
+
+    @staticmethod
+    def objects(request, ids):
+        user = request.user
+        context = {'request': request}
+        recipes = RecipeReadSerializer.prepare_queryset(
+            Recipe.objects.filter(is_deleted=False,
+                                  id__in=ids[Change.RECIPE]),
+            request
+        )
+        found = {Change.RECIPE: {
+            recipe.id: RecipeReadSerializer(recipe, context=context).data
+            for recipe in recipes
+        }}
+        if not user.is_authenticated:
+            return {kind: found.get(kind, {}) for kind in KEYS}
+        found[Change.FAVORITE] = {
+            recipe_id: {'recipe': recipe_id}
+            for recipe_id in Favorite.objects.filter(
+                user=user, recipe_id__in=ids[Change.FAVORITE]
+            ).values_list('recipe_id', flat=True)
+        }
+        found[Change.SHOPPING_CART] = {
+            recipe_id: {'recipe': recipe_id, 'servings': servings}
+            for recipe_id, servings in ShoppingCart.objects.filter(
+                user=user, recipe_id__in=ids[Change.SHOPPING_CART]
+            ).values_list('recipe_id', 'servings')
+        }
+        found[Change.SUBSCRIPTION] = {
+            author_id: {'author': author_id}
+            for author_id in Subscription.objects.filter(
+                user=user, following_id__in=ids[Change.SUBSCRIPTION]
+            ).values_list('following_id', flat=True)
+        }
+        return found
@@ -5,13 +5,31 @@ from rest_framework.decorators import action
 from rest_framework import serializers
 from django.shortcuts import get_object_or_404
 
+from api import events
+from api.db_router import ReplicaReadMixin
+from api.deletion import delete_users
 from api.pagination import UserPagination
-from api.serializers import CustomUserSerializer, AvatarSerializer, SubscriptionUserSerializer
+from api.serializers import (
+    AvatarSerializer,
+    CustomUserSerializer,
+    SubscriptionReadSerializer,
+    SubscriptionUserSerializer,
+)
+from api.tasks import delete_file
+from jobs.queue import enqueue
 from users.models import CustomUser, Subscription
 
 
-class CustomUserViewSet(DjoserUserViewSet):
+def delete_file_later(name):
+    # Без ключа идемпотентности: удаление файла и так идемпотентно, а
+    # хранилище может снова выдать то же имя новому файлу.
+    enqueue(delete_file, {'name': name})
+
+
+class CustomUserViewSet(ReplicaReadMixin, DjoserUserViewSet):
+    queryset = CustomUser.objects.filter(is_deleted=False)
     pagination_class = UserPagination
+    replica_actions = ('list', 'retrieve', 'subscriptions')
 
     def get_permissions(self):
         if self.action in ['retrieve', 'list']:
@@ -26,6 +44,13 @@ class CustomUserViewSet(DjoserUserViewSet):
             )
         super().perform_create(serializer)
 
+    def perform_update(self, serializer, *args, **kwargs):
+        super().perform_update(serializer, *args, **kwargs)
+        events.emit(events.USER, serializer.instance.id)
+
+    def perform_destroy(self, instance):
+        delete_users(CustomUser.objects.filter(pk=instance.pk))
+
     @action(
         methods=["put", "delete"],
         detail=False,
@@ -46,14 +71,21 @@ class CustomUserViewSet(DjoserUserViewSet):
                 context={'request': request}
             )
             serializer.is_valid(raise_exception=True)
+            old_avatar = user.avatar.name
             serializer.save()
+            events.emit(events.USER, user.id)
+            if old_avatar and old_avatar != user.avatar.name:
+                delete_file_later(old_avatar)
             return Response(
                 data={'avatar': user.avatar.url},
                 status=status.HTTP_200_OK
             )
         if user.avatar:
-            user.avatar.delete()
-            user.save()
+            old_avatar = user.avatar.name
+            user.avatar = None
+            user.save(update_fields=['avatar'])
+            events.emit(events.USER, user.id)
+            delete_file_later(old_avatar)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         return Response(status=status.HTTP_400_BAD_REQUEST)
@@ -66,12 +98,13 @@ class CustomUserViewSet(DjoserUserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        followed_users = CustomUser.objects.filter(
-            followers__user=user
+        followed_users = SubscriptionReadSerializer.prepare_queryset(
+            CustomUser.objects.filter(followers__user=user, is_deleted=False),
+            request
         )
         paginator = self.pagination_class()
         page = paginator.paginate_queryset(followed_users, request=request)
-        serializer = SubscriptionUserSerializer(
+        serializer = SubscriptionReadSerializer(
             page, many=True, context={'request': request}
         )
         return paginator.get_paginated_response(serializer.data)
@@ -84,7 +117,7 @@ class CustomUserViewSet(DjoserUserViewSet):
     )
     def subscribe(self, request, id=None):
         user = request.user
-        following = get_object_or_404(CustomUser, id=id)
+        following = get_object_or_404(CustomUser, id=id, is_deleted=False)
 
         if request.method == 'POST':
             if Subscription.objects.filter(
@@ -97,6 +130,7 @@ class CustomUserViewSet(DjoserUserViewSet):
 
             subscription = Subscription.objects.create(
                 user=user, following=following)
+            events.emit(events.USER, user.id, following.id)
 
             serializer = SubscriptionUserSerializer(
                 subscription.following, context={'request': request}
@@ -107,5 +141,6 @@ class CustomUserViewSet(DjoserUserViewSet):
             user=user, following=following)
         if subscription:
             subscription.delete()
+            events.emit(events.USER, user.id, following.id)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
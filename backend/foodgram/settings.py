@@ -1,6 +1,9 @@
 import os
+import tempfile
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -16,12 +19,18 @@ DEBUG = os.getenv('DEBUG', 'False') == 'True'
 
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '127.0.0.1,localhost,backend').split(',')
 
+# Процесс обслуживает только /api/: без админки, сессий и CSRF
+API_ONLY = os.getenv('API_ONLY', 'False') == 'True'
+API_PATH_PREFIX = '/api/'
+
 
 # Application definition
 
 INSTALLED_APPS = [
     'urlshortner',
-    'django.contrib.admin',
+    # SimpleAdminConfig не импортирует admin.py приложений при старте.
+    ('django.contrib.admin.apps.SimpleAdminConfig' if API_ONLY
+     else 'django.contrib.admin'),
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -33,17 +42,35 @@ INSTALLED_APPS = [
     'djoser',
     'django_filters',
     'recipes',
+    'jobs',
+    'api',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ProfilingMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.EventBatchMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'api.middleware.WebSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.WebCsrfViewMiddleware',
+    'api.middleware.WebAuthenticationMiddleware',
+    'api.middleware.WebMessageMiddleware',
+    'api.middleware.WebXFrameOptionsMiddleware',
 ]
+# Middleware, которые нужны только админке и пропускаются для /api/
+WEB_MIDDLEWARE = {
+    'api.middleware.WebSessionMiddleware',
+    'api.middleware.WebCsrfViewMiddleware',
+    'api.middleware.WebAuthenticationMiddleware',
+    'api.middleware.WebMessageMiddleware',
+    'api.middleware.WebXFrameOptionsMiddleware',
+}
+if API_ONLY:
+    MIDDLEWARE = [name for name in MIDDLEWARE if name not in WEB_MIDDLEWARE]
+    # Админка в этом режиме не подключается к URL.
+    SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 
 ROOT_URLCONF = 'foodgram.urls'
 
@@ -79,6 +106,50 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения: POSTGRES_REPLICA_HOSTS=replica1,replica2:5433
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.getenv('POSTGRES_REPLICA_HOSTS', '').split(',')), 1
+):
+    host, _, port = replica.strip().partition(':')
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+
+# Сколько секунд после записи чтения пользователя идут в основную базу
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+# Реплика с большим отставанием не используется
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '2'))
+REPLICA_LAG_CHECK_INTERVAL = 5
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+# Отметка о записи (api.db_router.pin_to_primary) должна быть видна всем
+# воркерам: с кешем в памяти процесса следующее чтение, попавшее в другой
+# воркер, уйдёт на отстающую реплику.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+if DATABASE_REPLICAS and CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+    raise ImproperlyConfigured(
+        'POSTGRES_REPLICA_HOSTS требует общего для воркеров кеша: '
+        'задайте CACHE_BACKEND и CACHE_LOCATION, например Redis'
+    )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -122,6 +193,8 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+DATA_DIR = Path(os.getenv('DATA_DIR', BASE_DIR.parent / 'data'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -136,6 +209,15 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE' : 10,
 }
@@ -147,4 +229,71 @@ DJOSER = {
         'user': 'api.serializers.CustomUserSerializer',
     },
     'HIDE_USERS': False,
-}
\ No newline at end of file
+}
+
+# Метрики в формате Prometheus, отдаются по /metrics
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False') == 'True'
+# Каталог, через который воркеры gunicorn складывают метрики
+METRICS_DIR = os.getenv('METRICS_DIR',
+                        Path(tempfile.gettempdir()) / 'foodgram-metrics')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1'))
+
+# Профилирование медленных запросов, просмотр в /admin/profiling/
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_PATH_PREFIX = os.getenv('PROFILING_PATH_PREFIX', '/api/')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0.01'))
+PROFILING_SLOW_MS = int(os.getenv('PROFILING_SLOW_MS', '500'))
+PROFILING_HEADER = 'X-Profile'
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+PROFILING_DIR = os.getenv('PROFILING_DIR', BASE_DIR / 'profiles')
+PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', '200'))
+
+# Сжатие JSON-ответов
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True') == 'True'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
+
+# Полный список ингредиентов как статический файл, который отдаёт nginx
+INGREDIENT_CATALOG_ENABLED = (
+    os.getenv('INGREDIENT_CATALOG_ENABLED', 'False') == 'True'
+)
+INGREDIENT_CATALOG_DIR = STATIC_ROOT / 'catalog'
+INGREDIENT_CATALOG_URL = f'{STATIC_URL}catalog/'
+
+# Очередь фоновых задач, воркеры запускаются командой run_workers
+JOBS_PROCESSES = int(os.getenv('JOBS_PROCESSES', '1'))
+JOBS_THREADS = int(os.getenv('JOBS_THREADS', '4'))
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', '1'))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', '3'))
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', '10'))
+JOBS_TIMEOUT = int(os.getenv('JOBS_TIMEOUT', '600'))
+JOBS_RESULT_TTL = int(os.getenv('JOBS_RESULT_TTL', str(7 * 24 * 60 * 60)))
+JOBS_HOUSEKEEPING_INTERVAL = 5 * 60
+
+# Файлы, загруженные в POST /api/recipes/import/, до их разбора задачей
+# import_recipes. Каталог общий для backend и воркера
+IMPORT_DIR = os.getenv('IMPORT_DIR', BASE_DIR / 'imports')
+# Должен совпадать с client_max_body_size для импорта в infra/nginx.conf
+IMPORT_MAX_BYTES = int(os.getenv('IMPORT_MAX_BYTES', str(100 * 1024 * 1024)))
+
+# Удалённые рецепты и пользователи скрываются сразу, а строки удаляются
+# фоновой задачей раз в PURGE_DELAY секунд пачками по PURGE_BATCH_SIZE
+PURGE_DELAY = int(os.getenv('PURGE_DELAY', '60'))
+PURGE_BATCH_SIZE = int(os.getenv('PURGE_BATCH_SIZE', '500'))
+
+# Таблица ингредиентов в общей памяти воркеров, собирается командой
+# build_ingredient_table
+INGREDIENT_TABLE_DIR = os.getenv('INGREDIENT_TABLE_DIR',
+                                 BASE_DIR / 'ingredient_table')
+
+# Индекс похожих рецептов, собирается командой build_similarity_index
+SIMILARITY_INDEX_DIR = os.getenv('SIMILARITY_INDEX_DIR',
+                                 BASE_DIR / 'similarity')
+SIMILARITY_MAX_POSTINGS = int(os.getenv('SIMILARITY_MAX_POSTINGS', '100000'))
+SIMILARITY_DELTA_LIMIT = int(os.getenv('SIMILARITY_DELTA_LIMIT', '10000'))
+
+# Кеш карточек рецептов для анонимных пользователей. Сбрасывается
+# событиями об изменениях, поэтому нужен общий для процессов CACHE_BACKEND
+RECIPE_CACHE_ENABLED = os.getenv('RECIPE_CACHE_ENABLED', 'False') == 'True'
+RECIPE_CACHE_TTL = int(os.getenv('RECIPE_CACHE_TTL', '300'))
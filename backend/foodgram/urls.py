@@ -1,15 +1,28 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from api.views.metrics import metrics_view
+from api.views.profiling import profile_detail, profile_list
+
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('r/', include('urlshortner.urls')),
     path('api/', include('api.urls')),
 ]
 
+if not settings.API_ONLY:
+    urlpatterns += [
+        path('admin/profiling/', profile_list, name='profiling-list'),
+        re_path(r'^admin/profiling/(?P<capture_id>\d+-[0-9a-f]{32})/$',
+                profile_detail, name='profiling-detail'),
+        path('admin/', admin.site.urls),
+        path('r/', include('urlshortner.urls')),
+    ]
+
+if settings.METRICS_ENABLED:
+    urlpatterns += [path('metrics', metrics_view, name='metrics')]
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,
                           document_root=settings.MEDIA_ROOT)
@@ -10,7 +10,13 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 import os
 
 from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
 application = get_wsgi_application()
+
+# URLconf, а вместе с ним представления и сериализаторы, импортируется
+# сразу, а не первым запросом. С gunicorn --preload это происходит один
+# раз в мастере до fork.
+get_resolver().url_patterns
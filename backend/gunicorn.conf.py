@@ -0,0 +1,35 @@
+import os
+
+bind = '0.0.0.0:8000'
+workers = int(os.getenv('GUNICORN_WORKERS', '3'))
+# Приложение загружается в мастере один раз, воркеры получают его через
+# fork: быстрее старт и общая память под код.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+
+def pre_fork(server, worker):
+    # Соединения с базой и кешем, открытые мастером при загрузке, не
+    # должны достаться воркерам: несколько процессов на одном сокете
+    # ломают протокол. Закрываем их в мастере до fork.
+    if preload_app:
+        from django.core.cache import caches
+        from django.db import connections
+        connections.close_all()
+        for cache in caches.all(initialized_only=True):
+            cache.close()
+
+
+def on_starting(server):
+    # Метрики прошлого запуска не должны попасть в новые счётчики.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from django.conf import settings
+    if settings.METRICS_ENABLED:
+        from api.metrics import clear_metrics_dir
+        clear_metrics_dir()
+
+
+def worker_exit(server, worker):
+    from django.conf import settings
+    if settings.METRICS_ENABLED:
+        from api.metrics import registry
+        registry.flush()
@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from api.admin_tools import LargeTableAdmin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'owner',
+                    'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'idempotency_key')
+    raw_id_fields = ('owner',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
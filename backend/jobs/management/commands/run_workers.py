@@ -0,0 +1,102 @@
+import multiprocessing
+import signal
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs import queue
+
+
+def work(stop, poll_interval, burst):
+    try:
+        while not stop.is_set():
+            job = queue.claim()
+            if job is not None:
+                queue.run(job)
+                continue
+            if burst:
+                return
+            stop.wait(poll_interval)
+    finally:
+        connections.close_all()
+
+
+def start_threads(stop, threads, poll_interval, burst):
+    workers = [
+        threading.Thread(target=work, args=(stop, poll_interval, burst),
+                         daemon=True)
+        for _ in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def run_process(threads, poll_interval, burst):
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: stop.set())
+    for worker in start_threads(stop, threads, poll_interval, burst):
+        # join с таймаутом, чтобы главный поток получал сигналы.
+        while worker.is_alive():
+            worker.join(timeout=1)
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры очереди фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int,
+                            default=settings.JOBS_PROCESSES)
+        parser.add_argument('--threads', type=int,
+                            default=settings.JOBS_THREADS)
+        parser.add_argument('--poll-interval', type=float,
+                            default=settings.JOBS_POLL_INTERVAL)
+        parser.add_argument('--burst', action='store_true',
+                            help='Выйти, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        worker_args = (options['threads'], options['poll_interval'],
+                       options['burst'])
+        stop = threading.Event()
+        if options['processes'] > 1:
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            workers = [
+                context.Process(target=run_process, args=worker_args)
+                for _ in range(options['processes'])
+            ]
+            for worker in workers:
+                worker.start()
+        else:
+            workers = start_threads(stop, *worker_args)
+
+        def shutdown(*args):
+            stop.set()
+            for worker in workers:
+                if isinstance(worker, multiprocessing.process.BaseProcess):
+                    worker.terminate()
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, shutdown)
+        last_housekeeping = None
+        while any(worker.is_alive() for worker in workers):
+            now = time.monotonic()
+            if (last_housekeeping is None or now - last_housekeeping
+                    >= settings.JOBS_HOUSEKEEPING_INTERVAL):
+                self.housekeeping(options['verbosity'])
+                last_housekeeping = now
+            time.sleep(1)
+        connections.close_all()
+
+    def housekeeping(self, verbosity):
+        failed = queue.fail_stuck()
+        purged = queue.purge(timedelta(seconds=settings.JOBS_RESULT_TTL))
+        if verbosity > 1:
+            self.stdout.write(
+                f'Зависших задач: {failed}, удалено старых: {purged}'
+            )
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (SUCCEEDED, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=128)
+    payload = models.JSONField('Аргументы', default=dict, blank=True)
+    status = models.CharField(
+        'Статус', max_length=16, choices=STATUSES, default=PENDING
+    )
+    result = models.JSONField('Результат', null=True, blank=True)
+    error = models.TextField('Ошибка', blank=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Максимум попыток')
+    idempotency_key = models.CharField(
+        'Ключ идемпотентности', max_length=255, unique=True, null=True,
+        blank=True
+    )
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True,
+        blank=True, related_name='jobs', verbose_name='Владелец'
+    )
+    run_after = models.DateTimeField('Запустить после', default=timezone.now)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+    started_at = models.DateTimeField('Запущена', null=True, blank=True)
+    finished_at = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ('-id',)
+        indexes = [
+            models.Index(fields=['status', 'run_after'],
+                         name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
@@ -0,0 +1,188 @@
+import contextvars
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (DEFAULT_DB_ALIAS, IntegrityError, connection,
+                       transaction)
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+_current = contextvars.ContextVar('current_job', default=None)
+
+
+class JobLost(RuntimeError):
+    """Задачу, которую выполняет поток, уже забрал другой воркер."""
+
+
+def task(name=None, max_attempts=None):
+    """Регистрирует функцию как фоновую задачу.
+
+    Функция получает payload задачи и возвращает JSON-совместимый результат.
+    Задача может выполниться повторно после сбоя воркера, поэтому она должна
+    быть идемпотентной.
+    """
+    def register(function):
+        task_name = name or f'{function.__module__}.{function.__name__}'
+        function.task_name = task_name
+        function.max_attempts = max_attempts or settings.JOBS_MAX_ATTEMPTS
+        TASKS[task_name] = function
+        return function
+    return register
+
+
+def enqueue(function, payload=None, owner=None, key=None, delay=0):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Повторный вызов с тем же key возвращает уже созданную задачу, если она
+    не упала: упавшая освобождает ключ для новой.
+    """
+    job = Job(
+        name=function.task_name,
+        payload=payload or {},
+        max_attempts=function.max_attempts,
+        idempotency_key=key,
+        owner=owner,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+    if key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        # Вызов может прийти из запроса, который читает с реплики, а задача
+        # только что записана в основную БД.
+        existing = Job.objects.using(DEFAULT_DB_ALIAS).get(
+            idempotency_key=key
+        )
+        if existing.status != Job.FAILED:
+            return existing
+        Job.objects.filter(
+            pk=existing.pk, status=Job.FAILED
+        ).update(idempotency_key=None)
+        return enqueue(function, payload, owner, key, delay)
+    return job
+
+
+def claim():
+    """Забирает одну готовую к запуску задачу или возвращает None.
+
+    Зависшие дольше JOBS_TIMEOUT задачи считаются упавшими и запускаются
+    снова.
+    """
+    now = timezone.now()
+    ready = Job.objects.filter(
+        Q(status=Job.PENDING, run_after__lte=now)
+        | Q(status=Job.RUNNING, started_at__lt=stuck_before(now),
+            attempts__lt=F('max_attempts'))
+    ).order_by('run_after', 'id')
+    if not connection.features.has_select_for_update_skip_locked:
+        # Без SKIP LOCKED от двойного запуска защищает условное обновление
+        # в take(); транзакция вокруг него на SQLite только мешает.
+        return take(ready.first(), now)
+    with transaction.atomic():
+        return take(ready.select_for_update(skip_locked=True).first(), now)
+
+
+def take(job, now):
+    if job is None:
+        return None
+    claimed = Job.objects.filter(
+        pk=job.pk, status=job.status, attempts=job.attempts
+    ).update(status=Job.RUNNING, started_at=now, attempts=job.attempts + 1)
+    if not claimed:
+        return None
+    job.status = Job.RUNNING
+    job.started_at = now
+    job.attempts += 1
+    return job
+
+
+def current_job():
+    """Задача, которую выполняет этот поток, или None."""
+    return _current.get()
+
+
+def checkpoint(state):
+    """Сохраняет промежуточное состояние текущей задачи в result и
+    продлевает её срок.
+
+    Долгая задача вызывает его регулярно, тогда claim() не сочтёт её
+    зависшей, а попытка после сбоя продолжит с current_job().result.
+    Вызванный в транзакции, он фиксируется вместе с её изменениями.
+    """
+    job = _current.get()
+    if job is None:
+        return
+    now = timezone.now()
+    updated = Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, attempts=job.attempts
+    ).update(started_at=now, result=state)
+    if not updated:
+        raise JobLost(f'Задачу {job} забрал другой воркер')
+    job.started_at = now
+    job.result = state
+
+
+def run(job):
+    function = TASKS.get(job.name)
+    token = _current.set(job)
+    try:
+        if function is None:
+            raise LookupError(f'Неизвестная задача {job.name}')
+        result = function(job.payload)
+    except JobLost:
+        # Задачу выполняет другой воркер, её строку трогать нельзя.
+        logger.warning('Задача %s отдана другому воркеру', job)
+        return job
+    except Exception:
+        logger.exception('Задача %s упала', job)
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        job.save(update_fields=('status', 'error', 'run_after',
+                                'finished_at'))
+        return job
+    finally:
+        _current.reset(token)
+    job.status = Job.SUCCEEDED
+    job.result = result
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=('status', 'result', 'error', 'finished_at'))
+    return job
+
+
+def stuck_before(now):
+    return now - timedelta(seconds=settings.JOBS_TIMEOUT)
+
+
+def fail_stuck():
+    now = timezone.now()
+    return Job.objects.filter(
+        status=Job.RUNNING, started_at__lt=stuck_before(now),
+        attempts__gte=F('max_attempts'),
+    ).update(status=Job.FAILED, finished_at=now,
+             error='Превышено время выполнения')
+
+
+def purge(older_than):
+    return Job.objects.filter(
+        status__in=(Job.SUCCEEDED, Job.FAILED),
+        finished_at__lt=timezone.now() - older_than,
+    ).delete()[0]
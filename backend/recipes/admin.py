@@ -1,19 +1,37 @@
 from django.contrib import admin
 from urlshortner.models import *
 
+from api import events
+from api.admin_tools import (EventAdmin, LargeTableAdmin, SoftDeleteAdmin,
+                             input_filter)
+from api.deletion import delete_recipes
+from users.counters import count_of
+
 from .models import (Favorite, Ingredient, IngredientInRecipe,
                      Recipe, ShoppingCart)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(SoftDeleteAdmin, EventAdmin, LargeTableAdmin):
     list_display = ('id', 'name', 'author', 'favorites_count')
+    list_select_related = ('author',)
     search_fields = ('name', 'author__username')
-    list_filter = ('author', 'name')
+    list_filter = (input_filter('author__username', 'автор'), 'is_deleted')
+    autocomplete_fields = ('author',)
+    deleter = delete_recipes
+
+    def object_events(self, obj):
+        return ((events.RECIPE, obj.id), (events.USER, obj.author_id))
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            favorites_total=count_of(Favorite, 'recipe')
+        )
+
+    @admin.display(description='Добавлений в избранное',
+                   ordering='favorites_total')
     def favorites_count(self, obj):
-        return obj.favorites.count()
-    favorites_count.short_description = 'Добавлений в избранное'
+        return obj.favorites_total
 
 
 @admin.register(Ingredient)
@@ -23,18 +41,38 @@ class IngredientAdmin(admin.ModelAdmin):
 
 
 @admin.register(IngredientInRecipe)
-class IngredientInRecipeAdmin(admin.ModelAdmin):
+class IngredientInRecipeAdmin(EventAdmin, LargeTableAdmin):
     list_display = ('id', 'recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    list_filter = (input_filter('recipe_id', 'id рецепта'),)
+    autocomplete_fields = ('recipe', 'ingredient')
+
+    def object_events(self, obj):
+        return ((events.RECIPE, obj.recipe_id),)
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(EventAdmin, LargeTableAdmin):
     list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    list_filter = (input_filter('user__username', 'пользователь'),
+                   input_filter('recipe_id', 'id рецепта'))
+    autocomplete_fields = ('user', 'recipe')
+
+    def object_events(self, obj):
+        return ((events.RECIPE, obj.recipe_id), (events.USER, obj.user_id))
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'recipe')
+class ShoppingCartAdmin(EventAdmin, LargeTableAdmin):
+    list_display = ('id', 'user', 'recipe', 'servings')
+    list_select_related = ('user', 'recipe')
+    list_filter = (input_filter('user__username', 'пользователь'),
+                   input_filter('recipe_id', 'id рецепта'))
+    autocomplete_fields = ('user', 'recipe')
+
+    def object_events(self, obj):
+        return ((events.RECIPE, obj.recipe_id), (events.USER, obj.user_id))
 
 for model in admin.site._registry.copy():
         if model.__module__.startswith('urlshortner'):
@@ -0,0 +1,289 @@
+"""Перенос рецептов в формате JSON Lines: одна строка — один рецепт.
+
+Картинка передаётся именем файла в хранилище, ингредиенты — названием:
+
+{"author": "chef@example.com", "name": "Суп", "text": "...",
+ "cooking_time": 30, "image": "recipes/soup.png",
+ "ingredients": [{"name": "вода", "measurement_unit": "мл", "amount": 500}]}
+"""
+import json
+import posixpath
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from api import changelog, events
+from recipes.models import Change, Ingredient, IngredientInRecipe, Recipe
+from users.counters import refresh_counts
+from users.models import CustomUser
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MAX_SMALL_INT = 32767
+NAME_LENGTH = Recipe._meta.get_field('name').max_length
+# Каталог картинок рецептов в хранилище.
+IMAGE_PREFIX = Recipe._meta.get_field('image').upload_to
+
+
+class RecordError(ValueError):
+    pass
+
+
+def dumps(record):
+    if orjson is not None:
+        return orjson.dumps(record) + b'\n'
+    return (json.dumps(record, ensure_ascii=False) + '\n').encode()
+
+
+def loads(line):
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def export_lines(queryset=None, batch_size=1000):
+    """Строки JSON Lines для рецептов queryset в порядке id.
+
+    Рецепты читаются пачками по ключу, поэтому память не растёт с размером
+    выгрузки.
+    """
+    queryset = (
+        (Recipe.objects.all() if queryset is None else queryset)
+        .select_related('author')
+        .prefetch_related('ingredient_amounts__ingredient')
+        .order_by('id')
+    )
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return
+        for recipe in batch:
+            yield dumps({
+                'id': recipe.id,
+                'author': recipe.author.email,
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'image': recipe.image.name,
+                'ingredients': [
+                    {
+                        'name': item.ingredient.name,
+                        'measurement_unit': item.ingredient.measurement_unit,
+                        'amount': item.amount,
+                    }
+                    for item in recipe.ingredient_amounts.all()
+                ],
+            })
+        last_id = batch[-1].id
+
+
+def small_int(value, field):
+    if (isinstance(value, bool) or not isinstance(value, int)
+            or not 1 <= value <= MAX_SMALL_INT):
+        raise RecordError(
+            f'{field}: ожидается целое число от 1 до {MAX_SMALL_INT}'
+        )
+    return value
+
+
+def text(record, field, max_length=None):
+    value = record.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise RecordError(f'{field}: обязательное поле')
+    if max_length and len(value) > max_length:
+        raise RecordError(f'{field}: больше {max_length} символов')
+    return value
+
+
+def parse(line, ingredient_ids):
+    try:
+        record = loads(line)
+    except ValueError as error:
+        raise RecordError(f'некорректный JSON: {error}')
+    if not isinstance(record, dict):
+        raise RecordError('ожидается объект')
+    items = record.get('ingredients')
+    if not isinstance(items, list) or not items:
+        raise RecordError('ingredients: нужен хотя бы один ингредиент')
+    amounts = {}
+    for item in items:
+        name = item.get('name') if isinstance(item, dict) else None
+        ingredient_id = ingredient_ids.get(name)
+        if ingredient_id is None:
+            raise RecordError(f'ingredients: неизвестный ингредиент {name!r}')
+        if ingredient_id in amounts:
+            raise RecordError(f'ingredients: {name!r} указан дважды')
+        amounts[ingredient_id] = small_int(item.get('amount'), 'amount')
+    author = record.get('author')
+    return {
+        'author': author if isinstance(author, str) else None,
+        'name': text(record, 'name', NAME_LENGTH),
+        'text': text(record, 'text'),
+        'cooking_time': small_int(record.get('cooking_time'),
+                                  'cooking_time'),
+        'image': text(record, 'image'),
+        'ingredients': amounts,
+    }
+
+
+class Importer:
+    """Загружает рецепты из строк JSON Lines пачками по batch_size.
+
+    Каждая пачка сохраняется в своей транзакции двумя bulk_create.
+    Строки с ошибками пропускаются и попадают в errors. Если задан author,
+    все рецепты записываются на него, иначе автор ищется по email из
+    строки. Если задан image_prefix, картинка должна лежать в этом
+    каталоге хранилища.
+
+    checkpoint(importer, line) вызывается в транзакции каждой пачки, когда
+    разобраны все строки до line: сохранённое в ней state(line) позволяет
+    продолжить импорт без повторов через resume().
+    """
+
+    def __init__(self, author=None, batch_size=500, images=None,
+                 max_errors=100, image_prefix=None, checkpoint=None):
+        self.author = author
+        self.batch_size = batch_size
+        self.images = images
+        self.image_prefix = image_prefix
+        self.checkpoint = checkpoint
+        self.max_errors = max_errors
+        self.ingredient_ids = dict(
+            Ingredient.objects.values_list('name', 'id')
+        )
+        self.known_images = set()
+        self.lines = 0
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, lines, progress=None, start=0):
+        """Импортирует строки lines, пропуская первые start."""
+        batch = []
+        for number, line in enumerate(lines, 1):
+            if number <= start or not line.strip():
+                continue
+            self.lines = number
+            try:
+                batch.append((number, parse(line, self.ingredient_ids)))
+            except RecordError as error:
+                self.error(number, error)
+            if len(batch) >= self.batch_size:
+                self.save(batch)
+                batch = []
+                if progress is not None:
+                    progress(self)
+        if batch:
+            self.save(batch)
+        if progress is not None:
+            progress(self)
+        return self
+
+    def state(self, line):
+        return {**self.summary(), 'line': line}
+
+    def resume(self, state):
+        """Восстанавливает счётчики из state и возвращает номер строки, с
+        которой продолжать."""
+        self.lines = state['lines']
+        self.created = state['created']
+        self.failed = state['failed']
+        self.errors = state['errors']
+        return state['line']
+
+    def error(self, number, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': number, 'error': str(message)})
+
+    def resolve_authors(self, batch):
+        return dict(
+            CustomUser.objects.filter(
+                email__in={record['author'] for _, record in batch},
+                is_deleted=False
+            ).values_list('email', 'id')
+        )
+
+    def allowed_image(self, name):
+        if self.image_prefix is None:
+            return True
+        # normpath отсекает выход из каталога через «..».
+        return (posixpath.normpath(name) == name
+                and name.startswith(self.image_prefix))
+
+    def check_image(self, name):
+        if name in self.known_images:
+            return True
+        try:
+            found = default_storage.exists(name)
+        except SuspiciousFileOperation:
+            return False
+        if not found and self.images is not None:
+            source = self.images / name
+            if source.is_file():
+                with open(source, 'rb') as file:
+                    # Имя в хранилище должно совпасть с именем из выгрузки.
+                    found = default_storage.save(name, file) == name
+        if found:
+            self.known_images.add(name)
+        return found
+
+    def save(self, batch):
+        authors = {} if self.author else self.resolve_authors(batch)
+        valid = []
+        for number, record in batch:
+            author_id = (self.author.id if self.author
+                         else authors.get(record['author']))
+            if author_id is None:
+                self.error(number, f'author: пользователь '
+                                   f'{record["author"]!r} не найден')
+            elif not self.allowed_image(record['image']):
+                self.error(number, f'image: файл должен лежать в '
+                                   f'{self.image_prefix}')
+            elif not self.check_image(record['image']):
+                self.error(number, f'image: файл {record["image"]!r} '
+                                   f'не найден')
+            else:
+                valid.append((author_id, record))
+        if not valid:
+            return
+        # События пачки рассылаются сразу, даже если импорт идёт внутри
+        # запроса: иначе id всех рецептов копились бы до конца импорта.
+        with events.batch(flush=True), transaction.atomic():
+            recipes = Recipe.objects.bulk_create([
+                Recipe(author_id=author_id, name=record['name'],
+                       text=record['text'],
+                       cooking_time=record['cooking_time'],
+                       image=record['image'])
+                for author_id, record in valid
+            ])
+            IngredientInRecipe.objects.bulk_create([
+                IngredientInRecipe(recipe=recipe, ingredient_id=ingredient,
+                                   amount=amount)
+                for recipe, (_, record) in zip(recipes, valid)
+                for ingredient, amount in record['ingredients'].items()
+            ], batch_size=5000)
+            # bulk_create не отправляет сигналы: счётчики авторов и журнал
+            # изменений обновляются явно.
+            authors = {author_id for author_id, _ in valid}
+            refresh_counts(CustomUser.objects.filter(id__in=authors))
+            changelog.record(Change.RECIPE,
+                             [recipe.id for recipe in recipes])
+            events.emit(events.RECIPE, *(recipe.id for recipe in recipes))
+            events.emit(events.USER, *authors)
+            self.created += len(recipes)
+            if self.checkpoint is not None:
+                self.checkpoint(self, self.lines)
+
+    def summary(self):
+        return {
+            'lines': self.lines,
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
@@ -0,0 +1,34 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from recipes.exchange import export_lines
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Выгружает рецепты в формате JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-',
+                            help='Файл для выгрузки, по умолчанию stdout')
+        parser.add_argument('--author', help='email автора рецептов')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.filter(is_deleted=False)
+        if options['author']:
+            queryset = queryset.filter(author__email=options['author'])
+        lines = export_lines(queryset, options['batch_size'])
+        if options['output'] == '-':
+            for line in lines:
+                sys.stdout.buffer.write(line)
+            return
+        count = 0
+        with open(options['output'], 'wb') as file:
+            for count, line in enumerate(lines, 1):
+                file.write(line)
+                if count % 10000 == 0:
+                    self.stderr.write(f'\rвыгружено рецептов: {count}',
+                                      ending='')
+        self.stderr.write(f'\rвыгружено рецептов: {count}')
@@ -0,0 +1,218 @@
+import multiprocessing
+import os
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+
+from api import changelog
+from api.benchmarks.seed import WORDS, PowerLaw, copy_rows, count_around
+from api.signals import CHANGE_KEYS
+from recipes.models import (Change, Favorite, Ingredient, IngredientInRecipe,
+                            Recipe, ShoppingCart)
+from users.counters import refresh_counts
+from users.models import CustomUser, Subscription
+
+USERNAME_PREFIX = 'fake_'
+IMAGE_NAME = 'recipes/fake.png'
+
+
+def make_users(plan, start, stop, rng):
+    for user_id in range(plan['user_base'] + start, plan['user_base'] + stop):
+        yield CustomUser(
+            id=user_id,
+            username=f'{USERNAME_PREFIX}{user_id}',
+            email=f'{USERNAME_PREFIX}{user_id}@example.com',
+            first_name='Тест',
+            last_name=f'Пользователь {user_id}',
+            password=plan['password'],
+        )
+
+
+def make_recipes(plan, start, stop, rng):
+    authors = PowerLaw(plan['user_base'], plan['users'])
+    for number in range(start, stop):
+        yield Recipe(
+            id=plan['recipe_base'] + number,
+            author_id=authors.sample(rng),
+            name=f'{rng.choice(WORDS)} №{plan["recipe_base"] + number}',
+            image=IMAGE_NAME,
+            text='Описание рецепта для нагрузочного тестирования.',
+            cooking_time=rng.randint(5, 180),
+        )
+
+
+def make_ingredients(plan, start, stop, rng):
+    ingredient_ids = plan['ingredient_ids']
+    for recipe_id in range(plan['recipe_base'] + start,
+                           plan['recipe_base'] + stop):
+        count = rng.randint(1, plan['max_ingredients'])
+        for ingredient_id in rng.sample(ingredient_ids, count):
+            yield IngredientInRecipe(recipe_id=recipe_id,
+                                     ingredient_id=ingredient_id,
+                                     amount=rng.randint(1, 500))
+
+
+def recipe_links(model, mean_key):
+    def make(plan, start, stop, rng):
+        recipes = PowerLaw(plan['recipe_base'], plan['recipes'])
+        for user_id in range(plan['user_base'] + start,
+                             plan['user_base'] + stop):
+            count = count_around(rng, plan[mean_key])
+            for recipe_id in recipes.sample_unique(rng, count):
+                yield model(user_id=user_id, recipe_id=recipe_id)
+    return make
+
+
+def make_subscriptions(plan, start, stop, rng):
+    authors = PowerLaw(plan['user_base'], plan['users'])
+    for user_id in range(plan['user_base'] + start, plan['user_base'] + stop):
+        count = count_around(rng, plan['subscriptions'])
+        for following_id in authors.sample_unique(rng, count):
+            if following_id != user_id:
+                yield Subscription(user_id=user_id,
+                                   following_id=following_id)
+
+
+PHASES = (
+    ('users', CustomUser, 'users', make_users),
+    ('recipes', Recipe, 'recipes', make_recipes),
+    ('ingredients', IngredientInRecipe, 'recipes', make_ingredients),
+    ('favorites', Favorite, 'users', recipe_links(Favorite, 'favorites')),
+    ('shopping_cart', ShoppingCart, 'users',
+     recipe_links(ShoppingCart, 'cart')),
+    ('subscriptions', Subscription, 'users', make_subscriptions),
+)
+
+
+def write_chunk(job):
+    phase, plan, start, stop = job
+    _, model, _, make = PHASES[phase]
+    rng = random.Random(f'{plan["seed"]}:{phase}:{start}')
+    objects = list(make(plan, start, stop, rng))
+    if objects:
+        with transaction.atomic():
+            write_rows(model, objects)
+            if model in CHANGE_KEYS:
+                # Новые объекты попадают в журнал изменений, как при записи
+                # через API, иначе клиенты синхронизации их не увидят.
+                txid = changelog.txid_value()
+                write_rows(Change, [
+                    Change(kind=kind, object_id=object_id, user_id=user_id,
+                           txid=txid)
+                    for kind, object_id, user_id
+                    in map(CHANGE_KEYS[model], objects)
+                ])
+    return len(objects)
+
+
+def write_rows(model, objects):
+    if connection.vendor == 'postgresql':
+        copy_rows(model, objects)
+    else:
+        model.objects.bulk_create(objects, batch_size=500)
+
+
+def close_connections():
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ('Генерирует миллионы пользователей, рецептов, избранного, '
+            'корзин и подписок для нагрузочного тестирования')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--recipes', type=int, default=1_000_000)
+        parser.add_argument('--max-ingredients', type=int, default=15)
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Среднее число избранных на пользователя')
+        parser.add_argument('--cart', type=int, default=5,
+                            help='Среднее число рецептов в корзине')
+        parser.add_argument('--subscriptions', type=int, default=10,
+                            help='Среднее число подписок на пользователя')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--workers', type=int,
+                            default=os.cpu_count() or 1)
+        parser.add_argument('--chunk-size', type=int, default=20_000)
+
+    def handle(self, *args, **options):
+        ingredient_ids = sorted(
+            Ingredient.objects.values_list('id', flat=True)
+        )
+        if len(ingredient_ids) < options['max_ingredients']:
+            raise CommandError(
+                'Недостаточно ингредиентов, выполните load_ingredients.'
+            )
+        plan = {
+            'seed': options['seed'],
+            'users': options['users'],
+            'recipes': options['recipes'],
+            'user_base': (CustomUser.objects.aggregate(Max('id'))['id__max']
+                          or 0) + 1,
+            'recipe_base': (Recipe.objects.aggregate(Max('id'))['id__max']
+                            or 0) + 1,
+            'ingredient_ids': ingredient_ids,
+            'max_ingredients': options['max_ingredients'],
+            'favorites': options['favorites'],
+            'cart': options['cart'],
+            'subscriptions': options['subscriptions'],
+            'password': make_password(None),
+        }
+        workers = options['workers']
+        if connection.vendor == 'sqlite':
+            workers = 1
+        close_connections()
+        pool = None
+        if workers > 1:
+            pool = multiprocessing.get_context('fork').Pool(
+                workers, initializer=close_connections
+            )
+        try:
+            for phase, (name, model, driver, _) in enumerate(PHASES):
+                self.run_phase(pool, phase, name, plan, plan[driver],
+                               options['chunk_size'])
+                if phase == 1:
+                    self.reset_sequences()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        refresh_counts(CustomUser.objects.filter(id__gte=plan['user_base']))
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for model in [model for _, model, _, _ in PHASES] + [Change]:
+                    cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def run_phase(self, pool, phase, name, plan, total, chunk_size):
+        jobs = [
+            (phase, plan, start, min(start + chunk_size, total))
+            for start in range(0, total, chunk_size)
+        ]
+        results = (pool.imap_unordered(write_chunk, jobs) if pool
+                   else map(write_chunk, jobs))
+        started = time.monotonic()
+        rows = 0
+        for done, count in enumerate(results, 1):
+            rows += count
+            self.stdout.write(
+                f'\r{name}: {done}/{len(jobs)} пачек, {rows} строк',
+                ending=''
+            )
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'\r{name}: {rows} строк за {elapsed:.1f} с '
+            f'({rows / elapsed if elapsed else 0:.0f} строк/с)'
+        )
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [CustomUser, Recipe]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
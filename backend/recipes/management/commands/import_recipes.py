@@ -0,0 +1,50 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.exchange import Importer
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = ('Загружает рецепты из файла JSON Lines пачками, не держа файл '
+            'в памяти')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--author',
+                            help='email пользователя, на которого записать '
+                                 'все рецепты, вместо авторов из файла')
+        parser.add_argument('--images', type=Path,
+                            help='Каталог с картинками, которых ещё нет в '
+                                 'хранилище')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        author = None
+        if options['author']:
+            author = CustomUser.objects.filter(
+                email=options['author']
+            ).first()
+            if author is None:
+                raise CommandError(
+                    f'Пользователь {options["author"]} не найден.'
+                )
+        importer = Importer(author=author, batch_size=options['batch_size'],
+                            images=options['images'])
+        with open(options['path'], 'rb') as file:
+            importer.run(file, progress=self.progress)
+        self.stdout.write('')
+        for error in sorted(importer.errors, key=lambda error: error['line']):
+            self.stderr.write(f'строка {error["line"]}: {error["error"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано рецептов: {importer.created}, '
+            f'пропущено строк: {importer.failed}'
+        ))
+
+    def progress(self, importer):
+        self.stdout.write(
+            f'\rстрок: {importer.lines}, создано: {importer.created}, '
+            f'ошибок: {importer.failed}',
+            ending=''
+        )
@@ -0,0 +1,44 @@
+import csv
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.catalog import invalidate_catalog
+from api.ingredient_table import invalidate_table
+from recipes.models import Ingredient
+
+
+def read_ingredients(path):
+    with open(path, encoding='utf-8', newline='') as file:
+        for row in csv.reader(file):
+            if len(row) != 2:
+                continue
+            name, measurement_unit = (value.strip() for value in row)
+            if name and measurement_unit:
+                yield name, measurement_unit
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из data/ingredients.csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=settings.DATA_DIR / 'ingredients.csv'
+        )
+
+    def handle(self, *args, **options):
+        ingredients = {
+            name: Ingredient(name=name, measurement_unit=measurement_unit)
+            for name, measurement_unit in read_ingredients(options['path'])
+        }
+        created = Ingredient.objects.bulk_create(
+            ingredients.values(), batch_size=1000, ignore_conflicts=True
+        )
+        # bulk_create не отправляет сигналы.
+        if settings.INGREDIENT_CATALOG_ENABLED:
+            invalidate_catalog()
+        invalidate_table()
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Обработано ингредиентов: {len(created)}'
+            ))
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 5000
+
+
+def backfill(apps, schema_editor):
+    """Записывает в журнал текущее состояние: клиент без курсора получит
+    все существующие объекты."""
+    Change = apps.get_model('recipes', 'Change')
+    sources = (
+        ('recipe', apps.get_model('recipes', 'Recipe').objects,
+         'id', None),
+        ('favorite', apps.get_model('recipes', 'Favorite').objects,
+         'recipe_id', 'user_id'),
+        ('shopping_cart', apps.get_model('recipes', 'ShoppingCart').objects,
+         'recipe_id', 'user_id'),
+        ('subscription', apps.get_model('users', 'Subscription').objects,
+         'following_id', 'user_id'),
+    )
+    for kind, queryset, object_field, user_field in sources:
+        fields = (object_field, user_field) if user_field else (object_field,)
+        batch = []
+        for row in queryset.order_by('id').values_list(*fields).iterator(
+            chunk_size=BATCH_SIZE
+        ):
+            batch.append(Change(kind=kind, object_id=row[0],
+                                user_id=row[1] if user_field else None))
+            if len(batch) >= BATCH_SIZE:
+                Change.objects.bulk_create(batch)
+                batch = []
+        Change.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0004_shopping_cart_servings'),
+        ('users', '0003_user_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe', 'Рецепт'), ('favorite', 'Избранное'), ('shopping_cart', 'Корзина'), ('subscription', 'Подписка')], max_length=16, verbose_name='Тип')),
+                ('object_id', models.BigIntegerField(verbose_name='id объекта')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Удалён')),
+                ('txid', models.BigIntegerField(default=0, verbose_name='Транзакция')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Записано')),
+                ('user', models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Изменение',
+                'verbose_name_plural': 'Журнал изменений',
+                'indexes': [
+                    models.Index(fields=['txid', 'id'], name='change_position_idx'),
+                    models.Index(fields=['user', 'txid', 'id'], name='change_user_position_idx'),
+                    models.Index(fields=['created_at'], name='change_created_idx'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('kind', 'object_id', 'user'), name='change_user_object_unique'),
+                    models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('kind', 'object_id'), name='change_object_unique'),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
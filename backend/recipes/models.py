@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.core.validators import MinValueValidator
 
 from users.models import CustomUser
@@ -20,7 +21,8 @@ class Ingredient(models.Model):
 
 class Recipe(models.Model):
     author = models.ForeignKey(
-        CustomUser, on_delete=models.CASCADE, related_name="recipes"
+        CustomUser, on_delete=models.CASCADE, related_name="recipes",
+        db_index=False
     )
     name = models.CharField("Название", max_length=256)
     image = models.ImageField("Фото", upload_to="recipes/")
@@ -29,11 +31,25 @@ class Recipe(models.Model):
         "Время приготовления", validators=[MinValueValidator(1)]
     )
     ingredients = models.ManyToManyField(Ingredient, through="IngredientInRecipe")
+    # Удалённый рецепт сразу скрывается из API, а строки удаляет фоновая
+    # задача purge_recipes.
+    is_deleted = models.BooleanField("Удалён", default=False, editable=False)
 
     class Meta:
         ordering = ["name"]
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = [
+            models.Index(fields=["name", "id"], name="recipe_name_idx"),
+            models.Index(
+                fields=["author", "name", "id"],
+                name="recipe_author_name_idx"
+            ),
+            models.Index(
+                fields=["id"], condition=Q(is_deleted=True),
+                name="recipe_deleted_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -41,9 +57,10 @@ class Recipe(models.Model):
 
 class IngredientInRecipe(models.Model):
     recipe = models.ForeignKey(
-        Recipe, on_delete=models.CASCADE, 
+        Recipe, on_delete=models.CASCADE,
         related_name="ingredient_amounts",
-        verbose_name="Рецепт"
+        verbose_name="Рецепт",
+        db_index=False
     )
     ingredient = models.ForeignKey(
         Ingredient, on_delete=models.CASCADE,
@@ -64,19 +81,18 @@ class IngredientInRecipe(models.Model):
                 name="unique_recipe_ingredient"
             )
         ]
-        indexes = [
-            models.Index(fields=["recipe"], name="recipe_idx"),
-            models.Index(fields=["ingredient"], name="ingredient_idx"),
-        ]
 
     def __str__(self):
         return f"{self.ingredient.name} - {self.amount} ({self.recipe.name})"
 
 
 class Favorite(models.Model):
-    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, db_index=False
+    )
     recipe = models.ForeignKey(
-        Recipe, on_delete=models.CASCADE, related_name="favorites"
+        Recipe, on_delete=models.CASCADE, related_name="favorites",
+        db_index=False
     )
 
     class Meta:
@@ -87,11 +103,24 @@ class Favorite(models.Model):
                 fields=["user", "recipe"], name="unique user recipe"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["recipe", "user"], name="favorite_recipe_user_idx"
+            ),
+        ]
 
 
 class ShoppingCart(models.Model):
-    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
-    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name="in_cart")
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, db_index=False
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name="in_cart",
+        db_index=False
+    )
+    servings = models.PositiveSmallIntegerField(
+        "Порций", default=1, validators=[MinValueValidator(1)]
+    )
 
     class Meta:
         verbose_name = "Корзина"
@@ -101,3 +130,70 @@ class ShoppingCart(models.Model):
                 fields=["user", "recipe"], name="unique user recipe shopping_cart"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["recipe", "user"], name="cart_recipe_user_idx"
+            ),
+        ]
+
+
+class Change(models.Model):
+    """Журнал изменений для синхронизации клиентов (GET /api/sync/).
+
+    На объект хранится одна, последняя запись, это требуют ограничения
+    уникальности. Записи упорядочены парой
+    (txid, id): txid — номер транзакции PostgreSQL, которая записала
+    изменение, id — номер из последовательности.
+    """
+
+    RECIPE = "recipe"
+    FAVORITE = "favorite"
+    SHOPPING_CART = "shopping_cart"
+    SUBSCRIPTION = "subscription"
+    KINDS = (
+        (RECIPE, "Рецепт"),
+        (FAVORITE, "Избранное"),
+        (SHOPPING_CART, "Корзина"),
+        (SUBSCRIPTION, "Подписка"),
+    )
+
+    kind = models.CharField("Тип", max_length=16, choices=KINDS)
+    # id рецепта, а для подписки — id автора.
+    object_id = models.BigIntegerField("id объекта")
+    # Владелец избранного, корзины и подписки. Без ограничения внешнего
+    # ключа: записи создаются и во время каскадного удаления самого
+    # пользователя.
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.DO_NOTHING, null=True,
+        db_constraint=False, db_index=False, related_name="+",
+        verbose_name="Пользователь"
+    )
+    deleted = models.BooleanField("Удалён", default=False)
+    txid = models.BigIntegerField("Транзакция", default=0)
+    created_at = models.DateTimeField("Записано", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Изменение"
+        verbose_name_plural = "Журнал изменений"
+        indexes = [
+            models.Index(fields=["txid", "id"], name="change_position_idx"),
+            models.Index(
+                fields=["user", "txid", "id"],
+                name="change_user_position_idx"
+            ),
+            models.Index(fields=["created_at"], name="change_created_idx"),
+        ]
+        # NULL в user не совпадает с другим NULL, поэтому для общих записей
+        # (рецептов) нужно отдельное ограничение.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "object_id", "user"],
+                condition=Q(user__isnull=False),
+                name="change_user_object_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["kind", "object_id"],
+                condition=Q(user__isnull=True),
+                name="change_object_unique",
+            ),
+        ]
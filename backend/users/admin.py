@@ -2,19 +2,41 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import Group 
 
+from api import events
+from api.admin_tools import (EventAdmin, LargeTableAdmin, SoftDeleteAdmin,
+                             input_filter)
+from api.deletion import delete_users
+
 from .models import CustomUser, Subscription
 
 admin.site.unregister(Group)
 
 @admin.register(CustomUser)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(SoftDeleteAdmin, EventAdmin, LargeTableAdmin,
+                      UserAdmin):
     model = CustomUser
+    list_display = ('username', 'email', 'first_name', 'last_name',
+                    'recipes_count', 'followers_count', 'is_staff')
+    list_filter = ('is_staff', 'is_superuser', 'is_active', 'is_deleted')
     fieldsets = UserAdmin.fieldsets + (
-        ('Дополнительно', {'fields': ('avatar',)}),
+        ('Дополнительно', {'fields': ('avatar', 'recipes_count',
+                                      'followers_count', 'following_count')}),
     )
+    readonly_fields = ('recipes_count', 'followers_count', 'following_count')
+    deleter = delete_users
+
+    def object_events(self, obj):
+        return ((events.USER, obj.id),)
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(EventAdmin, LargeTableAdmin):
     list_display = ('id', 'user', 'following')
+    list_select_related = ('user', 'following')
     search_fields = ('user__username', 'following__username')
+    list_filter = (input_filter('user__username', 'подписчик'),
+                   input_filter('following__username', 'автор'))
+    autocomplete_fields = ('user', 'following')
+
+    def object_events(self, obj):
+        return ((events.USER, obj.user_id), (events.USER, obj.following_id))
@@ -0,0 +1,33 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Recipe
+from users.models import CustomUser, Subscription
+
+
+def count_of(model, field, **filters):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}, **filters).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def refresh_counts(users=None):
+    """Пересчитывает счётчики целиком, например после bulk_create.
+
+    Удалённые рецепты и подписки с удалёнными пользователями не
+    считаются, хотя их строки могут ещё ждать фоновой очистки.
+    """
+    if users is None:
+        users = CustomUser.objects.all()
+    return users.update(
+        recipes_count=count_of(Recipe, 'author', is_deleted=False),
+        followers_count=count_of(Subscription, 'following',
+                                 user__is_deleted=False),
+        following_count=count_of(Subscription, 'user',
+                                 following__is_deleted=False),
+    )
+
+
+def change(user_id, field, delta):
+    CustomUser.objects.filter(pk=user_id).update(**{field: F(field) + delta})
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from users.counters import refresh_counts
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает число рецептов, подписчиков и подписок '
+            'у пользователей')
+
+    def handle(self, *args, **options):
+        updated = refresh_counts()
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Обновлено пользователей: {updated}'
+            ))
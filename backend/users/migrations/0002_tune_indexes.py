@@ -0,0 +1,59 @@
+# Generated by Django 4.2.23 on 2026-10-19 10:35
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='customuser',
+            options={'ordering': ('username',), 'verbose_name': 'Пользователь', 'verbose_name_plural': 'Пользователи'},
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='avatar',
+            field=models.ImageField(default=None, null=True, upload_to='users/avatars/', verbose_name='Аватар'),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='email',
+            field=models.EmailField(max_length=254, unique=True, verbose_name='Электронная почта'),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='first_name',
+            field=models.CharField(max_length=150, verbose_name='Имя'),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='last_name',
+            field=models.CharField(max_length=150, verbose_name='Фамилия'),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='username',
+            field=models.CharField(max_length=150, unique=True, validators=[django.core.validators.RegexValidator(code='invalid_username', message='Имя пользователя может содержать только буквы, цифры и знаки @/./+/-/_', regex='^[\\w.@+-]+$')], verbose_name='Имя пользователя'),
+        ),
+        migrations.AlterField(
+            model_name='subscription',
+            name='following',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='followers', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='subscription',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='subscriptions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['following', 'user'], name='subscription_following_idx'),
+        ),
+    ]
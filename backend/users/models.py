@@ -36,6 +36,28 @@ class CustomUser(AbstractUser):
         max_length=150,
         verbose_name='Фамилия'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число подписок'
+    )
+    # Удалённый пользователь сразу скрывается из API, а строки удаляет
+    # фоновая задача purge_users.
+    is_deleted = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Удалён'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
@@ -45,8 +67,10 @@ class CustomUser(AbstractUser):
         verbose_name_plural = 'Пользователи'
         ordering = ('username',)
         indexes = [
-            models.Index(fields=['username'], name='username_idx'),
-            models.Index(fields=['email'], name='email_idx'),
+            models.Index(
+                fields=['id'], condition=models.Q(is_deleted=True),
+                name='user_deleted_idx'
+            ),
         ]
 
     def __str__(self):
@@ -55,9 +79,11 @@ class CustomUser(AbstractUser):
 
 class Subscription(models.Model):
     user = models.ForeignKey(
-        CustomUser, on_delete=models.CASCADE, related_name='subscriptions')
+        CustomUser, on_delete=models.CASCADE, related_name='subscriptions',
+        db_index=False)
     following = models.ForeignKey(
-        CustomUser, on_delete=models.CASCADE, related_name='followers')
+        CustomUser, on_delete=models.CASCADE, related_name='followers',
+        db_index=False)
 
     class Meta:
         verbose_name = 'Подписка'
@@ -68,3 +94,9 @@ class Subscription(models.Model):
                 fields=['user', 'following'], name='unique user following'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['following', 'user'],
+                name='subscription_following_idx'
+            ),
+        ]
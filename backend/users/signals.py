@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Recipe
+from users.counters import change
+from users.models import Subscription
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change(instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    # Помеченный рецепт уже вычтен из счётчика в delete_recipes.
+    if not instance.is_deleted:
+        change(instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        change(instance.user_id, 'following_count', 1)
+        change(instance.following_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    change(instance.user_id, 'following_count', -1)
+    change(instance.following_id, 'followers_count', -1)